@@ -1,44 +1,335 @@
 from __future__ import annotations
 
 import argparse
-from pathlib import Path
+import json
+import sys
+from typing import List, Optional
 
 from videonarrate.config import Config
 from videonarrate.pipeline import process_video
 
 
-def parse_args() -> argparse.Namespace:
-    p = argparse.ArgumentParser(
-        prog="videonarrate",
-        description="Convert videos into structured, time-aware narratives and JSON events.",
-    )
-    p.add_argument("--input", required=True, help="Path to input video file")
-    p.add_argument("--out", required=True, help="Output directory")
+def _parse_size(value: str):
+    w, sep, h = value.lower().partition("x")
+    if not sep or not w.isdigit() or not h.isdigit():
+        raise argparse.ArgumentTypeError(f"expected WxH, got {value!r}")
+    return int(w), int(h)
+
+
+def _parse_region(value: str):
+    parts = value.split(",")
+    try:
+        x, y, w, h = (float(v) for v in parts)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected X,Y,W,H fractions, got {value!r}")
+    return x, y, w, h
+
+
+def _parse_scales(value: str):
+    scales = []
+    for item in value.split(","):
+        window, _, stride = item.partition(":")
+        try:
+            w = float(window)
+            s = float(stride) if stride else w
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"expected WINDOW[:STRIDE] seconds, comma-separated, got {value!r}")
+        if w <= 0 or s <= 0:
+            raise argparse.ArgumentTypeError(f"window and stride must be positive, got {item!r}")
+        scales.append((w, s))
+    return scales
+
+
+def add_config_args(p: argparse.ArgumentParser) -> None:
+    """Pipeline options shared by the single-video command and the subcommands."""
     p.add_argument("--fps", type=int, default=8, help="Sampling FPS")
+    p.add_argument("--sampler", default="grab", choices=["grab", "seek", "read"], help="Frame sampling strategy")
+    p.add_argument("--decode-backend", default="cv2", choices=["cv2", "ffmpeg"], help="Decode backend")
+    p.add_argument("--decode-max-side", type=int, default=None, help="Downscale frames at decode so the longest side fits (optional)")
+    p.add_argument("--pipeline", default="serial", choices=["serial", "staged"], help="Run stages serially or overlapped in threads")
+    p.add_argument("--queue-depth", type=int, default=4, help="Prefetch queue depth between stages (staged pipeline)")
+    p.add_argument("--detect-batch", type=int, default=1, help="Frames per detector predict call")
+    p.add_argument("--detect-workers", type=int, default=1, help="Detector processes fed through a shared-memory frame ring (1 = in-process)")
+    p.add_argument("--motion-gate", action="store_true", help="Skip detection on frames that barely changed; tracks are carried forward")
+    p.add_argument("--motion-gate-threshold", type=float, default=0.05, help="Share of changed pixels in the most-changed block of the downscaled frame for it to be detected")
+    p.add_argument("--motion-gate-every", type=int, default=8, help="With --motion-gate, run full detection at least every N sampled frames")
+    p.add_argument("--motion-gate-coast", default="hold", choices=["hold", "velocity"], help="With --motion-gate, keep track boxes in place on skipped frames or extrapolate their velocity")
+    p.add_argument("--motion-gate-ignore", type=_parse_region, action="append", default=None, metavar="X,Y,W,H", help="With --motion-gate, ignore changes in this region (fractions of the frame); repeatable")
+    p.add_argument("--shot-detect", action="store_true", help="Detect shot cuts: reset tracks and windows at each, one summary scene per shot, cuts in shots.json")
+    p.add_argument("--shot-threshold", type=float, default=0.1, help="Colour histogram distance (0-1) between consecutive sampled frames that counts as a cut")
+    p.add_argument("--shot-min-len", type=float, default=1.0, help="Shortest shot in seconds; cuts sooner than this after the previous one are ignored")
+    p.add_argument("--shards", type=int, default=1, help="Split one video into N time ranges processed on separate processes")
+    p.add_argument("--shard-overlap", type=float, default=None, help="Warm-up seconds decoded before each shard for track stitching (optional)")
+    p.add_argument("--det-cache", default="bypass", choices=["use", "refresh", "bypass"], help="Detection cache mode")
+    p.add_argument("--cache-dir", default=None, help="Detection cache directory (default ~/.cache/videonarrate/detections)")
+    p.add_argument("--cache-max-mb", type=float, default=2048.0, help="Detection cache size cap; LRU entries are evicted above it")
+    p.add_argument("--tracker", default="simple", choices=["simple", "vector"], help="Tracker implementation")
+    p.add_argument("--tracker-assignment", default="greedy", choices=["greedy", "hungarian"], help="Assignment solver for the vector tracker")
+    p.add_argument("--track-history", type=int, default=6, help="Per-track history entries to keep (0 = unbounded)")
+    p.add_argument("--keep-dead-tracks", action="store_true", help="Keep aged-out tracks in memory instead of evicting them")
+    p.add_argument("--track-summaries", action="store_true", help="Write a summary of each finished track to tracks.jsonl")
+    p.add_argument("--batch-motion", action="store_true", help="Compute motion and actions for all tracks in one vectorized call")
+    p.add_argument("--max-neighbors", type=int, default=None, help="Cap interactions per track to the nearest N (optional)")
+    p.add_argument("--vtt", action="store_true", help="Also write captions.vtt")
+    p.add_argument("--columnar", action="store_true", help="Also write columnar events.cols/ (npz chunks)")
+    p.add_argument("--no-index", action="store_true", help="Skip the events.idx/ query index")
+    p.add_argument("--flush-interval", type=float, default=5.0, help="Seconds between flushes of streamed outputs")
+    p.add_argument("--live", action="store_true", help="Treat --input as a live feed: stream URL, camera index, '-' for stdin, or a file replayed in real time")
+    p.add_argument("--latency-budget", type=float, default=1.0, help="Live mode: seconds from frame arrival to processed")
+    p.add_argument("--live-min-fps", type=float, default=1.0, help="Live mode: lowest adaptive sampling fps")
+    p.add_argument("--replay-speed", type=float, default=1.0, help="Live mode: replay speed for file input (1.0 = wall clock)")
+    p.add_argument("--live-size", type=_parse_size, default=None, help="Live mode: WxH of raw bgr24 frames on stdin")
+    p.add_argument("--checkpoint-interval", type=float, default=60.0, help="Seconds between checkpoint.json writes (0 = off)")
+    p.add_argument("--memory-limit-mb", type=float, default=None, help="Abort when resident memory exceeds this many MiB (optional)")
+    p.add_argument("--no-metrics", action="store_true", help="Skip per-stage instrumentation and metrics.json")
+    p.add_argument("--profile-stage", default=None, choices=["decode", "detect", "track", "window"], help="Profile one stage (optional)")
+    p.add_argument("--profile-mode", default="cprofile", choices=["cprofile", "tracemalloc"], help="Profiler used with --profile-stage")
     p.add_argument("--window", type=float, default=2.5, help="Window size in seconds")
     p.add_argument("--stride", type=float, default=1.0, help="Stride in seconds")
-    p.add_argument("--detector", default="yolov8-seg", choices=["yolov8-seg", "mock"], help="Detector backend")
+    p.add_argument("--scales", type=_parse_scales, default=None, metavar="W:S,...", help="Extra window:stride scales in seconds, each written to scales/<W>s/ (stride defaults to the window)")
+    p.add_argument("--no-coalesce", action="store_true", help="Write one event per track and window instead of merging them into spans")
+    p.add_argument("--coalesce-gap", type=float, default=2.5, help="Seconds a track may be missing before its span closes")
+    p.add_argument("--coalesce-max-span", type=float, default=30.0, help="Longest span in seconds before it is continued by a new one (must be > 0)")
+    p.add_argument("--raw-events", action="store_true", help="Also write the per-window event stream to events.raw.jsonl")
+    p.add_argument("--detector", default="yolov8-seg", choices=["yolov8-seg", "onnx", "synthetic", "mock"], help="Detector backend")
+    p.add_argument("--weights", default=None, help="Model file for the yolov8-seg/onnx backends (default yolov8s-seg.pt / yolov8s.onnx)")
+    p.add_argument("--detector-threads", type=int, default=None, help="ONNX Runtime threads per detector (optional)")
     p.add_argument("--min-det-conf", type=float, default=0.25, help="Minimum detection confidence")
     p.add_argument("--max-seconds", type=float, default=None, help="Max seconds to process (optional)")
     p.add_argument("--allow-labels", default=None, help="Comma-separated labels to keep (optional)")
-    return p.parse_args()
 
 
-def main() -> None:
-    args = parse_args()
+def config_from_args(args: argparse.Namespace) -> Config:
     allow_labels = None
     if args.allow_labels:
         allow_labels = {s.strip() for s in args.allow_labels.split(',') if s.strip()}
 
-    cfg = Config(
+    return Config(
         fps=args.fps,
+        sampler=args.sampler,
+        decode_backend=args.decode_backend,
+        decode_max_side=args.decode_max_side,
+        pipeline_mode=args.pipeline,
+        queue_depth=args.queue_depth,
+        detect_batch=args.detect_batch,
+        detect_workers=args.detect_workers,
+        motion_gate=args.motion_gate,
+        motion_gate_threshold=args.motion_gate_threshold,
+        motion_gate_every=args.motion_gate_every,
+        motion_gate_coast=args.motion_gate_coast,
+        motion_gate_ignore=args.motion_gate_ignore,
+        shot_detect=args.shot_detect,
+        shot_threshold=args.shot_threshold,
+        shot_min_len=args.shot_min_len,
+        tracker=args.tracker,
+        track_history=args.track_history or None,
+        evict_dead_tracks=not args.keep_dead_tracks,
+        track_summaries=args.track_summaries,
+        batch_motion=args.batch_motion,
+        max_neighbors=args.max_neighbors,
+        write_vtt=args.vtt,
+        write_columnar=args.columnar,
+        write_index=not args.no_index,
+        flush_interval=args.flush_interval,
+        memory_limit_mb=args.memory_limit_mb,
+        live=args.live,
+        latency_budget=args.latency_budget,
+        live_min_fps=args.live_min_fps,
+        replay_speed=args.replay_speed,
+        live_frame_size=args.live_size,
+        checkpoint_interval=args.checkpoint_interval or None,
+        # The batch command's --resume also continues partially processed clips
+        resume=getattr(args, "resume", False),
+        metrics=not args.no_metrics,
+        profile_stage=args.profile_stage,
+        profile_mode=args.profile_mode,
+        tracker_assignment=args.tracker_assignment,
+        shards=args.shards,
+        shard_overlap=args.shard_overlap,
+        det_cache=args.det_cache,
+        cache_dir=args.cache_dir,
+        cache_max_mb=args.cache_max_mb,
         window=args.window,
         stride=args.stride,
+        scales=args.scales,
+        coalesce=not args.no_coalesce,
+        coalesce_gap=args.coalesce_gap,
+        coalesce_max_span=args.coalesce_max_span,
+        raw_events=args.raw_events,
         detector=args.detector,
+        detector_weights=args.weights,
+        detector_threads=args.detector_threads,
         min_det_conf=args.min_det_conf,
         max_seconds=args.max_seconds,
         allowed_labels=allow_labels,
     )
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    p = argparse.ArgumentParser(
+        prog="videonarrate",
+        description="Convert videos into structured, time-aware narratives and JSON events.",
+    )
+    p.add_argument("--input", required=True, help="Path to input video file")
+    p.add_argument("--out", required=True, help="Output directory")
+    p.add_argument("--resume", action="store_true", help="Continue from the checkpoint in --out if an earlier run was interrupted")
+    add_config_args(p)
+    return p.parse_args(argv)
+
+
+def parse_batch_args(argv: List[str]) -> argparse.Namespace:
+    p = argparse.ArgumentParser(
+        prog="videonarrate batch",
+        description="Process a directory or manifest of videos on a pool of worker processes.",
+    )
+    p.add_argument("--inputs", required=True, help="Directory of videos, or a manifest file with one path per line")
+    p.add_argument("--out", required=True, help="Output root; each clip gets its own subdirectory")
+    p.add_argument("--workers", type=int, default=None, help="Worker processes (default: half the CPUs)")
+    p.add_argument("--resume", action="store_true", help="Skip clips that already have complete outputs and continue interrupted ones")
+    add_config_args(p)
+    return p.parse_args(argv)
+
+
+def parse_serve_args(argv: List[str]) -> argparse.Namespace:
+    p = argparse.ArgumentParser(
+        prog="videonarrate serve",
+        description="Run a resident job server that keeps the detector loaded between jobs.",
+    )
+    p.add_argument("--host", default="127.0.0.1", help="Bind address for the HTTP server")
+    p.add_argument("--port", type=int, default=8765, help="HTTP port")
+    p.add_argument("--socket", default=None, help="Serve on this UNIX socket path instead of HTTP")
+    p.add_argument("--concurrency", type=int, default=1, help="Jobs run at the same time")
+    add_config_args(p)
+    return p.parse_args(argv)
+
+
+def _parse_override(item: str):
+    key, sep, value = item.partition("=")
+    if not sep:
+        raise argparse.ArgumentTypeError(f"expected key=value, got {item!r}")
+    try:
+        return key.replace("-", "_"), json.loads(value)
+    except ValueError:
+        return key.replace("-", "_"), value
+
+
+def parse_client_args(cmd: str, argv: List[str]) -> argparse.Namespace:
+    p = argparse.ArgumentParser(prog=f"videonarrate {cmd}", description="Talk to a running videonarrate server.")
+    p.add_argument("--server", default="http://127.0.0.1:8765", help="Server URL")
+    p.add_argument("--socket", default=None, help="Server UNIX socket path (instead of --server)")
+    if cmd == "submit":
+        p.add_argument("--input", required=True, help="Path to input video file")
+        p.add_argument("--out", required=True, help="Output directory")
+        p.add_argument("--set", dest="overrides", action="append", type=_parse_override, default=[],
+                       metavar="KEY=VALUE", help="Config override, e.g. --set fps=4 (repeatable; values parsed as JSON)")
+        p.add_argument("--wait", action="store_true", help="Block until the job finishes")
+    else:
+        p.add_argument("job_id", nargs="?", default=None, help="Job id (default: list all jobs)")
+    return p.parse_args(argv)
+
+
+def parse_to_jsonl_args(argv: List[str]) -> argparse.Namespace:
+    p = argparse.ArgumentParser(prog="videonarrate to-jsonl", description="Rebuild events.jsonl from a columnar events.cols directory.")
+    p.add_argument("path", help="events.cols directory")
+    p.add_argument("--out", required=True, help="Output .jsonl path")
+    return p.parse_args(argv)
+
+
+def parse_query_args(argv: List[str]) -> argparse.Namespace:
+    p = argparse.ArgumentParser(
+        prog="videonarrate query",
+        description="Print events from an output directory by time range, label or track id, using its events.idx/ index.",
+    )
+    p.add_argument("out_dir", help="Output directory of a finished run")
+    p.add_argument("--start", default=None, help="Range start, seconds or HH:MM:SS(.mmm) (optional)")
+    p.add_argument("--end", default=None, help="Range end, seconds or HH:MM:SS(.mmm) (optional)")
+    p.add_argument("--label", action="append", default=None, help="Keep events mentioning this label (repeatable)")
+    p.add_argument("--track", action="append", type=int, default=None, help="Keep events mentioning this track id (repeatable)")
+    p.add_argument("--count", action="store_true", help="Only print the number of matching events")
+    p.add_argument("--srt", default=None, help="Write captions for the matching events to this SRT file")
+    p.add_argument("--vtt", default=None, help="Write captions for the matching events to this VTT file")
+    return p.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] == "batch":
+        from videonarrate.batch import run_batch
+
+        args = parse_batch_args(argv[1:])
+        report = run_batch(args.inputs, args.out, config_from_args(args), workers=args.workers, resume=args.resume)
+        print(json.dumps(report, indent=2))
+        return
+
+    if argv and argv[0] == "to-jsonl":
+        from pathlib import Path
+
+        from videonarrate.eventstore import columnar_to_jsonl
+
+        args = parse_to_jsonl_args(argv[1:])
+        print(columnar_to_jsonl(Path(args.path), Path(args.out)))
+        return
+    if argv and argv[0] == "query":
+        from pathlib import Path
+
+        from videonarrate.index import EventIndex, parse_time, write_captions
+
+        args = parse_query_args(argv[1:])
+        start = parse_time(args.start) if args.start is not None else None
+        end = parse_time(args.end) if args.end is not None else None
+        try:
+            index = EventIndex(args.out_dir)
+        except (OSError, ValueError) as exc:
+            sys.exit(f"videonarrate query: {exc}")
+        with index:
+            ids = index.query(start, end, labels=args.label, track_ids=args.track)
+            if args.srt or args.vtt:
+                events = list(index.events(ids))
+                if args.srt:
+                    write_captions(events, Path(args.srt), fmt="srt")
+                if args.vtt:
+                    write_captions(events, Path(args.vtt), fmt="vtt")
+            if args.count:
+                print(len(ids))
+            elif not (args.srt or args.vtt):
+                out = sys.stdout.buffer
+                for line in index.lines(ids):
+                    out.write(line)
+                out.flush()
+        return
+    if argv and argv[0] == "serve":
+        from videonarrate.server import serve
+
+        args = parse_serve_args(argv[1:])
+        serve(config_from_args(args), host=args.host, port=args.port, socket_path=args.socket, concurrency=args.concurrency)
+        return
+    if argv and argv[0] in ("submit", "status"):
+        from videonarrate.server import ServerClient
+
+        args = parse_client_args(argv[0], argv[1:])
+        client = ServerClient(args.server, socket_path=args.socket)
+        try:
+            if argv[0] == "submit":
+                job = client.submit(args.input, args.out, dict(args.overrides))
+                if args.wait:
+                    job = client.wait(job["id"])
+            else:
+                job = client.status(args.job_id)
+        except (OSError, RuntimeError) as exc:
+            sys.exit(f"videonarrate {argv[0]}: {exc}")
+        print(json.dumps(job, indent=2))
+        if isinstance(job, dict) and job.get("status") == "failed":
+            sys.exit(1)
+        return
+
+    args = parse_args(argv)
+    cfg = config_from_args(args)
+    if cfg.live:
+        from videonarrate.live import LiveStatusHook
+
+        stats = process_video(args.input, args.out, cfg, hooks=[LiveStatusHook()])
+        print(json.dumps(stats["live"], indent=2))
+        return
     process_video(args.input, args.out, cfg)
 
 
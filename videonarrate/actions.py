@@ -1,20 +1,25 @@
 from __future__ import annotations
 
-from typing import Optional
+from typing import List, Optional, Sequence, Tuple
 
 from .track import Track
 from .motion import summarize_motion
 from .schemas import Action
 
 
-def heuristic_action(track: Track, label_hint: Optional[str] = None) -> Optional[Action]:
+def heuristic_action(
+    track: Track,
+    label_hint: Optional[str] = None,
+    motion: Optional[Tuple[float, float, str]] = None,
+) -> Optional[Action]:
     """
     Lightweight action recognizer: infer basic actions from motion stats.
     - stationary -> "standing" / "stopped"
     - slow movement -> "walking" / "moving"
     - fast movement -> "running" / "driving"
+    Pass motion=summarize_motion(track) if it is already computed.
     """
-    speed, accel, _ = summarize_motion(track)
+    speed, accel, _ = motion if motion is not None else summarize_motion(track)
     lbl = label_hint or track.label
     if speed < 2.0:
         action = "standing" if lbl == "person" else "stopped"
@@ -30,3 +35,19 @@ def heuristic_action(track: Track, label_hint: Optional[str] = None) -> Optional
     conf = min(0.9, max(0.5, conf + min(0.2, abs(accel) / 30.0)))
     return Action(label=action, confidence=conf, source_model="heuristic")
 
+
+def heuristic_action_batch(speed, accel, labels: Sequence[str]) -> List[Action]:
+    """Vectorized heuristic_action over arrays from motion.summarize_motion_batch."""
+    import numpy as np
+
+    speed = np.asarray(speed, dtype=np.float64)
+    accel = np.asarray(accel, dtype=np.float64)
+    person = np.array([lbl == "person" for lbl in labels], dtype=bool)
+    band = np.where(speed < 2.0, 0, np.where(speed < 20.0, 1, 2))
+    conf = np.array([0.55, 0.65, 0.7])[band]
+    conf = np.minimum(0.9, np.maximum(0.5, conf + np.minimum(0.2, np.abs(accel) / 30.0)))
+    names = (("stopped", "standing"), ("moving", "walking"), ("driving", "running"))
+    return [
+        Action(label=names[b][p], confidence=c, source_model="heuristic")
+        for b, p, c in zip(band.tolist(), person.tolist(), conf.tolist())
+    ]
@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import dataclasses
+import json
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .config import Config
+
+VIDEO_EXTS = {".mp4", ".mov", ".avi", ".mkv", ".webm", ".m4v", ".mpg", ".mpeg", ".ts"}
+DONE_MARKER = "_done.json"
+
+# Per-worker state, set by _init_worker so each process loads its detector once
+_WORKER: Dict[str, Any] = {}
+
+
+def discover_inputs(source: str) -> List[Tuple[Path, Path]]:
+    """
+    Return (video_path, relative_output_dir) pairs from a directory (searched recursively for
+    video files) or a manifest file (one path per line, relative to the manifest; '#' comments).
+    """
+    src = Path(source)
+    if src.is_dir():
+        root = src
+        paths = sorted(p for p in src.rglob("*") if p.is_file() and p.suffix.lower() in VIDEO_EXTS)
+    else:
+        root = src.parent
+        paths = []
+        for line in src.read_text(encoding="utf-8").splitlines():
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            p = Path(line)
+            paths.append(p if p.is_absolute() else root / p)
+
+    out: List[Tuple[Path, Path]] = []
+    seen = set()
+    for p in paths:
+        try:
+            rel = p.relative_to(root).with_suffix("")
+        except ValueError:
+            rel = Path(p.stem)
+        base, n = rel, 1
+        while rel in seen:
+            n += 1
+            rel = base.with_name(f"{base.name}_{n}")
+        seen.add(rel)
+        out.append((p, rel))
+    return out
+
+
+def is_complete(out_dir: Path) -> bool:
+    """A clip is complete once process_video returned and the done marker was written."""
+    return (out_dir / DONE_MARKER).exists()
+
+
+def _init_worker(cfg: Config) -> None:
+    from .pipeline import make_detector
+
+    _WORKER["cfg"] = cfg
+    _WORKER["detector"] = make_detector(cfg)
+
+
+def _run_clip(input_path: str, out_dir: str) -> Dict[str, Any]:
+    from .pipeline import process_video
+
+    t0 = time.perf_counter()
+    out = Path(out_dir)
+    try:
+        stats = process_video(input_path, out_dir, _WORKER["cfg"], detector=_WORKER["detector"])
+    except Exception as exc:
+        return {
+            "input": input_path,
+            "ok": False,
+            "error": f"{type(exc).__name__}: {exc}",
+            "traceback": traceback.format_exc(),
+            "seconds": time.perf_counter() - t0,
+        }
+    rec = {"input": input_path, "ok": True, "seconds": time.perf_counter() - t0, **stats}
+    if not stats.get("frames"):
+        # The pipeline treats unreadable inputs as empty; for a batch that is a failure to report
+        rec.update(ok=False, error="no frames decoded")
+        return rec
+    tmp = out / (DONE_MARKER + ".tmp")
+    tmp.write_text(json.dumps(rec, indent=2, default=str), encoding="utf-8")
+    os.replace(tmp, out / DONE_MARKER)
+    return rec
+
+
+def run_batch(
+    source: str,
+    out_root: str,
+    cfg: Config,
+    workers: Optional[int] = None,
+    resume: bool = False,
+) -> Dict[str, Any]:
+    """
+    Run process_video over every clip from `source` on a pool of worker processes, each holding
+    one Detector for its lifetime. Writes per-clip outputs under out_root and an aggregate
+    batch_report.json (clips/s, frames/s, failures); with resume, complete clips are skipped
+    and interrupted ones continue from their checkpoint.
+    """
+    root = Path(out_root)
+    root.mkdir(parents=True, exist_ok=True)
+    if resume:
+        cfg = dataclasses.replace(cfg, resume=True)
+    clips = discover_inputs(source)
+    todo = []
+    skipped = 0
+    for path, rel in clips:
+        out_dir = root / rel
+        if resume and is_complete(out_dir):
+            skipped += 1
+            continue
+        todo.append((str(path), str(out_dir)))
+
+    # Processes actually started: never more than there are clips to run
+    workers = min(workers or max(1, (os.cpu_count() or 2) // 2), len(todo))
+    results: List[Dict[str, Any]] = []
+    t0 = time.perf_counter()
+    if todo:
+        # spawn: fresh interpreters, so no forked torch/OpenCV thread state
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(cfg,),
+        ) as pool:
+            futures = {pool.submit(_run_clip, inp, out): inp for inp, out in todo}
+            for fut in as_completed(futures):
+                try:
+                    results.append(fut.result())
+                except Exception as exc:
+                    # A worker died (OOM kill, crash in native code): every clip it took down fails
+                    results.append({"input": futures[fut], "ok": False, "error": f"{type(exc).__name__}: {exc}"})
+    elapsed = time.perf_counter() - t0
+
+    ok = [r for r in results if r["ok"]]
+    failed = [r for r in results if not r["ok"]]
+    frames = sum(r.get("frames", 0) for r in ok)
+    report = {
+        "clips_total": len(clips),
+        "clips_processed": len(ok),
+        "clips_failed": len(failed),
+        "clips_skipped": skipped,
+        "workers": workers,
+        "seconds": elapsed,
+        "clips_per_s": len(ok) / elapsed if elapsed > 0 else 0.0,
+        "frames": frames,
+        "frames_per_s": frames / elapsed if elapsed > 0 else 0.0,
+        "failures": [{"input": r["input"], "error": r["error"]} for r in failed],
+    }
+    (root / "batch_report.json").write_text(json.dumps(report, indent=2), encoding="utf-8")
+    return report
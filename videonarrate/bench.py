@@ -0,0 +1,864 @@
+from __future__ import annotations
+
+import argparse
+import itertools
+import time
+from typing import Dict, List, Optional, Tuple
+
+from .decode import SAMPLERS, open_video
+from .schemas import BBox, Entity
+from .track import Track, make_tracker
+
+
+def bench_decode(
+    path: str,
+    fps: int,
+    samplers: Optional[List[str]] = None,
+    max_frames: Optional[int] = None,
+    max_side: Optional[int] = None,
+) -> List[Dict[str, float]]:
+    """Time each cv2 sampler and the ffmpeg backend over the same file and report sampled frames per second."""
+    rows: List[Dict[str, float]] = []
+    variants = [("cv2", s) for s in (samplers or list(SAMPLERS))] + [("ffmpeg", "-")]
+    for backend, sampler in variants:
+        n = 0
+        last_t = 0.0
+        t0 = time.perf_counter()
+        frames, _ = open_video(path, fps, backend=backend, sampler=sampler if backend == "cv2" else "grab", max_side=max_side)
+        for _, t, _ in frames:
+            n += 1
+            last_t = t
+            if max_frames is not None and n >= max_frames:
+                break
+        elapsed = time.perf_counter() - t0
+        rows.append({
+            "backend": backend,
+            "sampler": sampler,
+            "frames": n,
+            "seconds": elapsed,
+            "frames_per_s": n / elapsed if elapsed > 0 else 0.0,
+            "last_t": last_t,
+        })
+    return rows
+
+
+def _moving_boxes(n: int, steps: int, seed: int = 0) -> List[List[Entity]]:
+    """n non-overlapping boxes on a grid drifting a few pixels per step, as per-frame detections."""
+    import random
+
+    rng = random.Random(seed)
+    cols = max(1, int(n ** 0.5))
+    base = [((i % cols) * 60.0, (i // cols) * 60.0) for i in range(n)]
+    vel = [(rng.uniform(-2, 2), rng.uniform(-2, 2)) for _ in range(n)]
+    labels = ["person", "car"]
+    frames = []
+    for k in range(steps):
+        frames.append([
+            Entity(id=i + 1, label=labels[i % 2], bbox=BBox(x + vx * k, y + vy * k, 40.0, 40.0), score=0.9)
+            for i, ((x, y), (vx, vy)) in enumerate(zip(base, vel))
+        ])
+    return frames
+
+
+def bench_tracker(sizes: Optional[List[int]] = None, steps: int = 20, trackers: Optional[List[str]] = None) -> List[Dict[str, float]]:
+    """Per-step tracker cost with 10..1000 simultaneous objects."""
+    import numpy  # noqa: F401  keep the import out of the first timing
+    rows: List[Dict[str, float]] = []
+    for n in sizes or [10, 100, 300, 1000]:
+        frames = _moving_boxes(n, steps)
+        for name in trackers or ["simple", "vector"]:
+            tracker = make_tracker(name)
+            t0 = time.perf_counter()
+            for k, dets in enumerate(frames):
+                tracker.step(k, k / 8.0, dets)
+            elapsed = time.perf_counter() - t0
+            rows.append({
+                "tracker": name,
+                "objects": n,
+                "tracks": len(tracker.tracks),
+                "ms_per_step": 1000.0 * elapsed / steps,
+            })
+    return rows
+
+
+def bench_motion(sizes: Optional[List[int]] = None, steps: int = 20) -> List[Dict[str, float]]:
+    """Per-window motion+action cost, per-track functions vs TrackTable batch; asserts exact parity."""
+    from .actions import heuristic_action, heuristic_action_batch
+    from .motion import summarize_motion, summarize_motion_batch
+    from .tracktable import TrackTable
+
+    rows: List[Dict[str, float]] = []
+    for n in sizes or [10, 100, 300, 1000]:
+        table = TrackTable()
+        tracker = make_tracker("vector", max_history=6, evict_dead=True, table=table)
+        tracks = []
+        for k, dets in enumerate(_moving_boxes(n, steps)):
+            tracks = tracker.step(k, k / 8.0, dets)
+
+        t0 = time.perf_counter()
+        motions = [summarize_motion(tr) for tr in tracks]
+        actions = [heuristic_action(tr, motion=m) for tr, m in zip(tracks, motions)]
+        scalar_s = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        speeds, accels, directions = summarize_motion_batch(table, [tr.id for tr in tracks])
+        batch_actions = heuristic_action_batch(speeds, accels, [tr.label for tr in tracks])
+        batch_s = time.perf_counter() - t0
+
+        if motions != list(zip(speeds.tolist(), accels.tolist(), directions)) or actions != batch_actions:
+            raise AssertionError(f"batch motion/action output differs from per-track heuristics at n={n}")
+        rows.append({
+            "tracks": n,
+            "per_track_ms": 1000.0 * scalar_s,
+            "batch_ms": 1000.0 * batch_s,
+            "parity": "ok",
+        })
+    return rows
+
+
+def _scatter_tracks(n: int, density: float = 1.0, seed: int = 0) -> List[Track]:
+    """n tracks with mixed labels and sizes scattered so that `density` sets the mean neighbour count."""
+    import random
+
+    rng = random.Random(seed)
+    side = 60.0 * (n / max(1e-6, density)) ** 0.5
+    labels = ["person", "car", "bicycle", "bus"]
+    tracks = []
+    for i in range(n):
+        w, h = rng.uniform(20, 60), rng.uniform(20, 80)
+        bbox = BBox(rng.uniform(0, side), rng.uniform(0, side), w, h)
+        tracks.append(Track(id=i + 1, label=labels[i % len(labels)], bbox=bbox, score=0.9))
+    return tracks
+
+
+def bench_graph(sizes: Optional[List[int]] = None, repeat: int = 3) -> List[Dict[str, float]]:
+    """infer_interactions (grid) vs the all-pairs scan; asserts identical output."""
+    from .graph import _infer_interactions_all_pairs, infer_interactions
+
+    rows: List[Dict[str, float]] = []
+    for n in sizes or [10, 100, 300, 1000, 3000]:
+        tracks = _scatter_tracks(n)
+        timings = {}
+        outs = {}
+        for name, fn in (("all_pairs", _infer_interactions_all_pairs), ("grid", infer_interactions)):
+            t0 = time.perf_counter()
+            for _ in range(repeat):
+                outs[name] = fn(tracks)
+            timings[name] = 1000.0 * (time.perf_counter() - t0) / repeat
+        if outs["all_pairs"] != outs["grid"]:
+            raise AssertionError(f"grid interactions differ from all-pairs scan at n={n}")
+        rows.append({
+            "tracks": n,
+            "pairs": len(outs["grid"]),
+            "all_pairs_ms": timings["all_pairs"],
+            "grid_ms": timings["grid"],
+        })
+    return rows
+
+
+def bench_shard(path: str, fps: int, shards: Optional[List[int]] = None, detector: str = "synthetic", max_seconds: Optional[float] = None) -> List[Dict[str, float]]:
+    """
+    Run one video serially and with each shard count, reporting wall time, speedup over serial
+    and whether events.jsonl and captions.srt are byte-identical to the serial run.
+    """
+    import dataclasses
+    import tempfile
+    from pathlib import Path
+
+    from .config import Config
+    from .pipeline import process_video
+
+    base = Config(fps=fps, detector=detector, max_seconds=max_seconds)
+    rows: List[Dict[str, float]] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        ref = Path(tmp) / "serial"
+        t0 = time.perf_counter()
+        stats = process_video(path, str(ref), base)
+        serial_s = time.perf_counter() - t0
+        rows.append({"shards": 1, "frames": stats["frames"], "events": stats["events"], "seconds": serial_s, "speedup": 1.0, "identical": True})
+        for n in shards or [2, 4]:
+            out = Path(tmp) / f"shards{n}"
+            t0 = time.perf_counter()
+            stats = process_video(path, str(out), dataclasses.replace(base, shards=n))
+            elapsed = time.perf_counter() - t0
+            identical = all((out / name).read_bytes() == (ref / name).read_bytes() for name in ("events.jsonl", "captions.srt"))
+            rows.append({
+                "shards": n,
+                "frames": stats["frames"],
+                "events": stats["events"],
+                "seconds": elapsed,
+                "speedup": serial_s / elapsed if elapsed > 0 else 0.0,
+                "identical": identical,
+            })
+    return rows
+
+
+def bench_pool(path: str, fps: int, workers: Optional[List[int]] = None, detector: str = "synthetic", max_seconds: Optional[float] = None) -> List[Dict[str, float]]:
+    """
+    Run one video with in-process detection and with each detector pool size, reporting
+    frames/s, speedup and whether events.jsonl and captions.srt match the in-process run.
+    """
+    import dataclasses
+    import tempfile
+    from pathlib import Path
+
+    from .config import Config
+    from .pipeline import process_video
+
+    base = Config(fps=fps, detector=detector, max_seconds=max_seconds, metrics=False)
+    rows: List[Dict[str, float]] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        ref = Path(tmp) / "inproc"
+        base_s = None
+        for n in [1] + [w for w in workers or [2, 4] if w > 1]:
+            out = Path(tmp) / f"workers{n}" if n > 1 else ref
+            t0 = time.perf_counter()
+            stats = process_video(path, str(out), dataclasses.replace(base, detect_workers=n))
+            elapsed = time.perf_counter() - t0
+            if base_s is None:
+                base_s = elapsed
+            rows.append({
+                "workers": n,
+                "frames": stats["frames"],
+                "seconds": elapsed,
+                "fps": stats["frames"] / elapsed if elapsed > 0 else 0.0,
+                "speedup": base_s / elapsed if elapsed > 0 else 0.0,
+                "identical": all((out / name).read_bytes() == (ref / name).read_bytes() for name in ("events.jsonl", "captions.srt")),
+            })
+    return rows
+
+
+def bench_coalesce(
+    path: str, fps: int, detector: str = "synthetic", max_seconds: Optional[float] = None, max_spans: Optional[List[float]] = None
+) -> List[Dict[str, float]]:
+    """
+    Run one video with the per-window event stream and with coalesced spans (for each max span
+    length), reporting events, output bytes and wall time, and the share of window events
+    that fall inside a span of the same track or pair (coverage, which should be 1.0).
+    """
+    import dataclasses
+    import json
+    import tempfile
+    from pathlib import Path
+
+    from .config import Config
+    from .pipeline import process_video
+
+    def load(p: Path) -> List[Dict]:
+        with p.open(encoding="utf-8") as f:
+            return [json.loads(line) for line in f]
+
+    def key(e: Dict) -> tuple:
+        return (tuple(s["id"] for s in e["subjects"]), tuple(o["id"] for o in e["objects"]), bool(e["interaction"]))
+
+    base = Config(fps=fps, detector=detector, max_seconds=max_seconds, metrics=False, coalesce=False)
+    rows: List[Dict[str, float]] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        ref = Path(tmp) / "raw"
+        raw = None
+        for span in [None] + list(max_spans or [30.0]):
+            out = Path(tmp) / f"span{span}" if span is not None else ref
+            cfg = dataclasses.replace(base, coalesce=True, coalesce_max_span=span) if span is not None else base
+            t0 = time.perf_counter()
+            stats = process_video(path, str(out), cfg)
+            elapsed = time.perf_counter() - t0
+            events = load(out / "events.jsonl")
+            if raw is None:
+                raw = events
+            by_key: Dict[tuple, List[tuple]] = {}
+            for e in events:
+                by_key.setdefault(key(e), []).append((e["start"], e["end"]))
+            covered = sum(any(s <= e["start"] + 1e-9 and e["end"] <= t + 1e-9 for s, t in by_key.get(key(e), ())) for e in raw)
+            rows.append({
+                "mode": "raw" if span is None else f"spans max={span:g}s",
+                "events": stats["events"],
+                "events_kb": (out / "events.jsonl").stat().st_size / 1024.0,
+                "srt_kb": (out / "captions.srt").stat().st_size / 1024.0,
+                "seconds": elapsed,
+                "coverage": covered / len(raw) if raw else 1.0,
+            })
+    return rows
+
+
+def bench_scales(
+    path: str, fps: int, scales: List[Tuple[float, float]], detector: str = "synthetic", max_seconds: Optional[float] = None,
+) -> List[Dict[str, float]]:
+    """One run narrating every scale at once against one run per scale (the primary window set to that scale), by wall time."""
+    import dataclasses
+    import tempfile
+    from pathlib import Path
+
+    from .config import Config
+    from .pipeline import process_video
+
+    base = Config(fps=fps, detector=detector, max_seconds=max_seconds, metrics=False)
+    rows: List[Dict[str, float]] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        t0 = time.perf_counter()
+        stats = process_video(path, str(Path(tmp) / "single"), dataclasses.replace(base, scales=scales))
+        single_s = time.perf_counter() - t0
+        rows.append({"run": f"one pass, {len(scales)} scales", "frames": stats["frames"], "seconds": single_s, "speedup": 1.0})
+        separate_s = 0.0
+        for k, (w, s) in enumerate(scales):
+            t0 = time.perf_counter()
+            process_video(path, str(Path(tmp) / f"scale{k}"), dataclasses.replace(base, window=w, stride=s))
+            separate_s += time.perf_counter() - t0
+        rows.append({"run": f"{len(scales)} separate runs", "frames": stats["frames"] * len(scales), "seconds": separate_s,
+                     "speedup": separate_s / single_s if single_s > 0 else 0.0})
+    return rows
+
+
+def bench_scale_cost(
+    windows: List[float], stride: float = 1.0, entities: int = 60, seconds: float = 120.0, fps: int = 8
+) -> List[Dict[str, float]]:
+    """
+    Cost of the multi-scale window engine (window closes included) as the window grows, on a
+    pre-tracked synthetic stream of `entities` objects. Longer windows report more tracks
+    (all that passed through), so the cost per reported event is what should stay flat.
+    """
+    import tempfile
+    from pathlib import Path
+
+    from .config import Config
+    from .scales import ScaleWindows
+    from .synthetic import SyntheticScene
+
+    scene = SyntheticScene(entities=entities, seed=1)
+    tracker = make_tracker("simple")
+    stream = []
+    for fi in range(0, int(seconds * 30), max(1, 30 // fps)):
+        ents = [Entity(id=k + 1, label=label, bbox=bbox, score=score) for k, (label, bbox, score) in enumerate(scene.detections(fi))]
+        stream.append((fi, fi / 30.0, list(tracker.step(fi, fi / 30.0, ents))))
+    cfg = Config(coalesce=False, write_index=False, flush_interval=None)
+    rows: List[Dict[str, float]] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for w in windows:
+            sw = ScaleWindows(cfg, Path(tmp) / f"w{w:g}", [(w, stride)])
+            t0 = time.perf_counter()
+            for fi, t, tracks in stream:
+                sw.push(fi, t, tracks)
+            elapsed = time.perf_counter() - t0
+            sw.close()
+            n = sw.scales[0].windows
+            events = sw.scales[0].sinks.events_written
+            rows.append({
+                "window": w,
+                "windows": n,
+                "events_per_window": events / max(1, n),
+                "us_per_frame": 1e6 * elapsed / max(1, len(stream)),
+                "us_per_event": 1e6 * elapsed / max(1, events),
+            })
+    return rows
+
+
+def _onnx_fixture_check(tmp: str, threads: Optional[int]) -> List[Dict[str, float]]:
+    """Decode a fixture model's fixed predictions and compare with the boxes worked out by hand."""
+    import numpy as np
+
+    from .detect import Detector
+    from .onnxdetect import write_fixture_model
+
+    path = f"{tmp}/fixture.onnx"
+    # (cx, cy, w, h, class, score) in the 64x64 letterboxed input; a 128x96 frame maps to it at
+    # gain 0.5 with 8 px of padding on top and bottom
+    write_fixture_model(path, [
+        (16, 24, 8, 8, 0, 0.9),
+        (17, 24, 8, 8, 0, 0.8),  # same class, IoU 0.78 with the first: suppressed
+        (17, 24, 8, 8, 1, 0.7),  # other class: kept
+        (40, 30, 8, 8, 0, 0.2),  # under min_conf
+        (62, 52, 8, 8, 1, 0.6),  # runs off the frame's right edge: clipped
+    ], names={0: "person", 1: "car"}, size=64)
+    expected = [("person", (32, 32, 16, 16), 0.9), ("car", (34, 32, 16, 16), 0.7), ("car", (122, 88, 12, 16), 0.6)]
+    frame = np.zeros((96, 128, 3), dtype=np.uint8)
+    other = np.zeros((200, 100, 3), dtype=np.uint8)
+    rows: List[Dict[str, float]] = []
+    for allowed in (None, {"car"}):
+        det = Detector("onnx", min_conf=0.25, allowed_labels=allowed, weights=path, threads=threads)
+        # A frame of another size in between must not leave stale padding in the reused buffers
+        first, _, again = det.infer_batch([frame, other, frame])
+        want = [e for e in expected if allowed is None or e[0] in allowed]
+        got = [(e.label, (e.bbox.x, e.bbox.y, e.bbox.w, e.bbox.h), e.score) for e in first]
+        ok = (
+            len(got) == len(want)
+            and all(g[0] == w[0] and np.allclose(g[1], w[1], atol=1e-4) and abs(g[2] - w[2]) < 1e-6 for g, w in zip(got, want))
+            and [(e.label, e.bbox, e.score) for e in first] == [(e.label, e.bbox, e.score) for e in again]
+        )
+        rows.append({"check": "fixture" if allowed is None else "fixture allowed=car", "expected": len(want), "detections": len(got), "ok": ok})
+    return rows
+
+
+def bench_onnx(
+    model: Optional[str] = None,
+    path: Optional[str] = None,
+    fps: int = 8,
+    max_frames: Optional[int] = 100,
+    threads: Optional[int] = None,
+    weights_pt: Optional[str] = None,
+    min_conf: float = 0.25,
+) -> List[Dict[str, float]]:
+    """
+    Without a model: build the tiny fixture model and check the onnx backend's decoding
+    (letterbox inverse, confidence filter, class-aware NMS, clipping, allowed labels) against
+    boxes worked out by hand. With an exported model and an input video: ms per frame of the
+    onnx backend and, when ultralytics is installed, of the yolov8-seg backend on weights_pt,
+    with how well the onnx boxes agree with it (same-label matches at IoU 0.5).
+    """
+    import tempfile
+
+    from .detect import Detector
+
+    if model is None:
+        with tempfile.TemporaryDirectory() as tmp:
+            return _onnx_fixture_check(tmp, threads)
+    frames = [f.copy() for _, _, f in itertools.islice(open_video(path, fps)[0], max_frames)]
+    backends = [("onnx", Detector("onnx", min_conf=min_conf, weights=model, threads=threads))]
+    ref = Detector("yolov8-seg", min_conf=min_conf, weights=weights_pt)
+    if ref._impl is not None:
+        backends.append(("yolov8-seg", ref))
+    results: Dict[str, List] = {}
+    rows: List[Dict[str, float]] = []
+    for name, det in backends:
+        if det._impl is None:
+            raise RuntimeError(f"Cannot load the {name} backend (missing package or model file)")
+        det.infer(frames[0])  # warm-up
+        t0 = time.perf_counter()
+        results[name] = [det.infer(f) for f in frames]
+        elapsed = time.perf_counter() - t0
+        rows.append({
+            "backend": name,
+            "frames": len(frames),
+            "ms_per_frame": 1000.0 * elapsed / max(1, len(frames)),
+            "detections": sum(len(d) for d in results[name]),
+        })
+    if "yolov8-seg" in results:
+        matched = iou_sum = 0.0
+        for got, want in zip(results["onnx"], results["yolov8-seg"]):
+            ious = _match_truth(got, [(e.label, e.bbox) for e in want])
+            matched += len(ious)
+            iou_sum += sum(ious)
+        n_ref = rows[1]["detections"]
+        n_onnx = rows[0]["detections"]
+        rows[0].update(recall=matched / n_ref if n_ref else 1.0, precision=matched / n_onnx if n_onnx else 1.0,
+                       mean_iou=iou_sum / matched if matched else 0.0)
+        rows[1].update(recall=1.0, precision=1.0, mean_iou=1.0)
+    return rows
+
+
+def _best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def bench_stages(
+    sizes: Optional[List[int]] = None,
+    seconds: float = 10.0,
+    fps: int = 8,
+    seed: int = 0,
+    repeat: int = 3,
+) -> List[Dict[str, float]]:
+    """
+    Time each stage on synthetic scenes of each entity count: decode and detect over a rendered
+    video, then SimpleTracker.step, summarize_motion, infer_interactions and write_jsonl over
+    the tracked result. Reported as best-of-`repeat` milliseconds per sampled frame.
+    """
+    import tempfile
+    from pathlib import Path
+
+    from .detect import Detector
+    from .graph import infer_interactions
+    from .io import write_jsonl
+    from .motion import summarize_motion
+    from .schemas import Event, Motion
+    from .synthetic import write_scene_video
+
+    rows: List[Dict[str, float]] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in sizes or [10, 50, 200]:
+            path = str(Path(tmp) / f"scene{n}.mp4")
+            write_scene_video(path, seconds=seconds, entities=n, width=640, height=360, box=16, seed=seed)
+            decoded: List = []
+
+            def decode():
+                decoded[:] = [(i, t, f.copy()) for i, t, f in open_video(path, fps)[0]]
+
+            timings = {"decode": _best_of(decode, repeat)}
+            detector = Detector("synthetic", min_conf=0.0)
+            dets: List = []
+
+            def detect():
+                dets[:] = [(i, t, detector.infer(f)) for i, t, f in decoded]
+
+            timings["detect"] = _best_of(detect, repeat)
+            snapshots: List = []
+
+            def track():
+                tracker = make_tracker("simple", max_history=6, evict_dead=True)
+                snapshots[:] = [(t, tracker.step(i, t, ents)) for i, t, ents in dets]
+
+            timings["track"] = _best_of(track, repeat)
+            motions: List = []
+
+            def motion():
+                motions[:] = [[summarize_motion(tr) for tr in tracks] for _, tracks in snapshots]
+
+            timings["motion"] = _best_of(motion, repeat)
+            timings["graph"] = _best_of(lambda: [infer_interactions(tracks) for _, tracks in snapshots], repeat)
+            events = [
+                Event(start=t, end=t, subjects=[Entity(id=tr.id, label=tr.label, bbox=tr.bbox, score=tr.score)],
+                      motion=Motion(direction=d, speed=sp, accel=ac))
+                for (t, tracks), ms in zip(snapshots, motions) for tr, (sp, ac, d) in zip(tracks, ms)
+            ]
+            out = Path(tmp) / "events.jsonl"
+            timings["write"] = _best_of(lambda: write_jsonl(events, out), repeat)
+
+            frames = max(1, len(decoded))
+            for stage, elapsed in timings.items():
+                rows.append({
+                    "stage": stage,
+                    "entities": n,
+                    "frames": len(decoded),
+                    "ms_per_frame": 1000.0 * elapsed / frames,
+                })
+    return rows
+
+
+def _match_truth(tracks, truth, threshold: float = 0.5):
+    """Same-label IoU matches between reported track boxes and ground-truth (label, bbox) pairs; returns their IoUs."""
+    from .track import _assign_greedy, iou_matrix
+
+    ious: List[float] = []
+    for label in {lb for lb, _ in truth}:
+        gt = [(b.x, b.y, b.w, b.h) for lb, b in truth if lb == label]
+        pred = [(b.x, b.y, b.w, b.h) for b in (tr.bbox for tr in tracks if tr.label == label)]
+        if not pred:
+            continue
+        ov = iou_matrix(pred, gt)
+        ious.extend(float(ov[r, c]) for r, c in _assign_greedy(ov, threshold))
+    return ious
+
+
+def bench_gate(
+    sizes: Optional[List[int]] = None,
+    thresholds: Optional[List[float]] = None,
+    every: int = 8,
+    seconds: float = 20.0,
+    fps: int = 8,
+    seed: int = 0,
+    detect_cost_ms: float = 0.0,
+    min_conf: float = 0.25,
+    pause: Optional[tuple] = (2.0, 4.0),
+    coasts: Optional[List[str]] = None,
+) -> List[Dict[str, float]]:
+    """
+    Motion gate accuracy vs speed on synthetic scenes of each entity count, which by default
+    alternate 2 s of motion with 4 s standing still (see write_scene_video's pause): detection
+    on every frame ("off") against the gate at each threshold. Each sampled frame's reported
+    track boxes (tracks detected or carried on it) are matched to the ground truth of the scene
+    frame in its tag at IoU 0.5 for recall, precision and mean IoU. Each threshold runs with each
+    tracker coast mode ("hold", "velocity") for skipped frames. detect_cost_ms adds a sleep
+    per detected frame to stand in for a real model, since the synthetic detector itself costs
+    next to nothing.
+    """
+    import tempfile
+    from pathlib import Path
+
+    from .detect import Detector
+    from .gate import MotionGate
+    from .synthetic import TAG_REGION, read_tag, write_scene_video
+
+    rows: List[Dict[str, float]] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in sizes or [2, 8, 30]:
+            path = str(Path(tmp) / f"scene{n}.mp4")
+            scene = write_scene_video(path, seconds=seconds, entities=n, width=640, height=360, box=16, seed=seed, pause=pause)
+            base_s: Optional[float] = None
+            settings = [(None, "hold")] + [(th, c) for th in thresholds or [0.02, 0.05, 0.1] for c in coasts or ["hold", "velocity"]]
+            for threshold, coast in settings:
+                detector = Detector("synthetic", min_conf=min_conf)
+
+                def detect_batch(frames):
+                    if detect_cost_ms:
+                        time.sleep(detect_cost_ms * len(frames) / 1000.0)
+                    return detector.infer_batch(frames, next_entity_id_start=1)
+
+                gate = None
+                if threshold is not None:
+                    # The frame tag changes on every frame and would trip the gate
+                    gate = MotionGate(threshold=threshold, every=every, ignore=[TAG_REGION])
+                    detect_batch = gate.wrap(detect_batch)
+                tracker = make_tracker("simple", max_history=6, evict_dead=True, coast=coast)
+                frames = truths = matched = reported = 0
+                iou_sum = 0.0
+                t0 = time.perf_counter()
+                for i, t, f in open_video(path, fps)[0]:
+                    tracks = tracker.step(i, t, detect_batch([f])[0])
+                    current = [tr for tr in tracks if tr.history and tr.history[-1][0] == i]
+                    tag = read_tag(f)
+                    truth = [(lb, b) for lb, b, score in scene.detections(tag[0]) if score >= min_conf] if tag is not None else []
+                    ious = _match_truth(current, truth)
+                    frames += 1
+                    truths += len(truth)
+                    reported += len(current)
+                    matched += len(ious)
+                    iou_sum += sum(ious)
+                elapsed = time.perf_counter() - t0
+                if base_s is None:
+                    base_s = elapsed
+                st = gate.stats() if gate is not None else {"detected": frames, "skip_ratio": 0.0}
+                rows.append({
+                    "entities": n,
+                    "threshold": threshold if threshold is not None else "off",
+                    "coast": coast if threshold is not None else "-",
+                    "frames": frames,
+                    "detect_calls": st["detected"],
+                    "skipped_pct": 100.0 * st["skip_ratio"],
+                    "seconds": elapsed,
+                    "speedup": base_s / elapsed if elapsed > 0 else 0.0,
+                    "recall": matched / truths if truths else 1.0,
+                    "precision": matched / reported if reported else 1.0,
+                    "mean_iou": iou_sum / matched if matched else 0.0,
+                })
+    return rows
+
+
+def bench_shots(
+    sizes: Optional[List[Tuple[int, int]]] = None,
+    fps: int = 8,
+    threshold: float = 0.1,
+    shots: Optional[List[Tuple[float, int, int]]] = None,
+) -> List[Dict[str, float]]:
+    """
+    Shot-boundary detection on an edited synthetic video (see write_shots_video) at each frame
+    size: cuts found against the true ones (within one sampled frame), the detector's cost per
+    frame next to decode's, and how many events span a cut with detection off and on (each
+    is a track matched across the cut, or a window or span mixing two shots).
+    """
+    import dataclasses
+    import json
+    import tempfile
+    from pathlib import Path
+
+    from .config import Config
+    from .pipeline import process_video
+    from .shots import ShotDetector
+    from .synthetic import write_shots_video
+
+    shots = shots or [(6.0, 1, 96), (4.0, 2, 150), (8.0, 3, 60), (3.0, 4, 200), (7.0, 5, 110)]
+    base = Config(fps=fps, detector="synthetic", metrics=False, shot_threshold=threshold)
+    rows: List[Dict[str, float]] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for width, height in sizes or [(640, 360), (1280, 720)]:
+            path = str(Path(tmp) / f"shots{width}.mp4")
+            truth = write_shots_video(path, shots, entities=20, width=width, height=height, box=max(8, width // 40))
+            detector = ShotDetector(threshold=threshold, min_len=base.shot_min_len)
+            frames = 0
+            t0 = time.perf_counter()
+            for i, t, f in open_video(path, fps)[0]:
+                detector.check(i, t, f)
+                frames += 1
+            elapsed = time.perf_counter() - t0
+            found = [t for _, t, _ in detector.cuts]
+            hits = sum(any(abs(c - t) <= 1.0 / fps for t in found) for c in truth)
+            crossing = []
+            run_s = []
+            for on in (False, True):
+                out = Path(tmp) / f"out{width}_{on}"
+                t0 = time.perf_counter()
+                process_video(path, str(out), dataclasses.replace(base, shot_detect=on))
+                run_s.append(time.perf_counter() - t0)
+                with (out / "events.jsonl").open(encoding="utf-8") as f:
+                    events = [json.loads(line) for line in f]
+                crossing.append(sum(any(e["start"] < c < e["end"] for c in truth) for e in events))
+            shot_ms = 1000.0 * detector.seconds / max(1, frames)
+            rows.append({
+                "size": f"{width}x{height}",
+                "frames": frames,
+                "cuts": len(truth),
+                "found": len(found),
+                "recall": hits / len(truth) if truth else 1.0,
+                "precision": hits / len(found) if found else 1.0,
+                "decode_ms": 1000.0 * (elapsed - detector.seconds) / max(1, frames),
+                "shots_us": 1000.0 * shot_ms,
+                "run_ms_off": 1000.0 * run_s[0] / max(1, frames),
+                "run_ms_on": 1000.0 * run_s[1] / max(1, frames),
+                "crossing_off": crossing[0],
+                "crossing_on": crossing[1],
+            })
+    return rows
+
+
+def compare_to_baseline(rows: List[Dict[str, float]], baseline: List[Dict[str, float]], tolerance: float = 0.25) -> List[Dict[str, float]]:
+    """Annotate stage rows with the baseline timing and flag those more than `tolerance` slower."""
+    ref = {(r["stage"], r["entities"]): r["ms_per_frame"] for r in baseline}
+    out = []
+    for r in rows:
+        base = ref.get((r["stage"], r["entities"]))
+        ratio = r["ms_per_frame"] / base if base else None
+        if ratio is None:
+            status = "new"
+        elif ratio > 1.0 + tolerance:
+            status = "SLOWER"
+        elif ratio < 1.0 / (1.0 + tolerance):
+            status = "faster"
+        else:
+            status = "ok"
+        out.append({**r, "baseline_ms": base if base is not None else "-", "ratio": ratio if ratio is not None else "-", "status": status})
+    return out
+
+
+def _print_rows(rows: List[Dict[str, float]]) -> None:
+    if not rows:
+        return
+    keys = list(rows[0].keys())
+    print("\t".join(keys))
+    for r in rows:
+        print("\t".join(f"{r[k]:.3f}" if isinstance(r[k], float) else str(r[k]) for k in keys))
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    p = argparse.ArgumentParser(prog="videonarrate.bench", description="Micro-benchmarks for pipeline stages.")
+    sub = p.add_subparsers(dest="cmd", required=True)
+    d = sub.add_parser("decode", help="Compare decode samplers")
+    d.add_argument("--input", required=True)
+    d.add_argument("--fps", type=int, default=8)
+    d.add_argument("--max-frames", type=int, default=None)
+    d.add_argument("--max-side", type=int, default=None)
+    tr = sub.add_parser("tracker", help="Compare tracker step cost across object counts")
+    tr.add_argument("--sizes", default="10,100,300,1000")
+    tr.add_argument("--steps", type=int, default=20)
+    mo = sub.add_parser("motion", help="Per-track vs batch motion/action cost (with parity check)")
+    mo.add_argument("--sizes", default="10,100,300,1000")
+    gr = sub.add_parser("graph", help="Grid vs all-pairs interaction search")
+    gr.add_argument("--sizes", default="10,100,300,1000,3000")
+    sh = sub.add_parser("shard", help="Serial vs sharded single-video run (speedup and output parity)")
+    sh.add_argument("--input", required=True)
+    sh.add_argument("--fps", type=int, default=8)
+    sh.add_argument("--shards", default="2,4")
+    sh.add_argument("--detector", default="synthetic", choices=["yolov8-seg", "onnx", "synthetic", "mock"])
+    sh.add_argument("--max-seconds", type=float, default=None)
+    po = sub.add_parser("pool", help="In-process vs detector pool sizes (frames/s and output parity)")
+    po.add_argument("--input", required=True)
+    po.add_argument("--fps", type=int, default=8)
+    po.add_argument("--workers", default="2,4")
+    po.add_argument("--detector", default="synthetic", choices=["yolov8-seg", "onnx", "synthetic", "mock"])
+    po.add_argument("--max-seconds", type=float, default=None)
+    co = sub.add_parser("coalesce", help="Per-window events vs coalesced spans (output size, time and coverage)")
+    co.add_argument("--input", required=True)
+    co.add_argument("--fps", type=int, default=8)
+    co.add_argument("--max-spans", default="30,10", help="Comma-separated span limits in seconds")
+    co.add_argument("--detector", default="synthetic", choices=["yolov8-seg", "onnx", "synthetic", "mock"])
+    co.add_argument("--max-seconds", type=float, default=None)
+    ms = sub.add_parser("scales", help="Multi-scale windows in one pass vs one run per scale, and window close cost")
+    ms.add_argument("--input", required=True)
+    ms.add_argument("--fps", type=int, default=8)
+    ms.add_argument("--scales", default="1:0.5,5:2,30:10", help="Comma-separated window:stride pairs in seconds")
+    ms.add_argument("--detector", default="synthetic", choices=["yolov8-seg", "onnx", "synthetic", "mock"])
+    ms.add_argument("--max-seconds", type=float, default=None)
+    ox = sub.add_parser("onnx", help="ONNX backend: fixture decode check, or speed and agreement with ultralytics on a video")
+    ox.add_argument("--model", default=None, help="Exported YOLO .onnx; omit to run the built-in fixture check")
+    ox.add_argument("--input", default=None, help="Video to benchmark on (with --model)")
+    ox.add_argument("--weights", default=None, help="Ultralytics weights to compare against (default yolov8s-seg.pt)")
+    ox.add_argument("--fps", type=int, default=8)
+    ox.add_argument("--max-frames", type=int, default=100)
+    ox.add_argument("--threads", type=int, default=None)
+    st = sub.add_parser("stages", help="Per-stage timings on synthetic scenes, with baseline save/compare")
+    st.add_argument("--sizes", default="10,50,200")
+    st.add_argument("--seconds", type=float, default=10.0)
+    st.add_argument("--fps", type=int, default=8)
+    st.add_argument("--repeat", type=int, default=3)
+    st.add_argument("--save", default=None, help="Write results as a JSON baseline")
+    st.add_argument("--compare", default=None, help="Baseline JSON to compare against; exits 1 on slowdowns")
+    st.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown fraction before a stage is flagged")
+    ga = sub.add_parser("gate", help="Motion-gated detection: detector calls, speed and accuracy vs ground truth")
+    ga.add_argument("--sizes", default="2,8,30")
+    ga.add_argument("--thresholds", default="0.02,0.05,0.1")
+    ga.add_argument("--every", type=int, default=8)
+    ga.add_argument("--seconds", type=float, default=20.0)
+    ga.add_argument("--fps", type=int, default=8)
+    ga.add_argument("--pause", default="2,4", help="RUN,HOLD seconds of scene motion and stillness; 0 for a scene that never stops")
+    ga.add_argument("--detect-cost-ms", type=float, default=0.0, help="Simulated detector cost per detected frame")
+    sb = sub.add_parser("shots", help="Shot-boundary detection: accuracy, cost per frame and events spanning cuts")
+    sb.add_argument("--sizes", default="640x360,1280x720")
+    sb.add_argument("--fps", type=int, default=8)
+    sb.add_argument("--threshold", type=float, default=0.1)
+    sc = sub.add_parser("scene", help="Render a synthetic scene video for the synthetic detector")
+    sc.add_argument("--out", required=True)
+    sc.add_argument("--entities", type=int, default=20)
+    sc.add_argument("--seconds", type=float, default=10.0)
+    sc.add_argument("--fps", type=float, default=30.0)
+    sc.add_argument("--width", type=int, default=1280)
+    sc.add_argument("--height", type=int, default=720)
+    sc.add_argument("--box", type=int, default=40)
+    sc.add_argument("--seed", type=int, default=0)
+    sc.add_argument("--pause", default=None, help="RUN,HOLD: alternate RUN seconds of motion with HOLD seconds standing still")
+    args = p.parse_args(argv)
+
+    if args.cmd == "decode":
+        _print_rows(bench_decode(args.input, args.fps, max_frames=args.max_frames, max_side=args.max_side))
+    elif args.cmd == "tracker":
+        _print_rows(bench_tracker([int(s) for s in args.sizes.split(",")], steps=args.steps))
+    elif args.cmd == "motion":
+        _print_rows(bench_motion([int(s) for s in args.sizes.split(",")]))
+    elif args.cmd == "graph":
+        _print_rows(bench_graph([int(s) for s in args.sizes.split(",")]))
+    elif args.cmd == "shard":
+        _print_rows(bench_shard(args.input, args.fps, [int(s) for s in args.shards.split(",")], detector=args.detector, max_seconds=args.max_seconds))
+    elif args.cmd == "pool":
+        _print_rows(bench_pool(args.input, args.fps, [int(s) for s in args.workers.split(",")], detector=args.detector, max_seconds=args.max_seconds))
+    elif args.cmd == "coalesce":
+        spans = [float(s) for s in args.max_spans.split(",")]
+        _print_rows(bench_coalesce(args.input, args.fps, detector=args.detector, max_seconds=args.max_seconds, max_spans=spans))
+    elif args.cmd == "scales":
+        scales = [tuple(float(v) for v in item.split(":")) for item in args.scales.split(",")]
+        _print_rows(bench_scales(args.input, args.fps, scales, detector=args.detector, max_seconds=args.max_seconds))
+        print()
+        _print_rows(bench_scale_cost([1.0, 5.0, 30.0, 60.0], fps=args.fps))
+    elif args.cmd == "onnx":
+        if args.model and not args.input:
+            p.error("onnx --model needs --input")
+        rows = bench_onnx(args.model, args.input, fps=args.fps, max_frames=args.max_frames, threads=args.threads, weights_pt=args.weights)
+        _print_rows(rows)
+        if any(r.get("ok") is False for r in rows):
+            raise SystemExit(1)
+    elif args.cmd == "stages":
+        import json
+        import platform
+
+        rows = bench_stages([int(s) for s in args.sizes.split(",")], seconds=args.seconds, fps=args.fps, repeat=args.repeat)
+        if args.save:
+            meta = {"python": platform.python_version(), "machine": platform.machine(), "fps": args.fps, "seconds": args.seconds}
+            with open(args.save, "w", encoding="utf-8") as f:
+                json.dump({"meta": meta, "rows": rows}, f, indent=2)
+        if args.compare:
+            with open(args.compare, encoding="utf-8") as f:
+                rows = compare_to_baseline(rows, json.load(f)["rows"], tolerance=args.tolerance)
+        _print_rows(rows)
+        if any(r.get("status") == "SLOWER" for r in rows):
+            raise SystemExit(1)
+    elif args.cmd == "gate":
+        _print_rows(bench_gate(
+            [int(s) for s in args.sizes.split(",")],
+            [float(s) for s in args.thresholds.split(",")],
+            every=args.every,
+            seconds=args.seconds,
+            fps=args.fps,
+            detect_cost_ms=args.detect_cost_ms,
+            pause=tuple(float(s) for s in args.pause.split(",")) if args.pause != "0" else None,
+        ))
+    elif args.cmd == "shots":
+        sizes = [tuple(int(v) for v in s.split("x")) for s in args.sizes.split(",")]
+        _print_rows(bench_shots(sizes, fps=args.fps, threshold=args.threshold))
+    elif args.cmd == "scene":
+        from .synthetic import write_scene_video
+
+        write_scene_video(args.out, seconds=args.seconds, fps=args.fps, entities=args.entities,
+                          width=args.width, height=args.height, box=args.box, seed=args.seed,
+                          pause=tuple(float(s) for s in args.pause.split(",")) if args.pause else None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .schemas import Entity, BBox
+
+CACHE_MODES = ("use", "refresh", "bypass")
+_FORMAT = 1
+
+
+def default_cache_dir() -> Path:
+    base = os.environ.get("XDG_CACHE_HOME") or str(Path.home() / ".cache")
+    return Path(base) / "videonarrate" / "detections"
+
+
+def _dir_size(path: Path) -> int:
+    return sum(p.stat().st_size for p in path.rglob("*") if p.is_file())
+
+
+class CachedDetections:
+    """Memory-mapped columnar detections for one (video, detector settings) key."""
+
+    def __init__(self, path: Path):
+        import numpy as np
+
+        self.path = path
+        self.frame_idx = np.load(path / "frame_idx.npy", mmap_mode="r")
+        self.t = np.load(path / "t.npy", mmap_mode="r")
+        # offsets[i]:offsets[i+1] selects frame i's rows in the per-detection columns
+        self.offsets = np.load(path / "offsets.npy", mmap_mode="r")
+        self.boxes = np.load(path / "boxes.npy", mmap_mode="r")
+        self.scores = np.load(path / "scores.npy", mmap_mode="r")
+        self.label_ids = np.load(path / "label_ids.npy", mmap_mode="r")
+        self.labels: List[str] = json.loads((path / "labels.json").read_text(encoding="utf-8"))
+
+    def __len__(self) -> int:
+        return len(self.frame_idx)
+
+    def iter_frames(self, max_seconds: Optional[float] = None) -> Iterator[Tuple[int, float, List[Entity]]]:
+        """Yield (frame_idx, t, entities) exactly as the detector produced them."""
+        frame_idx = self.frame_idx.tolist()
+        ts = self.t.tolist()
+        offsets = self.offsets.tolist()
+        labels = self.labels
+        for i, (fi, t) in enumerate(zip(frame_idx, ts)):
+            if max_seconds is not None and t > max_seconds:
+                return
+            lo, hi = offsets[i], offsets[i + 1]
+            ents: List[Entity] = []
+            if hi > lo:
+                rows = zip(self.boxes[lo:hi].tolist(), self.scores[lo:hi].tolist(), self.label_ids[lo:hi].tolist())
+                for eid, ((x, y, w, h), score, lid) in enumerate(rows, start=1):
+                    ents.append(Entity(id=eid, label=labels[lid], bbox=BBox(x, y, w, h), score=score))
+            yield fi, t, ents
+
+
+class CacheWriter:
+    """Accumulates per-frame detections and commits them atomically as one cache entry."""
+
+    def __init__(self, cache: "DetectionCache", key: str, meta: Dict[str, Any]):
+        self.cache = cache
+        self.key = key
+        self.meta = meta
+        self._frame_idx: List[int] = []
+        self._t: List[float] = []
+        self._offsets: List[int] = [0]
+        self._boxes: List[Tuple[float, float, float, float]] = []
+        self._scores: List[float] = []
+        self._label_ids: List[int] = []
+        self._label_index: Dict[str, int] = {}
+
+    def append(self, frame_idx: int, t: float, ents: List[Entity]) -> None:
+        self._frame_idx.append(frame_idx)
+        self._t.append(t)
+        for e in ents:
+            self._boxes.append((e.bbox.x, e.bbox.y, e.bbox.w, e.bbox.h))
+            self._scores.append(e.score)
+            self._label_ids.append(self._label_index.setdefault(e.label, len(self._label_index)))
+        self._offsets.append(len(self._scores))
+
+    def commit(self) -> Path:
+        import numpy as np
+
+        final = self.cache.root / self.key
+        tmp = self.cache.root / f".{self.key}.{os.getpid()}.tmp"
+        if tmp.exists():
+            shutil.rmtree(tmp)
+        tmp.mkdir(parents=True)
+        np.save(tmp / "frame_idx.npy", np.asarray(self._frame_idx, dtype=np.int64))
+        np.save(tmp / "t.npy", np.asarray(self._t, dtype=np.float64))
+        np.save(tmp / "offsets.npy", np.asarray(self._offsets, dtype=np.int64))
+        np.save(tmp / "boxes.npy", np.asarray(self._boxes, dtype=np.float64).reshape(-1, 4))
+        np.save(tmp / "scores.npy", np.asarray(self._scores, dtype=np.float64))
+        np.save(tmp / "label_ids.npy", np.asarray(self._label_ids, dtype=np.int32))
+        labels = sorted(self._label_index, key=self._label_index.get)
+        (tmp / "labels.json").write_text(json.dumps(labels), encoding="utf-8")
+        (tmp / "meta.json").write_text(json.dumps(self.meta, indent=2), encoding="utf-8")
+        if final.exists():
+            shutil.rmtree(final)
+        os.replace(tmp, final)
+        self.cache.evict(keep=self.key)
+        return final
+
+
+class DetectionCache:
+    """
+    On-disk detection cache keyed by input content hash plus detector settings.
+    Entries are directories of .npy columns; least recently used entries are evicted
+    once the cache exceeds max_bytes.
+    """
+
+    def __init__(self, root: Optional[str] = None, max_bytes: int = 2 * 1024 ** 3):
+        self.root = Path(root) if root else default_cache_dir()
+        self.max_bytes = max_bytes
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def content_hash(self, input_path: str) -> str:
+        """BLAKE2b of the file contents, memoized by (path, size, mtime) so reruns skip rehashing."""
+        st = os.stat(input_path)
+        stamp = f"{os.path.abspath(input_path)}|{st.st_size}|{st.st_mtime_ns}"
+        memo_path = self.root / "hashes.json"
+        try:
+            memo = json.loads(memo_path.read_text(encoding="utf-8"))
+        except Exception:
+            memo = {}
+        if stamp in memo:
+            return memo[stamp]
+        h = hashlib.blake2b(digest_size=20)
+        with open(input_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        digest = h.hexdigest()
+        memo[stamp] = digest
+        tmp = memo_path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(memo), encoding="utf-8")
+        os.replace(tmp, memo_path)
+        return digest
+
+    def key(self, input_path: str, settings: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+        meta = {"format": _FORMAT, "content": self.content_hash(input_path), **settings}
+        blob = json.dumps(meta, sort_keys=True, default=str).encode("utf-8")
+        return hashlib.blake2b(blob, digest_size=16).hexdigest(), meta
+
+    def load(self, key: str) -> Optional[CachedDetections]:
+        path = self.root / key
+        if not (path / "meta.json").exists():
+            return None
+        try:
+            cached = CachedDetections(path)
+        except Exception:
+            return None
+        # Touch for LRU ordering
+        now = time.time()
+        os.utime(path / "meta.json", (now, now))
+        return cached
+
+    def writer(self, key: str, meta: Dict[str, Any]) -> CacheWriter:
+        return CacheWriter(self, key, meta)
+
+    def evict(self, keep: Optional[str] = None) -> None:
+        entries = []
+        for p in self.root.iterdir():
+            if p.is_dir() and not p.name.startswith(".") and (p / "meta.json").exists():
+                entries.append(((p / "meta.json").stat().st_mtime, p, _dir_size(p)))
+        total = sum(size for _, _, size in entries)
+        for _, p, size in sorted(entries, key=lambda e: e[0]):
+            if total <= self.max_bytes:
+                break
+            if p.name == keep:
+                continue
+            shutil.rmtree(p, ignore_errors=True)
+            total -= size
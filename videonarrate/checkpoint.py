@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import dataclasses
+import json
+import os
+import time
+from pathlib import Path
+from typing import IO, Any, Dict, Optional
+
+from .config import Config
+
+CHECKPOINT_FILE = "checkpoint.json"
+_FORMAT = 1
+
+# Config fields that do not change the outputs; a checkpoint stays valid when only these differ
+_RUNTIME_FIELDS = {
+    "decode_buffers", "pipeline_mode", "queue_depth", "detect_batch", "detect_workers", "detector_threads", "det_cache", "cache_dir", "cache_max_mb",
+    "shards", "shard_overlap", "flush_interval", "memory_limit_mb", "metrics", "profile_stage", "profile_mode",
+    "checkpoint_interval", "resume",
+}
+
+
+def run_key(input_path: str, cfg: Config) -> Dict[str, Any]:
+    """What a checkpoint is only valid for: the input file as it was, and the output-shaping config."""
+    st = os.stat(input_path)
+    settings = {f.name: getattr(cfg, f.name) for f in dataclasses.fields(cfg) if f.name not in _RUNTIME_FIELDS}
+    if settings.get("allowed_labels") is not None:
+        settings["allowed_labels"] = sorted(settings["allowed_labels"])
+    key = {"input": os.path.abspath(input_path), "size": st.st_size, "mtime_ns": st.st_mtime_ns, "config": settings}
+    # As it reads back from JSON
+    return json.loads(json.dumps(key))
+
+
+def load_checkpoint(out_dir: Path, key: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """The checkpoint in out_dir, None if there is none; ValueError if it belongs to another run."""
+    path = out_dir / CHECKPOINT_FILE
+    if not path.exists():
+        return None
+    state = json.loads(path.read_text(encoding="utf-8"))
+    if state.get("format") != _FORMAT or state.get("key") != key:
+        raise ValueError(f"{path} was written for a different input or config; delete it or run without resume")
+    return state
+
+
+def clear_checkpoint(out_dir: Path) -> None:
+    try:
+        os.remove(out_dir / CHECKPOINT_FILE)
+    except FileNotFoundError:
+        pass
+
+
+class Checkpointer:
+    """
+    Writes checkpoint.json every `interval` seconds of wall time: the last processed frame,
+    tracker and window state (of every scale), shot cuts so far, and the sinks' output offsets
+    (after flushing them). Its size is bounded by the live tracks (and cuts), not by how much
+    video has been processed.
+    """
+
+    def __init__(
+        self,
+        out_dir: Path,
+        key: Dict[str, Any],
+        interval: float,
+        tracker,
+        windower,
+        sinks,
+        track_log: Optional[IO[str]] = None,
+        scales=None,
+        shots=None,
+    ):
+        self.path = out_dir / CHECKPOINT_FILE
+        self.key = key
+        self.interval = interval
+        self.tracker = tracker
+        self.windower = windower
+        self.sinks = sinks
+        self.track_log = track_log
+        self.scales = scales
+        self.shots = shots
+        self.saved = 0
+        self._last = time.monotonic()
+
+    def maybe_save(self, frame_idx: int, t: float, n_frames: int, rss_peak: float, gate: Optional[Dict[str, Any]] = None) -> None:
+        if time.monotonic() - self._last >= self.interval:
+            self.save(frame_idx, t, n_frames, rss_peak, gate=gate)
+
+    def save(self, frame_idx: int, t: float, n_frames: int, rss_peak: float, gate: Optional[Dict[str, Any]] = None) -> None:
+        track_log_offset = None
+        if self.track_log is not None:
+            self.track_log.flush()
+            track_log_offset = self.track_log.tell()
+        state = {
+            "format": _FORMAT,
+            "key": self.key,
+            "frame_idx": frame_idx,
+            "t": t,
+            "frames": n_frames,
+            "rss_peak_mb": rss_peak,
+            "tracker": self.tracker.checkpoint_state(),
+            "windower": self.windower.checkpoint_state(),
+            "sinks": self.sinks.checkpoint_state(),
+            "track_log": track_log_offset,
+            "scales": self.scales.checkpoint_state() if self.scales is not None else None,
+            "shots": self.shots.checkpoint_state() if self.shots is not None else None,
+            # Motion gate reference: last detected frame and frames skipped since
+            "gate": dict(gate) if gate is not None else None,
+        }
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(json.dumps(state), encoding="utf-8")
+        os.replace(tmp, self.path)
+        self.saved += 1
+        self._last = time.monotonic()
@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import heapq
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+from .schemas import Event, Provenance
+
+# 8-point compass order of motion.direction_from_velocity's labels, for the direction tolerance
+_COMPASS = {"N": 0, "N->E": 1, "E": 2, "S->E": 3, "S": 4, "S->W": 5, "W": 6, "N->W": 7}
+# Actions of tracks that are not going anywhere: their direction is jitter
+_STILL = {"standing", "stopped"}
+
+
+def _key(ev: Event) -> Tuple:
+    """What a span follows: one track, or one (subject, object) pair."""
+    if ev.interaction is not None:
+        return ("pair", ev.subjects[0].id if ev.subjects else None, ev.objects[0].id if ev.objects else None)
+    return ("track", ev.subjects[0].id if ev.subjects else None)
+
+
+def _signature(ev: Event) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+    """(action, direction, interaction) of an event."""
+    return (
+        ev.action.label if ev.action is not None else None,
+        ev.motion.direction if ev.motion is not None else None,
+        ev.interaction.type if ev.interaction is not None else None,
+    )
+
+
+def same_signature(a: Tuple, b: Tuple) -> bool:
+    """
+    True if signature b continues a span with signature a: same action and interaction, and a
+    direction at most one compass step (45 degrees) away; directions of still tracks are ignored.
+    """
+    if a[0] != b[0] or a[2] != b[2]:
+        return False
+    if a[1] == b[1] or a[0] in _STILL:
+        return True
+    da, db = _COMPASS.get(a[1]), _COMPASS.get(b[1])
+    return da is not None and db is not None and min((da - db) % 8, (db - da) % 8) <= 1
+
+
+class _Span:
+    __slots__ = ("seq", "sig", "event", "windows", "speed_sum")
+
+    def __init__(self, seq: int, ev: Event, windows: int = 1, speed_sum: Optional[float] = None):
+        self.seq = seq
+        self.sig = _signature(ev)
+        self.event = ev
+        self.windows = windows
+        self.speed_sum = speed_sum if speed_sum is not None else _speed(ev)
+
+    def extend(self, ev: Event) -> None:
+        span = self.event
+        span.end = ev.end
+        # The latest boxes; action, motion direction and interaction stay those that opened the span
+        span.subjects = ev.subjects
+        span.objects = ev.objects
+        if span.provenance is not None and ev.provenance is not None:
+            span.provenance = Provenance(frames=(span.provenance.frames[0], ev.provenance.frames[1]), models=dict(span.provenance.models))
+        if span.action is not None and ev.action is not None:
+            span.action.confidence = max(span.action.confidence, ev.action.confidence)
+        if span.interaction is not None and ev.interaction is not None:
+            span.interaction.confidence = max(span.interaction.confidence, ev.interaction.confidence)
+        self.windows += 1
+        self.speed_sum += _speed(ev)
+        if span.motion is not None and span.motion.speed is not None:
+            # Mean over the merged windows
+            span.motion.speed = self.speed_sum / self.windows
+            if ev.motion is not None:
+                span.motion.accel = ev.motion.accel
+
+
+def _speed(ev: Event) -> float:
+    return (ev.motion.speed or 0.0) if ev.motion is not None else 0.0
+
+
+class EventCoalescer:
+    """
+    Merges the per-window event stream into spans. Consecutive windows' events for the same
+    track (or subject/object pair) extend one open span while its (action, direction,
+    interaction) stays the same (see same_signature); the span closes when that changes, when
+    the track or pair has been missing for more than `gap` seconds, or when it would grow past
+    `max_span` seconds (a new span then continues it). State is one open span per live track
+    or pair, plus closed spans held back so output stays ordered by start time: a closed span
+    is released once no open span started before it, i.e. after at most max_span seconds.
+    max_span must therefore be finite, or one unchanging track would hold back all output.
+    """
+
+    def __init__(self, gap: float = 2.5, max_span: float = 30.0):
+        if not 0.0 < max_span < math.inf:
+            raise ValueError(f"max_span must be a positive number of seconds, got {max_span!r}")
+        self.gap = gap
+        self.max_span = max_span
+        self.open: Dict[Tuple, _Span] = {}
+        self._ready: List[Tuple[float, int, Event]] = []
+        self._seq = 0
+        self.events_in = 0
+        self.spans_out = 0
+
+    def _close(self, span: _Span) -> None:
+        heapq.heappush(self._ready, (span.event.start, span.seq, span.event))
+
+    def push(self, end_t: float, events: List[Event]) -> List[Event]:
+        """Take one window's events (the window ends at end_t); return the spans that can be written."""
+        self.events_in += len(events)
+        seen = set()
+        for ev in events:
+            key = _key(ev)
+            seen.add(key)
+            span = self.open.get(key)
+            if span is not None:
+                same = same_signature(span.sig, _signature(ev))
+                if same and ev.end - span.event.start <= self.max_span:
+                    span.extend(ev)
+                    continue
+                self._close(span)
+                if same:
+                    # Continuation of a span that grew too long: pick up where it ended
+                    ev.start = max(ev.start, span.event.end)
+            # Window events are built fresh for every window, so the span can take this one over
+            self.open[key] = _Span(self._seq, ev)
+            self._seq += 1
+        for key in [k for k, s in self.open.items() if k not in seen and end_t - s.event.end > self.gap]:
+            self._close(self.open.pop(key))
+        return self._release()
+
+    def _release(self) -> List[Event]:
+        oldest = min(((s.event.start, s.seq) for s in self.open.values()), default=None)
+        out: List[Event] = []
+        ready = self._ready
+        while ready and (oldest is None or ready[0][:2] < oldest):
+            out.append(heapq.heappop(ready)[2])
+        self.spans_out += len(out)
+        return out
+
+    def finish(self) -> List[Event]:
+        """Close every open span (end of input) and return what was left."""
+        for span in self.open.values():
+            self._close(span)
+        self.open.clear()
+        return self._release()
+
+    def checkpoint_state(self) -> Dict[str, Any]:
+        return {
+            "open": [[list(k), s.seq, s.windows, s.speed_sum, s.event.to_dict()] for k, s in self.open.items()],
+            "ready": [[seq, ev.to_dict()] for _, seq, ev in self._ready],
+            "seq": self._seq,
+            "events_in": self.events_in,
+            "spans_out": self.spans_out,
+        }
+
+    def restore_state(self, state: Dict[str, Any]) -> None:
+        self.open = {
+            tuple(k): _Span(seq, Event.from_dict(ev), windows=windows, speed_sum=speed_sum)
+            for k, seq, windows, speed_sum, ev in state["open"]
+        }
+        self._ready = [(ev["start"], seq, Event.from_dict(ev)) for seq, ev in state["ready"]]
+        heapq.heapify(self._ready)
+        self._seq = state["seq"]
+        self.events_in = state["events_in"]
+        self.spans_out = state["spans_out"]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "window_events": self.events_in,
+            "spans": self.spans_out,
+            "ratio": self.spans_out / self.events_in if self.events_in else 0.0,
+        }
+
+
+def make_coalescer(cfg) -> Optional[EventCoalescer]:
+    if not cfg.coalesce:
+        return None
+    return EventCoalescer(gap=cfg.coalesce_gap, max_span=cfg.coalesce_max_span)
@@ -53,14 +53,29 @@ def compose_captions(events: List[Event]) -> List[CaptionLine]:
     return caps
 
 
-def summarize_events(events: List[Event]) -> Dict[str, Any]:
-    labels: Dict[str, int] = {}
-    for ev in events:
-        for e in (ev.subjects + ev.objects):
-            labels[e.label] = labels.get(e.label, 0) + 1
-    top = sorted(labels.items(), key=lambda x: x[1], reverse=True)[:5]
-    return {
-        "entities": [{"label": k, "count": v} for k, v in top],
-        "events_count": len(events),
-    }
+class EventSummary:
+    """Incremental summarize_events: add() events as they are produced, to_dict() at any time."""
+
+    def __init__(self) -> None:
+        self.labels: Dict[str, int] = {}
+        self.events_count = 0
 
+    def add(self, events: List[Event]) -> None:
+        labels = self.labels
+        for ev in events:
+            for e in (ev.subjects + ev.objects):
+                labels[e.label] = labels.get(e.label, 0) + 1
+        self.events_count += len(events)
+
+    def to_dict(self) -> Dict[str, Any]:
+        top = sorted(self.labels.items(), key=lambda x: x[1], reverse=True)[:5]
+        return {
+            "entities": [{"label": k, "count": v} for k, v in top],
+            "events_count": self.events_count,
+        }
+
+
+def summarize_events(events: List[Event]) -> Dict[str, Any]:
+    acc = EventSummary()
+    acc.add(events)
+    return acc.to_dict()
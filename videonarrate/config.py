@@ -1,17 +1,111 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Optional, Set
+from typing import List, Optional, Set, Tuple
 
 
 @dataclass
 class Config:
     fps: int = 8
+    # Decode sampler: "grab" (skip-decode), "seek" (keyframe seek) or "read" (legacy)
+    sampler: str = "grab"
+    # Decode backend: "cv2" or "ffmpeg" (rawvideo pipe; falls back to cv2 if unavailable)
+    decode_backend: str = "cv2"
+    # Optional downscale at decode time so the longest side is at most this many pixels
+    decode_max_side: Optional[int] = None
+    # Preallocated frame buffers for the ffmpeg backend
+    decode_buffers: int = 4
+    # "serial" runs decode/detect/track in one thread; "staged" overlaps them via bounded queues
+    pipeline_mode: str = "serial"
+    queue_depth: int = 4
+    # Skip the detector on frames that barely differ from the last detected one; tracks are carried forward
+    motion_gate: bool = False
+    # Share of changed pixels in the most-changed block of the downscaled frame for it to be detected
+    motion_gate_threshold: float = 0.05
+    # With the motion gate, run full detection at least every this many sampled frames
+    motion_gate_every: int = 8
+    # Track boxes on skipped frames: "hold" (the gate saw no change) or "velocity" (extrapolate recent motion)
+    motion_gate_coast: str = "hold"
+    # With the motion gate, (x, y, w, h) frame regions as fractions of the frame whose changes are ignored
+    motion_gate_ignore: Optional[List[Tuple[float, float, float, float]]] = None
+    # Detect hard cuts between shots on downscaled frames; each cut ends the tracks, windows and spans
+    # before it and starts a new scene in summary.json
+    shot_detect: bool = False
+    # Colour histogram distance (0-1) between consecutive sampled frames that counts as a cut
+    shot_threshold: float = 0.1
+    # Shortest shot in seconds; a cut sooner than this after the previous one is ignored
+    shot_min_len: float = 1.0
+    # Frames per Detector.infer_batch call
+    detect_batch: int = 1
+    # Detector processes fed through a shared-memory frame ring (1: detect in-process); single-process runs only
+    detect_workers: int = 1
+    # Detection cache: "use" (read/write), "refresh" (recompute and overwrite) or "bypass"
+    det_cache: str = "bypass"
+    cache_dir: Optional[str] = None  # defaults to ~/.cache/videonarrate/detections
+    cache_max_mb: float = 2048.0
     window: float = 2.5
     stride: float = 1.0
-    detector: str = "yolov8-seg"  # or "mock"
-    tracker: str = "simple"        # or external like "bytetrack" if available
+    # Merge consecutive window events of a track (or pair) with the same action, direction and interaction into spans
+    coalesce: bool = True
+    # Seconds a track or pair may be missing from the windows before its span closes
+    coalesce_gap: float = 2.5
+    # Longest span in seconds before it is closed and continued by a new one; also bounds how long spans are held back
+    coalesce_max_span: float = 30.0
+    # With coalesce, also write the per-window event stream to events.raw.jsonl
+    raw_events: bool = False
+    # Extra (window, stride) scales, in seconds, narrated from the same pass into out_dir/scales/<window>s/
+    scales: Optional[List[Tuple[float, float]]] = None
+    detector: str = "yolov8-seg"  # "onnx", "synthetic" or "mock"
+    # Model file for the yolov8-seg/onnx backends (None: detect.DETECTOR_WEIGHTS)
+    detector_weights: Optional[str] = None
+    # ONNX Runtime intra-op threads per detector (None: runtime default)
+    detector_threads: Optional[int] = None
+    tracker: str = "simple"        # or "vector" (numpy IoU matrix + global assignment)
+    tracker_assignment: str = "greedy"  # "greedy" or "hungarian" (needs SciPy) for the vector tracker
     max_tracks: int = 128
+    # Per-track history cap (summarize_motion needs the last 6 entries); None keeps full history
+    track_history: Optional[int] = 6
+    # Drop aged-out tracks from the tracker instead of keeping them with alive=False
+    evict_dead_tracks: bool = True
+    # Write a compact summary of every finished track to tracks.jsonl
+    track_summaries: bool = False
+    # Split one video into this many time ranges detected/tracked on separate processes (OpenCV decode only)
+    shards: int = 1
+    # Warm-up seconds decoded before each shard for track stitching (None: from max_age and motion history)
+    shard_overlap: Optional[float] = None
+    # Optional cap on interaction partners per track (nearest first)
+    max_neighbors: Optional[int] = None
+    # Keep track centers in a numpy TrackTable and compute motion/actions for all tracks at once
+    batch_motion: bool = False
+    # Also write captions.vtt next to captions.srt
+    write_vtt: bool = False
+    # Also write events.cols/: columnar .npz chunks that events.jsonl can be rebuilt from exactly
+    write_columnar: bool = False
+    # Write events.idx/: byte offsets of events.jsonl records per time bucket, label and track id
+    write_index: bool = True
+    # Seconds between flushes of the streaming outputs (None: only at the end)
+    flush_interval: Optional[float] = 5.0
+    # Fail with MemoryLimitExceeded when RSS crosses this many MiB (checked every 64 frames)
+    memory_limit_mb: Optional[float] = None
+    # Narrate a live feed (stream URL, camera index, "-" for raw frames on stdin, or a file replayed in real time)
+    live: bool = False
+    # Live mode: seconds from a frame's arrival to its processing; later frames are skipped for fresher ones
+    latency_budget: float = 1.0
+    # Live mode: lowest sampling fps the adaptive rate may fall to when detection cannot keep up
+    live_min_fps: float = 1.0
+    # Live mode: speed a file is replayed at, relative to wall-clock time
+    replay_speed: float = 1.0
+    # Live mode: (width, height) of raw bgr24 frames on stdin
+    live_frame_size: Optional[Tuple[int, int]] = None
+    # Seconds between checkpoint.json writes (None: never); single-process runs only
+    checkpoint_interval: Optional[float] = 60.0
+    # Continue from out_dir/checkpoint.json if there is one, instead of starting over
+    resume: bool = False
+    # Write metrics.json (per-stage latency percentiles, throughput, track counts)
+    metrics: bool = True
+    # Run cProfile or tracemalloc ("cprofile"/"tracemalloc") over one stage: decode, detect, track or window
+    profile_stage: Optional[str] = None
+    profile_mode: str = "cprofile"
     min_det_conf: float = 0.25
     compose_with_vlm: bool = False
     # Optional cap on processing time (in seconds) to avoid long runs
@@ -1,14 +1,200 @@
 from __future__ import annotations
 
-from typing import Iterator, Tuple
+import shutil
+import subprocess
+from typing import Iterator, Optional, Tuple
 
+SAMPLERS = ("grab", "seek", "read")
+BACKENDS = ("cv2", "ffmpeg")
 
-def decode_video_cv2(path: str, fps: int) -> Iterator[Tuple[int, float, "Frame"]]:
+
+def _frame_time(cap, cv2, idx: int, native_fps: float) -> float:
+    """Container PTS of the last grabbed frame in seconds, falling back to idx / native_fps."""
+    msec = cap.get(cv2.CAP_PROP_POS_MSEC)
+    if msec and msec > 0:
+        return msec / 1000.0
+    return idx / native_fps
+
+
+def probe_video(path: str) -> Optional[Tuple[int, int, float]]:
+    """Return (width, height, native_fps) via ffprobe, then OpenCV; None if neither can read it."""
+    if shutil.which("ffprobe"):
+        try:
+            out = subprocess.run(
+                ["ffprobe", "-v", "error", "-select_streams", "v:0",
+                 "-show_entries", "stream=width,height,avg_frame_rate", "-of", "csv=p=0", path],
+                capture_output=True, text=True, check=True,
+            ).stdout.strip().splitlines()[0]
+            w, h, rate = out.split(",")[:3]
+            num, _, den = rate.partition("/")
+            native_fps = float(num) / float(den or 1) if float(den or 1) else 0.0
+            return int(w), int(h), native_fps or 30.0
+        except Exception:
+            pass
+    try:
+        import cv2  # type: ignore
+    except Exception:
+        return None
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        return None
+    info = (
+        int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        cap.get(cv2.CAP_PROP_FPS) or 30.0,
+    )
+    cap.release()
+    return info
+
+
+def probe_duration(path: str) -> Optional[float]:
+    """Container duration in seconds via ffprobe, then OpenCV frame count / fps; None if unknown."""
+    if shutil.which("ffprobe"):
+        try:
+            out = subprocess.run(
+                ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "csv=p=0", path],
+                capture_output=True, text=True, check=True,
+            ).stdout.strip()
+            return float(out)
+        except Exception:
+            pass
+    try:
+        import cv2  # type: ignore
+    except Exception:
+        return None
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        return None
+    frames = cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0.0
+    native_fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    cap.release()
+    return frames / native_fps if frames > 0 else None
+
+
+def scaled_size(width: int, height: int, max_side: Optional[int]) -> Tuple[int, int, float]:
+    """Fit (width, height) inside max_side keeping aspect; returns (w, h, scale) with scale <= 1."""
+    if not max_side or max(width, height) <= max_side:
+        return width, height, 1.0
+    scale = max_side / float(max(width, height))
+    return max(1, int(round(width * scale))), max(1, int(round(height * scale))), scale
+
+
+def open_video(
+    path: str,
+    fps: int,
+    backend: str = "cv2",
+    sampler: str = "grab",
+    max_side: Optional[int] = None,
+    buffers: int = 4,
+    start: float = 0.0,
+    end: Optional[float] = None,
+) -> Tuple[Iterator[Tuple[int, float, "Frame"]], float]:
+    """
+    Pick a decode backend and return (frames, scale), where scale maps frame pixels back to
+    source pixels (source = frame / scale). The ffmpeg backend falls back to OpenCV when the
+    ffmpeg binary is missing or the file cannot be probed. With start/end only frames with
+    start <= t < end are yielded (same indices and timestamps as a full decode); a time range
+    always decodes with OpenCV, since the ffmpeg pipe numbers frames from its own start.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown decode backend {backend!r}; expected one of {BACKENDS}")
+    info = probe_video(path) if (max_side or backend == "ffmpeg") else None
+    size = None
+    scale = 1.0
+    if info is not None:
+        w, h, scale = scaled_size(info[0], info[1], max_side)
+        size = (w, h)
+    ranged = start > 0 or end is not None
+    if backend == "ffmpeg" and not ranged and info is not None and shutil.which("ffmpeg"):
+        return decode_video_ffmpeg(path, fps, size=size, native_fps=info[2], buffers=buffers), scale
+    frames = decode_video_cv2(path, fps, sampler=sampler, size=size if scale != 1.0 else None, start=start, end=end)
+    return frames, scale
+
+
+def decode_video_ffmpeg(
+    path: str,
+    fps: int,
+    size: Optional[Tuple[int, int]] = None,
+    native_fps: float = 30.0,
+    buffers: int = 4,
+) -> Iterator[Tuple[int, float, "Frame"]]:
+    """
+    Stream (frame_index, timestamp_seconds, frame_bgr) from an ffmpeg subprocess as rawvideo.
+    Frame-rate selection and scaling happen inside ffmpeg, and frames are read into a ring of
+    `buffers` preallocated arrays: a yielded frame is only valid until `buffers` more frames
+    have been yielded, so consumers that hold on to frames must copy them.
+    """
+    import numpy as np
+
+    if size is None:
+        info = probe_video(path)
+        if info is None:
+            return
+        size = (info[0], info[1])
+        native_fps = info[2]
+    w, h = size
+    cmd = [
+        "ffmpeg", "-nostdin", "-loglevel", "error", "-i", path, "-an", "-sn",
+        "-vf", f"fps={max(1, fps)},scale={w}:{h}:flags=area",
+        "-f", "rawvideo", "-pix_fmt", "bgr24", "-",
+    ]
+    try:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, bufsize=0)
+    except OSError:
+        return
+    ring = [np.empty((h, w, 3), dtype=np.uint8) for _ in range(max(1, buffers))]
+    nbytes = w * h * 3
+    out_idx = 0
+    try:
+        while True:
+            buf = ring[out_idx % len(ring)]
+            view = memoryview(buf.reshape(-1))
+            got = 0
+            while got < nbytes:
+                n = proc.stdout.readinto(view[got:])
+                if not n:
+                    break
+                got += n
+            if got < nbytes:
+                break
+            t = out_idx / max(1, fps)
+            yield (int(round(t * native_fps)), t, buf)
+            out_idx += 1
+    finally:
+        proc.stdout.close()
+        if proc.poll() is None:
+            proc.kill()
+        proc.wait()
+
+
+def decode_video_cv2(
+    path: str,
+    fps: int,
+    sampler: str = "grab",
+    size: Optional[Tuple[int, int]] = None,
+    start: float = 0.0,
+    end: Optional[float] = None,
+) -> Iterator[Tuple[int, float, "Frame"]]:
     """
     Yields (frame_index, timestamp_seconds, frame_bgr) at approximately the given fps.
     Falls back to yielding no frames if OpenCV is unavailable or the video cannot be opened,
     allowing the pipeline to run with empty outputs (per README mock-detector path).
+
+    Samplers:
+    - "grab": grab every native frame but only retrieve (decode to BGR) the sampled ones
+    - "seek": seek to each sampled frame; best when fps is far below the native rate. It
+      aims at the nominal frame index of each tick, then checks the PTS and grabs forward,
+      so on variable-frame-rate files it may pick a later frame than "grab" where the rate
+      drops, but never an earlier one
+    - "read": legacy loop that reads every frame and keeps every Nth
+    Timestamps come from the container PTS (CAP_PROP_POS_MSEC), so they stay correct on
+    variable-frame-rate files and when native_fps is not a multiple of fps.
+    If size=(w, h) is given, sampled frames are resized with INTER_AREA after retrieve.
+    start/end restrict output to start <= t < end, selecting exactly the frames a full decode
+    would; "grab" and "seek" seek to start, "read" decodes from the beginning.
     """
+    if sampler not in SAMPLERS:
+        raise ValueError(f"Unknown sampler {sampler!r}; expected one of {SAMPLERS}")
     try:
         import cv2  # type: ignore
     except Exception:
@@ -21,8 +207,35 @@ def decode_video_cv2(path: str, fps: int) -> Iterator[Tuple[int, float, "Frame"]
         return
 
     native_fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
-    frame_interval_native = int(max(1, round(native_fps / max(1, fps))))
+    try:
+        if sampler == "read":
+            frames = _sample_read(cap, native_fps, fps)
+            if start > 0 or end is not None:
+                frames = _clip_range(frames, start, end)
+        elif sampler == "seek":
+            frames = _sample_seek(cap, cv2, native_fps, fps, start=start, end=end)
+        else:
+            frames = _sample_grab(cap, cv2, native_fps, fps, start=start, end=end)
+        if size is None:
+            yield from frames
+        else:
+            for idx, t, frame in frames:
+                yield (idx, t, cv2.resize(frame, size, interpolation=cv2.INTER_AREA))
+    finally:
+        cap.release()
+
+
+def _clip_range(frames, start: float, end: Optional[float]):
+    for item in frames:
+        t = item[1]
+        if end is not None and t >= end:
+            return
+        if t >= start:
+            yield item
+
 
+def _sample_read(cap, native_fps: float, fps: int):
+    frame_interval_native = int(max(1, round(native_fps / max(1, fps))))
     idx = 0
     out_idx = 0
     while True:
@@ -35,4 +248,75 @@ def decode_video_cv2(path: str, fps: int) -> Iterator[Tuple[int, float, "Frame"]
             out_idx += 1
         idx += 1
 
-    cap.release()
+
+def _sample_grab(cap, cv2, native_fps: float, fps: int, start: float = 0.0, end: Optional[float] = None):
+    step = 1.0 / max(1, fps)
+    # Accept a frame up to half a native frame early so we pick the nearest one to each tick
+    tol = 0.5 / native_fps
+    next_t = 0.0
+    idx = 0
+    if start > 0:
+        # After each frame next_t is the first tick past t + tol, so one frame grabbed before
+        # start is enough to resume the same selection a decode from 0 makes
+        cap.set(cv2.CAP_PROP_POS_FRAMES, max(0, int(start * native_fps) - 2))
+        idx = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+        if idx > 0 and cap.grab():
+            t = _frame_time(cap, cv2, idx, native_fps)
+            while next_t <= t + tol:
+                next_t += step
+            idx += 1
+    while cap.grab():
+        t = _frame_time(cap, cv2, idx, native_fps)
+        if end is not None and t >= end:
+            break
+        if t + tol >= next_t:
+            ok, frame = cap.retrieve() if t >= start else (False, None)
+            if ok:
+                yield (idx, t, frame)
+            while next_t <= t + tol:
+                next_t += step
+        idx += 1
+
+
+def _sample_seek(cap, cv2, native_fps: float, fps: int, start: float = 0.0, end: Optional[float] = None):
+    step = 1.0 / max(1, fps)
+    # As in _sample_grab: a frame up to half a native frame early still counts for a tick
+    tol = 0.5 / native_fps
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+    k = max(0, int(start / step) - 1)
+    last_idx = -1
+    while True:
+        tick = k * step
+        k += 1
+        # The tick's frame at the nominal rate: exact on constant-frame-rate files, a first
+        # guess on variable-frame-rate ones that the PTS check below corrects
+        idx = max(int(round(tick * native_fps)), last_idx + 1)
+        if total and idx >= total:
+            break
+        gap = idx - last_idx - 1
+        # Short gaps are cheaper to grab through than to seek back to a keyframe for
+        if gap > native_fps:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, idx)
+        else:
+            for _ in range(gap):
+                cap.grab()
+        if not cap.grab():
+            break
+        t = _frame_time(cap, cv2, idx, native_fps)
+        # Landed before the tick (the frame rate rose since the start): grab forward to it
+        while t + tol < tick:
+            if not cap.grab():
+                return
+            idx += 1
+            t = _frame_time(cap, cv2, idx, native_fps)
+        if end is not None and t >= end:
+            break
+        ok, frame = cap.retrieve()
+        if not ok:
+            break
+        if t >= start:
+            yield (idx, t, frame)
+        last_idx = idx
+        # Landed past later ticks (the frame rate fell): this frame stands for them too
+        while k * step <= t + tol:
+            k += 1
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import Dict, List, Optional, Sequence, Set
 
 from .schemas import Entity, BBox
 
@@ -13,46 +13,136 @@ class Detection:
     label: str
 
 
+# Default model weights loaded by each detector backend (also part of the detection cache key)
+DETECTOR_WEIGHTS = {"yolov8-seg": "yolov8s-seg.pt", "onnx": "yolov8s.onnx"}
+
+
+def _to_numpy(v):
+    import numpy as np
+
+    if hasattr(v, "cpu"):
+        v = v.cpu()
+    if hasattr(v, "numpy"):
+        return v.numpy()
+    return np.asarray(v)
+
+
 class Detector:
-    def __init__(self, name: str = "yolov8-seg", min_conf: float = 0.25):
+    """
+    Backends: "yolov8-seg" (ultralytics), "onnx" (an exported YOLO model in ONNX Runtime, see
+    onnxdetect.OnnxDetector), "synthetic" and "mock". `weights` overrides DETECTOR_WEIGHTS;
+    `threads` caps ONNX Runtime's intra-op threads.
+    """
+
+    def __init__(
+        self,
+        name: str = "yolov8-seg",
+        min_conf: float = 0.25,
+        allowed_labels: Optional[Set[str]] = None,
+        weights: Optional[str] = None,
+        threads: Optional[int] = None,
+    ):
         self.name = name
         self.min_conf = min_conf
+        self.allowed_labels = set(allowed_labels) if allowed_labels else None
         self._impl = None
+        # Class indices for allowed_labels, passed to the model so filtered boxes never come back
+        self._classes: Optional[List[int]] = None
+        # Per names-dict lookup tables: (names, label per class id, allowed mask per class id)
+        self._tables: Dict[int, tuple] = {}
         if name == "yolov8-seg":
             try:
                 from ultralytics import YOLO  # type: ignore
-                self._impl = YOLO("yolov8s-seg.pt")
+                self._impl = YOLO(weights or DETECTOR_WEIGHTS[name])
             except Exception:
                 self._impl = None
+        elif name == "onnx":
+            # Chosen explicitly with a model file: a bad path or missing runtime fails the run
+            # instead of narrating nothing
+            from .onnxdetect import OnnxDetector
+
+            self._impl = OnnxDetector(weights or DETECTOR_WEIGHTS[name], threads=threads)
+        elif name == "synthetic":
+            # Ground truth read back from frames rendered by synthetic.write_scene_video
+            from .synthetic import SyntheticDetector
+
+            self._impl = SyntheticDetector()
         elif name == "mock":
             self._impl = None
+        names = getattr(self._impl, "names", None) if name in ("yolov8-seg", "onnx") else None
+        if self._impl is not None and self.allowed_labels is not None and names:
+            self._classes = [int(i) for i, n in names.items() if n in self.allowed_labels]
+
+    def infer(self, frame, next_entity_id_start: int = 1, scale: float = 1.0) -> List[Entity]:
+        """Detect entities in frame; bboxes are divided by scale to map back to source pixels."""
+        return self.infer_batch([frame], next_entity_id_start=next_entity_id_start, scale=scale)[0]
 
-    def infer(self, frame, next_entity_id_start: int = 1) -> List[Entity]:
-        if self._impl is not None and self.name == "yolov8-seg":
+    def infer_batch(self, frames: Sequence, next_entity_id_start: int = 1, scale: float = 1.0) -> List[List[Entity]]:
+        """Detect entities in several frames with one predict call; returns one list per frame, in order."""
+        if self.name == "synthetic":
+            return [self._impl.detect(f, self.min_conf, self.allowed_labels, next_entity_id_start) for f in frames]
+        if self._impl is not None and self.name == "onnx":
+            if self._classes is not None and not self._classes:
+                return [[] for _ in frames]
+            out = []
+            for f in frames:
+                xywh, conf, cls = self._impl.detect(f, self.min_conf, self._classes)
+                out.append(self._entities(xywh, conf, cls, self._impl.names, next_entity_id_start, scale))
+            return out
+        if self._impl is not None and self.name == "yolov8-seg" and len(frames) > 0:
+            if self._classes is not None and not self._classes:
+                # None of the allowed labels exist in this model
+                return [[] for _ in frames]
             try:
-                results = self._impl.predict(frame, verbose=False)
-                ents: List[Entity] = []
-                eid = next_entity_id_start
-                for r in results:
-                    # r.boxes.xywh, r.boxes.conf, r.boxes.cls
-                    boxes = getattr(r.boxes, "xywh", [])
-                    confs = getattr(r.boxes, "conf", [])
-                    clses = getattr(r.boxes, "cls", [])
-                    for i in range(len(boxes)):
-                        try:
-                            x, y, w, h = [float(v) for v in boxes[i]]
-                            score = float(confs[i])
-                            if score < self.min_conf:
-                                continue
-                            label_idx = int(clses[i])
-                            label = r.names.get(label_idx, str(label_idx)) if hasattr(r, "names") else str(label_idx)
-                            ents.append(Entity(id=eid, label=label, bbox=BBox(x, y, w, h), score=score))
-                            eid += 1
-                        except Exception:
-                            continue
-                return ents
+                kwargs = {"conf": self.min_conf, "verbose": False}
+                if self._classes is not None:
+                    kwargs["classes"] = self._classes
+                results = self._impl.predict(list(frames), **kwargs)
+                return [self._convert(r, next_entity_id_start, scale) for r in results]
             except Exception:
                 pass
         # Fallback: no detections
-        return []
+        return [[] for _ in frames]
+
+    def _label_table(self, names: Dict[int, str], size: int) -> tuple:
+        """Label and allowed-mask arrays indexed by class id, cached per names dict."""
+        import numpy as np
+
+        table = self._tables.get(id(names))
+        if table is None or len(table[1]) < size:
+            n = max(size, max(names.keys(), default=-1) + 1)
+            labels = np.array([names.get(i, str(i)) for i in range(n)], dtype=object)
+            if self.allowed_labels is None:
+                allowed = np.ones(n, dtype=bool)
+            else:
+                allowed = np.array([lbl in self.allowed_labels for lbl in labels], dtype=bool)
+            # Keep a reference to names so its id() stays unique while cached
+            table = (names, labels, allowed)
+            self._tables[id(names)] = table
+        return table[1], table[2]
+
+    def _convert(self, r, next_entity_id_start: int, scale: float) -> List[Entity]:
+        """Convert one ultralytics result (r.boxes.xywh/conf/cls) into entities using array masks."""
+        import numpy as np
+
+        boxes = getattr(r, "boxes", None)
+        if boxes is None or len(boxes) == 0:
+            return []
+        xywh = _to_numpy(boxes.xywh).astype(np.float64).reshape(-1, 4)
+        conf = _to_numpy(boxes.conf).astype(np.float64).reshape(-1)
+        cls = _to_numpy(boxes.cls).astype(np.int64).reshape(-1)
+        return self._entities(xywh, conf, cls, getattr(r, "names", None) or {}, next_entity_id_start, scale)
 
+    def _entities(self, xywh, conf, cls, names: Dict[int, str], next_entity_id_start: int, scale: float) -> List[Entity]:
+        """Entities from box arrays (boxes.xywh/conf/cls layout), shared by the ultralytics and ONNX backends."""
+        if len(cls) == 0:
+            return []
+        xywh = xywh / scale
+        labels, allowed = self._label_table(names, int(cls.max()) + 1)
+        keep = (conf >= self.min_conf) & allowed[cls]
+        ents: List[Entity] = []
+        eid = next_entity_id_start
+        for (x, y, w, h), score, label in zip(xywh[keep].tolist(), conf[keep].tolist(), labels[cls[keep]].tolist()):
+            ents.append(Entity(id=eid, label=label, bbox=BBox(x, y, w, h), score=score))
+            eid += 1
+        return ents
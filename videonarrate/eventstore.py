@@ -0,0 +1,236 @@
+from __future__ import annotations
+
+import json
+import os
+from array import array
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from .schemas import Event, Entity
+
+_FORMAT = 1
+# Sentinels in string-id columns
+_NONE = -1
+_ABSENT = -2
+
+_EVENT_COLS = {
+    "start": "d", "end": "d",
+    # Entity rows [ent_off, ent_off + n_subjects) are subjects, the next n_objects are objects
+    "ent_off": "q", "n_subjects": "i", "n_objects": "i",
+    "action_label": "i", "action_conf": "d", "action_source": "i",
+    "interaction_type": "i", "interaction_conf": "d",
+    "motion_direction": "i", "motion_speed": "d", "motion_accel": "d",
+    "prov_first": "q", "prov_last": "q", "prov_models": "i",
+    "caption": "i",
+    # Index into `extras` for events that do not fit the columns, else -1
+    "extra": "i",
+}
+_ENTITY_COLS = {"id": "q", "label": "i", "x": "d", "y": "d", "w": "d", "h": "d", "score": "d"}
+
+
+def _is_float(*vals: Any) -> bool:
+    return all(type(v) is float for v in vals)
+
+
+def _plain_entity(e: Entity) -> bool:
+    b = e.bbox
+    return type(e.id) is int and type(e.label) is str and _is_float(b.x, b.y, b.w, b.h, e.score) and e.mask is None and not e.attributes
+
+
+def _entity_dict(e_id: int, label: str, x: float, y: float, w: float, h: float, score: float) -> Dict[str, Any]:
+    # Same keys and order as dataclasses.asdict(Entity)
+    return {"id": e_id, "label": label, "bbox": {"x": x, "y": y, "w": w, "h": h}, "score": score, "mask": None, "attributes": {}}
+
+
+class EventColumns:
+    """
+    Events as typed array columns plus one interned string table. Entities live in a separate
+    row table referenced by offset. Events with fields outside the columnar schema (masks,
+    attributes, scene, intent, non-float numbers, ...) are kept verbatim as their to_dict()
+    JSON, so jsonl_lines() always reproduces events.jsonl byte for byte.
+    """
+
+    def __init__(self):
+        self.cols: Dict[str, array] = {name: array(code) for name, code in _EVENT_COLS.items()}
+        self.ents: Dict[str, array] = {name: array(code) for name, code in _ENTITY_COLS.items()}
+        self.strings: List[str] = []
+        self._string_ids: Dict[str, int] = {}
+        self.extras: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self.cols["start"])
+
+    def _sid(self, s: Optional[str]) -> int:
+        if s is None:
+            return _NONE
+        sid = self._string_ids.get(s)
+        if sid is None:
+            sid = self._string_ids[s] = len(self.strings)
+            self.strings.append(s)
+        return sid
+
+    def _fits(self, ev: Event) -> bool:
+        if ev.intent_hypothesis is not None or ev.scene is not None or not _is_float(ev.start, ev.end):
+            return False
+        if not all(_plain_entity(e) for e in ev.subjects) or not all(_plain_entity(e) for e in ev.objects):
+            return False
+        a, i, m, p = ev.action, ev.interaction, ev.motion, ev.provenance
+        if a is not None and not (type(a.label) is str and _is_float(a.confidence) and (a.source_model is None or type(a.source_model) is str)):
+            return False
+        if i is not None and not (type(i.type) is str and _is_float(i.confidence)):
+            return False
+        if m is not None and not ((m.direction is None or type(m.direction) is str) and _is_float(m.speed, m.accel)):
+            return False
+        if p is not None and not (len(p.frames) == 2 and all(type(f) is int for f in p.frames)):
+            return False
+        return ev.caption is None or type(ev.caption) is str
+
+    def append(self, ev: Event) -> None:
+        c = self.cols
+        sid = self._sid
+        if not self._fits(ev):
+            for name, col in c.items():
+                col.append(0)
+            c["extra"][-1] = len(self.extras)
+            self.extras.append(json.dumps(ev.to_dict(), ensure_ascii=False))
+            return
+        c["start"].append(ev.start)
+        c["end"].append(ev.end)
+        c["ent_off"].append(len(self.ents["id"]))
+        c["n_subjects"].append(len(ev.subjects))
+        c["n_objects"].append(len(ev.objects))
+        ents = self.ents
+        for e in ev.subjects + ev.objects:
+            b = e.bbox
+            ents["id"].append(e.id)
+            ents["label"].append(sid(e.label))
+            ents["x"].append(b.x)
+            ents["y"].append(b.y)
+            ents["w"].append(b.w)
+            ents["h"].append(b.h)
+            ents["score"].append(e.score)
+        a = ev.action
+        c["action_label"].append(sid(a.label) if a is not None else _ABSENT)
+        c["action_conf"].append(a.confidence if a is not None else 0.0)
+        c["action_source"].append(sid(a.source_model) if a is not None else _NONE)
+        i = ev.interaction
+        c["interaction_type"].append(sid(i.type) if i is not None else _ABSENT)
+        c["interaction_conf"].append(i.confidence if i is not None else 0.0)
+        m = ev.motion
+        c["motion_direction"].append(sid(m.direction) if m is not None else _ABSENT)
+        c["motion_speed"].append(m.speed if m is not None else 0.0)
+        c["motion_accel"].append(m.accel if m is not None else 0.0)
+        p = ev.provenance
+        c["prov_first"].append(p.frames[0] if p is not None else 0)
+        c["prov_last"].append(p.frames[1] if p is not None else 0)
+        c["prov_models"].append(sid(json.dumps(p.models, ensure_ascii=False)) if p is not None else _ABSENT)
+        c["caption"].append(sid(ev.caption))
+        c["extra"].append(-1)
+
+    def extend(self, events: List[Event]) -> None:
+        for ev in events:
+            self.append(ev)
+
+    def dicts(self) -> Iterator[Dict[str, Any]]:
+        """Yield each event as Event.to_dict() would have produced it."""
+        c = {name: col.tolist() for name, col in self.cols.items()}
+        e = {name: col.tolist() for name, col in self.ents.items()}
+        strings = self.strings
+        models_cache: Dict[int, Any] = {}
+        for k in range(len(c["start"])):
+            if c["extra"][k] >= 0:
+                yield json.loads(self.extras[c["extra"][k]])
+                continue
+            off, ns, no = c["ent_off"][k], c["n_subjects"][k], c["n_objects"][k]
+            ents = [
+                _entity_dict(e["id"][r], strings[e["label"][r]], e["x"][r], e["y"][r], e["w"][r], e["h"][r], e["score"][r])
+                for r in range(off, off + ns + no)
+            ]
+            al, it, md, pm, cap = c["action_label"][k], c["interaction_type"][k], c["motion_direction"][k], c["prov_models"][k], c["caption"][k]
+            src = c["action_source"][k]
+            provenance = None
+            if pm != _ABSENT:
+                models = models_cache.get(pm)
+                if models is None:
+                    models = models_cache[pm] = json.loads(strings[pm])
+                provenance = {"frames": [c["prov_first"][k], c["prov_last"][k]], "models": dict(models)}
+            yield {
+                "start": c["start"][k],
+                "end": c["end"][k],
+                "subjects": ents[:ns],
+                "objects": ents[ns:],
+                "action": None if al == _ABSENT else {
+                    "label": strings[al], "confidence": c["action_conf"][k], "source_model": None if src == _NONE else strings[src],
+                },
+                "interaction": None if it == _ABSENT else {"type": strings[it], "confidence": c["interaction_conf"][k]},
+                "motion": None if md == _ABSENT else {
+                    "direction": None if md == _NONE else strings[md], "speed": c["motion_speed"][k], "accel": c["motion_accel"][k],
+                },
+                "intent_hypothesis": None,
+                "scene": None,
+                "provenance": provenance,
+                "caption": None if cap == _NONE else strings[cap],
+            }
+
+    def jsonl_lines(self) -> Iterator[str]:
+        """events.jsonl lines (with trailing newline) for these events."""
+        for d in self.dicts():
+            yield json.dumps(d, ensure_ascii=False) + "\n"
+
+    def save(self, path: Path) -> None:
+        """Write one chunk as an uncompressed .npz (atomically)."""
+        import numpy as np
+
+        arrays = {f"ev_{name}": np.frombuffer(col, dtype=col.typecode) if len(col) else np.zeros(0, dtype=col.typecode)
+                  for name, col in self.cols.items()}
+        arrays.update({f"ent_{name}": np.frombuffer(col, dtype=col.typecode) if len(col) else np.zeros(0, dtype=col.typecode)
+                       for name, col in self.ents.items()})
+        blob = json.dumps({"strings": self.strings, "extras": self.extras}, ensure_ascii=False).encode("utf-8")
+        arrays["tables"] = np.frombuffer(blob, dtype=np.uint8)
+        tmp = path.with_name(path.name + ".tmp")
+        with tmp.open("wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path) -> "EventColumns":
+        import numpy as np
+
+        out = cls()
+        with np.load(path) as z:
+            for name, code in _EVENT_COLS.items():
+                out.cols[name] = array(code, z[f"ev_{name}"].astype(code, copy=False).tobytes())
+            for name, code in _ENTITY_COLS.items():
+                out.ents[name] = array(code, z[f"ent_{name}"].astype(code, copy=False).tobytes())
+            tables = json.loads(z["tables"].tobytes().decode("utf-8"))
+        out.strings = tables["strings"]
+        out._string_ids = {s: i for i, s in enumerate(out.strings)}
+        out.extras = tables["extras"]
+        return out
+
+
+def write_meta(path: Path, chunks: List[str], events: int) -> None:
+    """Atomically (re)write meta.json listing the complete chunks of a columnar event directory."""
+    tmp = path / "meta.json.tmp"
+    tmp.write_text(json.dumps({"format": _FORMAT, "events": events, "chunks": chunks}, indent=2), encoding="utf-8")
+    os.replace(tmp, path / "meta.json")
+
+
+def read_columnar(path: Path) -> Iterator[EventColumns]:
+    """Chunks of a columnar event directory (events.cols), in order."""
+    path = Path(path)
+    meta = json.loads((path / "meta.json").read_text(encoding="utf-8"))
+    for name in meta["chunks"]:
+        yield EventColumns.load(path / name)
+
+
+def columnar_to_jsonl(path: Path, out_path: Path) -> int:
+    """Rebuild events.jsonl from a columnar event directory; returns the event count."""
+    n = 0
+    with Path(out_path).open("w", encoding="utf-8") as f:
+        for chunk in read_columnar(path):
+            for line in chunk.jsonl_lines():
+                f.write(line)
+                n += 1
+    return n
+
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import math
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+
+class MotionGate:
+    """
+    Cheap change detector in front of the detector. Each frame is reduced to a small
+    thumbnail and compared with the thumbnail of the last frame that was detected, in blocks of
+    `block` x `block` thumbnail pixels; when no block has `threshold` or more of its pixels
+    changed by more than `pixel_delta`, detection is skipped (the tracker then carries tracks
+    forward). Scoring the most-changed block rather than the whole frame keeps one small moving
+    object from being averaged away. At most every-1 frames are skipped in a row, so a full
+    detection still runs at least every `every` frames. `ignore` lists (x, y, w, h)
+    regions, as fractions of the frame, that never count as change (burned-in clocks, overlays).
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.05,
+        every: int = 8,
+        width: int = 160,
+        block: int = 8,
+        pixel_delta: int = 16,
+        ignore: Optional[Sequence[Tuple[float, float, float, float]]] = None,
+    ):
+        self.threshold = threshold
+        self.every = max(1, every)
+        self.width = width
+        self.block = block
+        self.pixel_delta = pixel_delta
+        self.ignore = list(ignore or [])
+        self.frames = 0
+        self.skipped = 0
+        self.forced = 0
+        self._ref = None
+        self._since = 0
+        # Set by resume(): frame_idx whose thumbnail becomes the reference via prime()
+        self.prime_idx: Optional[int] = None
+
+    def thumb(self, frame):
+        import numpy as np
+
+        h, w = frame.shape[:2]
+        size = (self.width, max(1, int(round(h * self.width / float(w)))))
+        try:
+            import cv2  # type: ignore
+
+            thumb = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        except ImportError:
+            ys = (np.arange(size[1]) * h // size[1]).astype(np.int64)
+            xs = (np.arange(size[0]) * w // size[0]).astype(np.int64)
+            thumb = frame[ys][:, xs].copy()
+        for x, y, rw, rh in self.ignore:
+            tw, th = size
+            # Every thumbnail pixel the region touches
+            x0, y0 = int(x * tw), int(y * th)
+            x1, y1 = int(math.ceil((x + rw) * tw)), int(math.ceil((y + rh) * th))
+            thumb[y0:y1, x0:x1] = 0
+        return thumb
+
+    def score(self, thumb) -> float:
+        """Share of changed pixels in the most-changed block, against the reference."""
+        import numpy as np
+
+        diff = np.abs(thumb.astype(np.int16) - self._ref.astype(np.int16))
+        # Colour rather than grayscale: objects about as bright as the background still count
+        changed = (diff.max(axis=2) if diff.ndim == 3 else diff) > self.pixel_delta
+        h, w = changed.shape
+        b = self.block
+        # Edge blocks are padded with unchanged pixels
+        padded = np.zeros((-(-h // b) * b, -(-w // b) * b), dtype=np.float32)
+        padded[:h, :w] = changed
+        blocks = padded.reshape(padded.shape[0] // b, b, padded.shape[1] // b, b).mean(axis=(1, 3))
+        return float(blocks.max())
+
+    def check(self, frame) -> bool:
+        """True if the frame should go through the detector."""
+        self.frames += 1
+        thumb = self.thumb(frame)
+        if self._ref is None or self._ref.shape != thumb.shape:
+            run = True
+        elif self._since + 1 >= self.every:
+            run = True
+            self.forced += 1
+        else:
+            run = self.score(thumb) >= self.threshold
+        if run:
+            self._ref = thumb
+            self._since = 0
+        else:
+            self._since += 1
+            self.skipped += 1
+        return run
+
+    def resume(self, prime_idx: int, since: int) -> None:
+        """Continue a checkpointed run: the reference is frame prime_idx, `since` frames skipped after it."""
+        self.prime_idx = prime_idx
+        self._since = since
+
+    def prime(self, frame) -> None:
+        self._ref = self.thumb(frame)
+
+    def wrap(self, detect_batch: Callable[[List[Any]], List[Any]]) -> Callable[[List[Any]], List[Optional[Any]]]:
+        """detect_batch that returns None in place of detections for frames the gate skips."""
+
+        def gated(frames: List[Any]) -> List[Optional[Any]]:
+            run = [self.check(f) for f in frames]
+            picked = [f for f, r in zip(frames, run) if r]
+            dets = iter(detect_batch(picked) if picked else [])
+            return [next(dets) if r else None for r in run]
+
+        return gated
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "frames": self.frames,
+            "detected": self.frames - self.skipped,
+            "skipped": self.skipped,
+            "forced": self.forced,
+            "skip_ratio": self.skipped / self.frames if self.frames else 0.0,
+        }
+
+
+def make_gate(cfg) -> Optional[MotionGate]:
+    if not cfg.motion_gate:
+        return None
+    return MotionGate(threshold=cfg.motion_gate_threshold, every=cfg.motion_gate_every, ignore=cfg.motion_gate_ignore)
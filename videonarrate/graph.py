@@ -1,16 +1,104 @@
 from __future__ import annotations
 
-from typing import List, Tuple
+import math
+from typing import Dict, List, Optional, Tuple
 
 from .track import Track
 from .schemas import Interaction
 
+_VEHICLES = frozenset({"car", "truck", "bus", "vehicle"})
 
-def infer_interactions(tracks: List[Track]) -> List[Tuple[int, int, Interaction]]:
+# (label, label) -> (interaction type, confidence); filled on first sight of each label pair
+_PAIR_RULES: Dict[Tuple[str, str], Tuple[str, float]] = {}
+
+
+def _pair_rule(la: str, lb: str) -> Tuple[str, float]:
+    rule = _PAIR_RULES.get((la, lb))
+    if rule is None:
+        labels = {la, lb}
+        # Naive: if one is person and the other is vehicle, assume potential yield
+        if "person" in labels and labels & _VEHICLES:
+            rule = ("yielding/passing", 0.6)
+        else:
+            rule = ("nearby", 0.5)
+        _PAIR_RULES[(la, lb)] = rule
+        _PAIR_RULES[(lb, la)] = rule
+    return rule
+
+
+def _close_pairs(tracks: List[Track]) -> List[Tuple[int, int, float]]:
+    """
+    All (i, j, dist2) with i < j whose centers are within 2x their average bbox size.
+    Uses a uniform grid over track centers: a close pair is at most r_i + r_j <= 2 * max(r_i, r_j)
+    apart (r = (w + h) / 2), so each track only searches cells within 2r of itself for
+    tracks no larger than it, and every pair is tested once from its larger endpoint.
+    """
+    n = len(tracks)
+    if n < 2:
+        return []
+    centers = [(tr.bbox.x + tr.bbox.w / 2.0, tr.bbox.y + tr.bbox.h / 2.0) for tr in tracks]
+    radii = [(tr.bbox.w + tr.bbox.h) / 2.0 for tr in tracks]
+    # Cell size from the typical bbox scale so most tracks only look at their 3x3 neighbourhood
+    cell = max(1.0, 2.0 * sorted(radii)[n // 2])
+    grid: Dict[Tuple[int, int], List[int]] = {}
+    keys = []
+    for i, (cx, cy) in enumerate(centers):
+        key = (math.floor(cx / cell), math.floor(cy / cell))
+        keys.append(key)
+        grid.setdefault(key, []).append(i)
+
+    out: List[Tuple[int, int, float]] = []
+    for i in range(n):
+        ri = radii[i]
+        reach = int(math.ceil(2.0 * ri / cell))
+        gx, gy = keys[i]
+        for x in range(gx - reach, gx + reach + 1):
+            for y in range(gy - reach, gy + reach + 1):
+                for j in grid.get((x, y), ()):
+                    rj = radii[j]
+                    # Test each pair once, from the endpoint with the larger radius (ties: lower index)
+                    if rj > ri or (rj == ri and j <= i):
+                        continue
+                    a, b = (i, j) if i < j else (j, i)
+                    ca, cb = centers[a], centers[b]
+                    dx = cb[0] - ca[0]
+                    dy = cb[1] - ca[1]
+                    dist2 = dx * dx + dy * dy
+                    # Close if centers within 2x average bbox size
+                    thresh = ((tracks[a].bbox.w + tracks[b].bbox.w + tracks[a].bbox.h + tracks[b].bbox.h) / 4.0)
+                    if dist2 < (2.0 * thresh) ** 2:
+                        out.append((a, b, dist2))
+    return out
+
+
+def infer_interactions(tracks: List[Track], max_neighbors: Optional[int] = None) -> List[Tuple[int, int, Interaction]]:
     """
     Very simple interaction inference: if two tracks are close and relative speed suggests
-    approach/avoid/yield. Returns list of (subject_id, object_id, Interaction).
+    approach/avoid/yield. Returns list of (subject_id, object_id, Interaction), in the same
+    (i, j) input order as an all-pairs scan. With max_neighbors, each track keeps only its
+    nearest max_neighbors partners.
     """
+    close = _close_pairs(tracks)
+    if max_neighbors is not None:
+        degree = [0] * len(tracks)
+        kept = []
+        for i, j, d2 in sorted(close, key=lambda p: p[2]):
+            if degree[i] < max_neighbors and degree[j] < max_neighbors:
+                degree[i] += 1
+                degree[j] += 1
+                kept.append((i, j, d2))
+        close = kept
+    close.sort()
+    pairs: List[Tuple[int, int, Interaction]] = []
+    for i, j, _ in close:
+        ti, tj = tracks[i], tracks[j]
+        kind, conf = _pair_rule(ti.label, tj.label)
+        pairs.append((ti.id, tj.id, Interaction(type=kind, confidence=conf)))
+    return pairs
+
+
+def _infer_interactions_all_pairs(tracks: List[Track]) -> List[Tuple[int, int, Interaction]]:
+    """Reference O(n^2) scan that infer_interactions must agree with (used by the benchmark)."""
     pairs: List[Tuple[int, int, Interaction]] = []
     def center(b):
         c = (b.x + b.w/2.0, b.y + b.h/2.0)
@@ -33,4 +121,3 @@ def infer_interactions(tracks: List[Track]) -> List[Tuple[int, int, Interaction]
                 else:
                     pairs.append((ti.id, tj.id, Interaction(type="nearby", confidence=0.5)))
     return pairs
-
@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+import json
+import math
+import mmap
+import os
+import shutil
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+from .schemas import Event
+
+_FORMAT = 1
+INDEX_DIR = "events.idx"
+
+
+def _csr(postings: Dict[int, array], keys: Sequence[int]):
+    """(ptr, ids) arrays for postings listed in `keys` order."""
+    import numpy as np
+
+    ptr = np.zeros(len(keys) + 1, dtype=np.int64)
+    for k, key in enumerate(keys):
+        ptr[k + 1] = ptr[k] + len(postings.get(key, ()))
+    ids = np.empty(int(ptr[-1]), dtype=np.int64)
+    for k, key in enumerate(keys):
+        ids[ptr[k]:ptr[k + 1]] = postings.get(key, ())
+    return ptr, ids
+
+
+class EventIndexWriter:
+    """
+    Builds the sidecar index for events.jsonl while it is written: per record byte offset,
+    length and time span, plus postings lists per time bucket, per label and per track id
+    (any subject or object). Saved as .npy arrays so EventIndex can mmap them.
+    """
+
+    def __init__(self, path: Path, bucket_s: float = 10.0):
+        self.path = path
+        self.bucket_s = bucket_s
+        self.offsets = array("q")
+        self.lengths = array("q")
+        self.start = array("d")
+        self.end = array("d")
+        self.by_bucket: Dict[int, array] = {}
+        self.by_label: Dict[str, array] = {}
+        self.by_track: Dict[int, array] = {}
+
+    def add(self, ev: Event, offset: int, length: int) -> None:
+        rid = len(self.offsets)
+        self.offsets.append(offset)
+        self.lengths.append(length)
+        self.start.append(ev.start)
+        self.end.append(ev.end)
+        for b in range(int(ev.start // self.bucket_s), int(ev.end // self.bucket_s) + 1):
+            self.by_bucket.setdefault(b, array("q")).append(rid)
+        labels = set()
+        tracks = set()
+        for e in ev.subjects + ev.objects:
+            labels.add(e.label)
+            tracks.add(e.id)
+        for label in labels:
+            self.by_label.setdefault(label, array("q")).append(rid)
+        for tid in tracks:
+            self.by_track.setdefault(tid, array("q")).append(rid)
+
+    def save(self, jsonl_size: int) -> None:
+        import numpy as np
+
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        if tmp.exists():
+            shutil.rmtree(tmp)
+        tmp.mkdir(parents=True)
+        np.save(tmp / "offsets.npy", np.frombuffer(self.offsets, dtype=np.int64) if self.offsets else np.zeros(0, np.int64))
+        np.save(tmp / "lengths.npy", np.frombuffer(self.lengths, dtype=np.int64) if self.lengths else np.zeros(0, np.int64))
+        np.save(tmp / "start.npy", np.frombuffer(self.start, dtype=np.float64) if self.start else np.zeros(0))
+        np.save(tmp / "end.npy", np.frombuffer(self.end, dtype=np.float64) if self.end else np.zeros(0))
+        n_buckets = max(self.by_bucket) + 1 if self.by_bucket else 0
+        for name, postings, keys in (
+            ("time", self.by_bucket, list(range(n_buckets))),
+            ("label", self.by_label, sorted(self.by_label)),
+            ("track", self.by_track, sorted(self.by_track)),
+        ):
+            ptr, ids = _csr(postings, keys)
+            np.save(tmp / f"{name}_ptr.npy", ptr)
+            np.save(tmp / f"{name}_ids.npy", ids)
+        np.save(tmp / "track_keys.npy", np.asarray(sorted(self.by_track), dtype=np.int64))
+        meta = {
+            "format": _FORMAT,
+            "events": len(self.offsets),
+            "bucket_s": self.bucket_s,
+            "labels": sorted(self.by_label),
+            "jsonl_size": jsonl_size,
+        }
+        (tmp / "meta.json").write_text(json.dumps(meta, indent=2), encoding="utf-8")
+        if self.path.exists():
+            shutil.rmtree(self.path)
+        os.replace(tmp, self.path)
+
+
+class EventIndex:
+    """
+    Query events.jsonl through its sidecar index without reading unrelated records: the index
+    arrays and the JSONL file are memory-mapped, and only matching byte ranges are touched.
+    """
+
+    def __init__(self, out_dir: str):
+        import numpy as np
+
+        out = Path(out_dir)
+        self.jsonl_path = out / "events.jsonl"
+        path = out / INDEX_DIR
+        self.meta = json.loads((path / "meta.json").read_text(encoding="utf-8"))
+        size = self.jsonl_path.stat().st_size
+        if size != self.meta["jsonl_size"]:
+            raise ValueError(f"{path} is stale: indexed {self.meta['jsonl_size']} bytes, events.jsonl has {size}")
+        load = lambda name: np.load(path / f"{name}.npy", mmap_mode="r")  # noqa: E731
+        self.offsets, self.lengths = load("offsets"), load("lengths")
+        self.start, self.end = load("start"), load("end")
+        self.postings = {name: (load(f"{name}_ptr"), load(f"{name}_ids")) for name in ("time", "label", "track")}
+        self.track_keys = load("track_keys")
+        self.labels: List[str] = self.meta["labels"]
+        self._f = self.jsonl_path.open("rb")
+        self._mm = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+
+    def close(self) -> None:
+        if self._mm is not None:
+            self._mm.close()
+        self._f.close()
+
+    def __enter__(self) -> "EventIndex":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return int(self.meta["events"])
+
+    def _posting(self, name: str, k: int):
+        ptr, ids = self.postings[name]
+        return ids[int(ptr[k]):int(ptr[k + 1])]
+
+    def query(
+        self,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        labels: Optional[Iterable[str]] = None,
+        track_ids: Optional[Iterable[int]] = None,
+    ):
+        """Record ids (ascending, i.e. file order) of events overlapping [start, end] that mention any of `labels` and any of `track_ids`."""
+        import numpy as np
+
+        sets = []
+        if start is not None or end is not None:
+            n_buckets = len(self.postings["time"][0]) - 1
+            b0 = max(0, int(math.floor((start or 0.0) / self.meta["bucket_s"])))
+            b1 = n_buckets - 1 if end is None else min(n_buckets - 1, int(math.floor(end / self.meta["bucket_s"])))
+            ids = np.unique(np.concatenate([self._posting("time", b) for b in range(b0, b1 + 1)] or [np.zeros(0, np.int64)]))
+            # Buckets are coarse; check the exact spans of the candidates
+            keep = np.ones(len(ids), dtype=bool)
+            if start is not None:
+                keep &= self.end[ids] >= start
+            if end is not None:
+                keep &= self.start[ids] <= end
+            sets.append(ids[keep])
+        if labels is not None:
+            wanted = [self.labels.index(lbl) for lbl in set(labels) if lbl in self.labels]
+            sets.append(np.unique(np.concatenate([self._posting("label", k) for k in wanted] or [np.zeros(0, np.int64)])))
+        if track_ids is not None:
+            ks = np.searchsorted(self.track_keys, list(track_ids))
+            wanted = [int(k) for k, tid in zip(ks, track_ids) if k < len(self.track_keys) and self.track_keys[k] == tid]
+            sets.append(np.unique(np.concatenate([self._posting("track", k) for k in wanted] or [np.zeros(0, np.int64)])))
+        if not sets:
+            return np.arange(len(self), dtype=np.int64)
+        out = sets[0]
+        for s in sets[1:]:
+            out = np.intersect1d(out, s, assume_unique=True)
+        return out
+
+    def lines(self, ids) -> Iterator[bytes]:
+        """Raw JSONL records (with trailing newline) for record ids."""
+        mm = self._mm
+        for rid in ids:
+            off = int(self.offsets[rid])
+            yield mm[off:off + int(self.lengths[rid])]
+
+    def events(self, ids) -> Iterator[Event]:
+        for line in self.lines(ids):
+            yield Event.from_dict(json.loads(line))
+
+
+def parse_time(value: str) -> float:
+    """Seconds from "SS(.ms)", "MM:SS(.ms)" or "HH:MM:SS(.ms)" (comma or dot decimal separator)."""
+    secs = 0.0
+    for part in value.replace(",", ".").split(":"):
+        secs = secs * 60.0 + float(part)
+    return secs
+
+
+def write_captions(events: List[Event], out_path: Path, fmt: str = "srt") -> None:
+    """Regenerate captions for a subset of events (e.g. one EventIndex.query) as SRT or VTT."""
+    from .compose import compose_captions
+    from .io import write_srt, write_vtt
+
+    captions = compose_captions(events)
+    if fmt == "vtt":
+        write_vtt(captions, out_path)
+    else:
+        write_srt(captions, out_path)
@@ -1,9 +1,17 @@
 from __future__ import annotations
 
+import itertools
 import json
+import os
+import shutil
+import time
+from abc import ABC, abstractmethod
 from pathlib import Path
-from typing import Iterable, List
+from typing import IO, Any, Dict, Iterable, List, Optional
 
+from .compose import EventSummary, compose_captions
+from .eventstore import EventColumns, write_meta
+from .index import INDEX_DIR, EventIndexWriter
 from .schemas import Event, CaptionLine, Summary
 
 
@@ -20,8 +28,11 @@ def write_jsonl(events: Iterable[Event], out_path: Path) -> None:
 
 def write_summary(summary: Summary, out_path: Path) -> None:
     ensure_dir(out_path.parent)
-    with out_path.open("w", encoding="utf-8") as f:
+    # Write then rename so readers never see a half-written summary mid-run
+    tmp = out_path.with_name(out_path.name + ".tmp")
+    with tmp.open("w", encoding="utf-8") as f:
         json.dump(summary.__dict__, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, out_path)
 
 
 def _format_ts(seconds: float) -> str:
@@ -42,19 +53,324 @@ def write_srt(captions: List[CaptionLine], out_path: Path) -> None:
             f.write(c.text.strip() + "\n\n")
 
 
+def _format_vtt_ts(t: float) -> str:
+    # VTT timestamp format: HH:MM:SS.mmm
+    return _format_ts(t).replace(",", ".")
+
+
 def write_vtt(captions: List[CaptionLine], out_path: Path) -> None:
     ensure_dir(out_path.parent)
     with out_path.open("w", encoding="utf-8") as f:
         f.write("WEBVTT\n\n")
         for c in captions:
-            # VTT timestamp format: HH:MM:SS.mmm
-            def vtt_ts(t: float) -> str:
-                ms = int(round((t - int(t)) * 1000))
-                s = int(t) % 60
-                m = (int(t) // 60) % 60
-                h = int(t) // 3600
-                return f"{h:02d}:{m:02d}:{s:02d}.{ms:03d}"
-
-            f.write(f"{vtt_ts(c.t_start)} --> {vtt_ts(c.t_end)}\n")
+            f.write(f"{_format_vtt_ts(c.t_start)} --> {_format_vtt_ts(c.t_end)}\n")
             f.write(c.text.strip() + "\n\n")
 
+
+class EventSink(ABC):
+    """
+    Receives events as each window closes; subclasses write them somewhere. checkpoint_state()
+    returns what a sink constructed with `state=` needs to continue an interrupted run.
+    """
+
+    @abstractmethod
+    def write(self, events: List[Event]) -> None:
+        ...
+
+    def flush(self) -> None:
+        pass
+
+    def cut(self, t: float) -> None:
+        """A shot cut at t; events written after it belong to the next shot."""
+        pass
+
+    def close(self) -> None:
+        self.flush()
+
+    def checkpoint_state(self) -> Optional[Dict[str, Any]]:
+        """Called right after flush(); JSON-able."""
+        return None
+
+
+class _FileSink(EventSink):
+    """Output file; with a checkpoint `state`, reopened and truncated to the checkpointed offset."""
+
+    def __init__(self, out_path: Path, binary: bool = False, state: Optional[Dict[str, Any]] = None):
+        ensure_dir(out_path.parent)
+        self.path = out_path
+        if state is None:
+            self._f: Optional[IO] = out_path.open("wb") if binary else out_path.open("w", encoding="utf-8")
+        else:
+            self._f = out_path.open("r+b") if binary else out_path.open("r+", encoding="utf-8")
+            self._f.seek(state["offset"])
+            self._f.truncate()
+
+    def flush(self) -> None:
+        if self._f is not None:
+            self._f.flush()
+
+    def checkpoint_state(self) -> Optional[Dict[str, Any]]:
+        return {"offset": self._f.tell()}
+
+    def close(self) -> None:
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+
+
+class JsonlSink(_FileSink):
+    """
+    Streaming write_jsonl. With `index`, lines are encoded here so each record's byte offset
+    is known, and the sidecar index is saved next to the file on close.
+    """
+
+    def __init__(self, out_path: Path, index: bool = False, state: Optional[Dict[str, Any]] = None):
+        super().__init__(out_path, binary=True, state=state)
+        self.offset = 0
+        self.index = EventIndexWriter(out_path.parent / INDEX_DIR) if index else None
+        if state is not None:
+            self.offset = state["offset"]
+            if self.index is not None:
+                # The index is not checkpointed (it grows with the output): rebuild it from the kept records
+                with out_path.open("rb") as f:
+                    offset = 0
+                    for line in itertools.islice(f, state["events"]):
+                        self.index.add(Event.from_dict(json.loads(line)), offset, len(line))
+                        offset += len(line)
+        self.events = state["events"] if state is not None else 0
+
+    def write(self, events: List[Event]) -> None:
+        f = self._f
+        index = self.index
+        for ev in events:
+            data = (json.dumps(ev.to_dict(), ensure_ascii=False) + "\n").encode("utf-8")
+            f.write(data)
+            if index is not None:
+                index.add(ev, self.offset, len(data))
+            self.offset += len(data)
+        self.events += len(events)
+
+    def checkpoint_state(self) -> Optional[Dict[str, Any]]:
+        return {"offset": self.offset, "events": self.events}
+
+    def close(self) -> None:
+        if self._f is not None and self.index is not None:
+            self._f.flush()
+            self.index.save(self.offset)
+        super().close()
+
+
+class CaptionSink(_FileSink):
+    """Streaming write_srt / write_vtt; SRT cue indices continue across writes."""
+
+    def __init__(self, out_path: Path, fmt: str = "srt", state: Optional[Dict[str, Any]] = None):
+        super().__init__(out_path, state=state)
+        self.fmt = fmt
+        self.index = state["index"] if state is not None else 0
+        if fmt == "vtt" and state is None:
+            self._f.write("WEBVTT\n\n")
+
+    def write(self, events: List[Event]) -> None:
+        f = self._f
+        for c in compose_captions(events):
+            if self.fmt == "vtt":
+                f.write(f"{_format_vtt_ts(c.t_start)} --> {_format_vtt_ts(c.t_end)}\n")
+            else:
+                self.index += 1
+                f.write(f"{self.index}\n")
+                f.write(f"{_format_ts(c.t_start)} --> {_format_ts(c.t_end)}\n")
+            f.write(c.text.strip() + "\n\n")
+
+    def checkpoint_state(self) -> Optional[Dict[str, Any]]:
+        return {"offset": self._f.tell(), "index": self.index}
+
+
+class SummarySink(EventSink):
+    """
+    Keeps summarize_events state incrementally and rewrites summary.json on each flush. With
+    `scenes`, each cut() closes the current scene and starts a new one, and every scene also
+    carries its start and end time (the next cut, or for the last one its latest event's end).
+    """
+
+    def __init__(self, out_path: Path, scenes: bool = False, state: Optional[Dict[str, Any]] = None):
+        self.path = out_path
+        self.scenes = scenes
+        self.summary = EventSummary()
+        self.closed: List[Dict[str, Any]] = []
+        self.start = 0.0
+        self.end = 0.0
+        if state is not None:
+            self.summary.labels = dict(state["labels"])
+            self.summary.events_count = state["events_count"]
+            if scenes:
+                self.closed = state["closed"]
+                self.start, self.end = state["start"], state["end"]
+
+    def write(self, events: List[Event]) -> None:
+        self.summary.add(events)
+        if self.scenes:
+            self.end = max([self.end] + [ev.end for ev in events])
+
+    def _scene(self, end: float) -> Dict[str, Any]:
+        return {"start": self.start, "end": end, **self.summary.to_dict()}
+
+    def cut(self, t: float) -> None:
+        if self.scenes:
+            self.closed.append(self._scene(t))
+            self.summary = EventSummary()
+            self.start = self.end = t
+
+    def flush(self) -> None:
+        scenes = self.closed + [self._scene(self.end)] if self.scenes else [self.summary.to_dict()]
+        write_summary(Summary(scenes=scenes), self.path)
+
+    def checkpoint_state(self) -> Optional[Dict[str, Any]]:
+        state = {"labels": self.summary.labels, "events_count": self.summary.events_count}
+        if self.scenes:
+            state.update(closed=self.closed, start=self.start, end=self.end)
+        return state
+
+
+class ColumnarSink(EventSink):
+    """
+    Columnar event directory (eventstore.EventColumns): a .npz file per `chunk_events` events
+    plus meta.json listing the finished chunks, so a reader mid-run sees whole chunks only.
+    """
+
+    def __init__(self, out_path: Path, chunk_events: int = 65536, state: Optional[Dict[str, Any]] = None):
+        self.path = out_path
+        self.chunk_events = chunk_events
+        self.chunks: List[str] = []
+        self.events = 0
+        self._cols = EventColumns()
+        if state is not None:
+            self._restore(state)
+            return
+        if out_path.exists():
+            shutil.rmtree(out_path)
+        out_path.mkdir(parents=True)
+        write_meta(out_path, self.chunks, 0)
+
+    def _restore(self, state: Dict[str, Any]) -> None:
+        self.chunks = list(state["chunks"])
+        self.events = state["spilled"]
+        for name in os.listdir(self.path):
+            if name.startswith("chunk_") and name not in self.chunks:
+                os.remove(self.path / name)
+        write_meta(self.path, self.chunks, self.events)
+        # The unspilled tail is not checkpointed; re-read it from events.jsonl, which holds
+        # the same records in the same order
+        with (self.path.parent / "events.jsonl").open("rb") as f:
+            for line in itertools.islice(f, self.events, state["events"]):
+                self._cols.append(Event.from_dict(json.loads(line)))
+
+    def write(self, events: List[Event]) -> None:
+        self._cols.extend(events)
+        if len(self._cols) >= self.chunk_events:
+            self._spill()
+
+    def _spill(self) -> None:
+        if not len(self._cols):
+            return
+        name = f"chunk_{len(self.chunks):06d}.npz"
+        self._cols.save(self.path / name)
+        self.chunks.append(name)
+        self.events += len(self._cols)
+        self._cols = EventColumns()
+        write_meta(self.path, self.chunks, self.events)
+
+    def close(self) -> None:
+        self._spill()
+
+    def checkpoint_state(self) -> Optional[Dict[str, Any]]:
+        return {"chunks": list(self.chunks), "spilled": self.events, "events": self.events + len(self._cols)}
+
+
+class MultiSink(EventSink):
+    """
+    Fans events out to several sinks and flushes them every flush_interval seconds. `raw`, if
+    given, gets the per-window event stream through write_raw() when the others get spans.
+    """
+
+    def __init__(
+        self,
+        sinks: List[EventSink],
+        flush_interval: Optional[float] = 5.0,
+        events_written: int = 0,
+        raw: Optional[EventSink] = None,
+    ):
+        self.sinks = sinks
+        self.flush_interval = flush_interval
+        self.events_written = events_written
+        self.raw = raw
+        self._last_flush = time.monotonic()
+
+    def write(self, events: List[Event]) -> None:
+        if events:
+            for sink in self.sinks:
+                sink.write(events)
+            self.events_written += len(events)
+        if self.flush_interval is not None and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def write_raw(self, events: List[Event]) -> None:
+        if self.raw is not None and events:
+            self.raw.write(events)
+
+    def cut(self, t: float) -> None:
+        for sink in self.sinks:
+            sink.cut(t)
+
+    def _all(self) -> List[EventSink]:
+        return self.sinks + [self.raw] if self.raw is not None else self.sinks
+
+    def flush(self) -> None:
+        for sink in self._all():
+            sink.flush()
+        self._last_flush = time.monotonic()
+
+    def close(self) -> None:
+        for sink in self._all():
+            sink.flush()
+            sink.close()
+
+    def checkpoint_state(self) -> Dict[str, Any]:
+        """Flush every sink and return their states keyed by output name (see open_sinks(state=))."""
+        self.flush()
+        return {
+            "events_written": self.events_written,
+            "sinks": {sink.path.name: sink.checkpoint_state() for sink in self._all()},
+        }
+
+
+def open_sinks(
+    out_dir: Path,
+    vtt: bool = False,
+    flush_interval: Optional[float] = 5.0,
+    columnar: bool = False,
+    index: bool = True,
+    raw: bool = False,
+    scenes: bool = False,
+    state: Optional[Dict[str, Any]] = None,
+) -> MultiSink:
+    """
+    The standard outputs (events.jsonl with its events.idx/ index, captions.srt, optional
+    captions.vtt, summary.json and optional columnar events.cols/) as one sink, plus
+    events.raw.jsonl for the per-window stream with `raw`; `scenes` splits summary.json into
+    one scene per shot (see SummarySink). With `state` from
+    MultiSink.checkpoint_state(), existing outputs are continued from that point.
+    """
+    st = state["sinks"] if state is not None else {}
+    sinks: List[EventSink] = [
+        JsonlSink(out_dir / "events.jsonl", index=index, state=st.get("events.jsonl")),
+        CaptionSink(out_dir / "captions.srt", fmt="srt", state=st.get("captions.srt")),
+    ]
+    if vtt:
+        sinks.append(CaptionSink(out_dir / "captions.vtt", fmt="vtt", state=st.get("captions.vtt")))
+    if columnar:
+        sinks.append(ColumnarSink(out_dir / "events.cols", state=st.get("events.cols")))
+    sinks.append(SummarySink(out_dir / "summary.json", scenes=scenes, state=st.get("summary.json")))
+    events_written = state["events_written"] if state is not None else 0
+    raw_sink = JsonlSink(out_dir / "events.raw.jsonl", state=st.get("events.raw.jsonl")) if raw else None
+    return MultiSink(sinks, flush_interval=flush_interval, events_written=events_written, raw=raw_sink)
+
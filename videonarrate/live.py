@@ -0,0 +1,404 @@
+from __future__ import annotations
+
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Dict, Optional, Sequence, Tuple, Union
+
+from .config import Config
+from .decode import _frame_time, scaled_size
+from .detect import Detector
+from .gate import make_gate
+from .io import open_sinks
+from .metrics import Histogram, MetricsHook
+from .motion import MOTION_HISTORY
+from .track import make_tracker
+
+# Share of each sampling interval that detection + tracking may use before the fps is lowered
+_DUTY = 0.9
+# Smoothing of the per-frame processing time estimate
+_EMA = 0.2
+
+
+class LiveSource(ABC):
+    """
+    Frames from a live feed, read on a background thread that never waits for the consumer:
+    only the newest frame is kept, so a slow consumer skips frames instead of building a
+    backlog. Frames on the nominal `fps` grid are published and counted as `due`; every
+    frame read counts as `captured`.
+    """
+
+    def __init__(self, fps: int, max_side: Optional[int] = None, end: Optional[float] = None):
+        self.fps = max(1, fps)
+        self.max_side = max_side
+        # Stop reading after this stream time (seconds)
+        self.end = end
+        self.scale = 1.0
+        self.captured = 0
+        self.due = 0
+        self.error: Optional[BaseException] = None
+        self._next_t = 0.0
+        self._size: Optional[Tuple[int, int]] = None
+        # (frame_idx, t, frame, arrival monotonic time) of the newest published frame
+        self._latest: Optional[Tuple[int, float, Any, float]] = None
+        self._seq = 0
+        self._done = False
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+
+    def start(self) -> "LiveSource":
+        threading.Thread(target=self._run, name="videonarrate-live", daemon=True).start()
+        return self
+
+    def close(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        try:
+            self._read()
+        except BaseException as exc:  # surfaced by process_live
+            self.error = exc
+        finally:
+            with self._cond:
+                self._done = True
+                self._cond.notify_all()
+
+    @abstractmethod
+    def _read(self) -> None:
+        """Read the feed on the background thread until it ends or close() is called, publishing each frame."""
+
+    def _on_grid(self, t: float, tol: float) -> bool:
+        """Same tick selection as decode's grab sampler."""
+        if t + tol < self._next_t:
+            return False
+        step = 1.0 / self.fps
+        while self._next_t <= t + tol:
+            self._next_t += step
+        return True
+
+    def _publish(self, frame_idx: int, t: float, frame: Any) -> None:
+        if self.max_side:
+            import cv2  # type: ignore
+
+            if self._size is None:
+                h, w = frame.shape[:2]
+                sw, sh, self.scale = scaled_size(w, h, self.max_side)
+                self._size = (sw, sh)
+            if self.scale != 1.0:
+                frame = cv2.resize(frame, self._size, interpolation=cv2.INTER_AREA)
+        with self._cond:
+            self._latest = (frame_idx, t, frame, time.monotonic())
+            self._seq += 1
+            self.due += 1
+            self._cond.notify_all()
+
+    def wait_newer(self, seq: int, min_t: float) -> Optional[Tuple[int, Tuple[int, float, Any, float]]]:
+        """
+        Block until the newest frame is newer than `seq` and has t >= min_t; returns (seq, frame
+        tuple), or None once the source has ended without such a frame.
+        """
+        with self._cond:
+            while True:
+                item = self._latest
+                if item is not None and self._seq > seq and item[1] >= min_t:
+                    return self._seq, item
+                if self._done:
+                    return None
+                self._cond.wait(0.5)
+
+
+class CaptureSource(LiveSource):
+    """
+    OpenCV capture of a stream URL (e.g. rtsp://), a camera index or a file. A file is replayed
+    at `replay_speed` times wall-clock speed with its own timestamps; live feeds are stamped by
+    arrival time. Every frame is grabbed to keep up with the feed, but only frames on the fps
+    grid are retrieved.
+    """
+
+    def __init__(
+        self,
+        target: Union[str, int],
+        fps: int,
+        max_side: Optional[int] = None,
+        end: Optional[float] = None,
+        replay_speed: Optional[float] = None,
+    ):
+        super().__init__(fps, max_side=max_side, end=end)
+        self.target = target
+        self.replay_speed = replay_speed
+
+    def _read(self) -> None:
+        import cv2  # type: ignore
+
+        cap = cv2.VideoCapture(self.target)
+        if not cap.isOpened():
+            raise OSError(f"Cannot open live source {self.target!r}")
+        native_fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        tol = 0.5 / native_fps
+        t0 = time.monotonic()
+        idx = 0
+        try:
+            while not self._stop.is_set() and cap.grab():
+                if self.replay_speed:
+                    t = _frame_time(cap, cv2, idx, native_fps)
+                    # Hold each frame back until its presentation time, like a camera would
+                    wait = t0 + t / self.replay_speed - time.monotonic()
+                    if wait > 0 and self._stop.wait(wait):
+                        break
+                else:
+                    t = time.monotonic() - t0
+                if self.end is not None and t > self.end:
+                    break
+                self.captured += 1
+                if self._on_grid(t, tol):
+                    ok, frame = cap.retrieve()
+                    if ok:
+                        self._publish(idx, t, frame)
+                idx += 1
+        finally:
+            cap.release()
+
+
+class StdinSource(LiveSource):
+    """Raw bgr24 frames of a known size piped on stdin (e.g. `ffmpeg ... -f rawvideo -pix_fmt bgr24 -`)."""
+
+    def __init__(self, size: Tuple[int, int], fps: int, max_side: Optional[int] = None, end: Optional[float] = None):
+        super().__init__(fps, max_side=max_side, end=end)
+        self.size = size
+
+    def _read(self) -> None:
+        import numpy as np
+
+        w, h = self.size
+        nbytes = w * h * 3
+        stream = sys.stdin.buffer
+        tol = 0.25 / self.fps
+        t0: Optional[float] = None
+        idx = 0
+        while not self._stop.is_set():
+            buf = np.empty((h, w, 3), dtype=np.uint8)
+            view = memoryview(buf.reshape(-1))
+            got = 0
+            while got < nbytes:
+                n = stream.readinto(view[got:])
+                if not n:
+                    break
+                got += n
+            if got < nbytes:
+                return
+            now = time.monotonic()
+            if t0 is None:
+                t0 = now
+            t = now - t0
+            if self.end is not None and t > self.end:
+                return
+            self.captured += 1
+            if self._on_grid(t, tol):
+                self._publish(idx, t, buf)
+            idx += 1
+
+
+def open_live_source(source: str, cfg: Config) -> LiveSource:
+    """"-" reads raw frames from stdin, digits pick a camera, URLs are streamed, anything else is a file replay."""
+    if source == "-":
+        if cfg.live_frame_size is None:
+            raise ValueError("Live input from stdin needs live_frame_size (--live-size WxH)")
+        return StdinSource(tuple(cfg.live_frame_size), cfg.fps, max_side=cfg.decode_max_side, end=cfg.max_seconds)
+    if source.isdigit():
+        return CaptureSource(int(source), cfg.fps, max_side=cfg.decode_max_side, end=cfg.max_seconds)
+    if "://" in source:
+        return CaptureSource(source, cfg.fps, max_side=cfg.decode_max_side, end=cfg.max_seconds)
+    return CaptureSource(source, cfg.fps, max_side=cfg.decode_max_side, end=cfg.max_seconds, replay_speed=cfg.replay_speed)
+
+
+class LiveStatusHook(MetricsHook):
+    """Prints a status line (frames, drops, latency, sampling fps) to stderr as each window closes."""
+
+    def on_window(self, snapshot: Dict[str, Any]) -> None:
+        print(
+            f"[live] t={snapshot['t']:.1f}s processed={snapshot.get('processed', 0)} dropped={snapshot.get('dropped', 0)} "
+            f"latency={snapshot.get('latency_ms', 0.0):.0f}ms fps={snapshot.get('fps_effective', 0.0):.1f} "
+            f"events={snapshot['events']}",
+            file=sys.stderr,
+            flush=True,
+        )
+
+
+def process_live(
+    source: str,
+    out_dir: str,
+    cfg: Config,
+    detector: Optional[Detector] = None,
+    hooks: Optional[Sequence[MetricsHook]] = None,
+) -> Dict[str, Any]:
+    """
+    Narrate a live feed (see open_live_source) until it ends or is interrupted, writing the
+    usual outputs as each window closes. Each frame is picked up as the newest available one
+    on an adaptive fps grid: when detection cannot keep up the sampling fps is lowered (down to
+    cfg.live_min_fps), and a frame that would finish past cfg.latency_budget seconds after it
+    arrived is skipped for a fresher one. Returns run stats with a "live" section (captured,
+    due, processed and dropped frames, latency percentiles, effective fps). If the feed fails
+    after frames were processed, the outputs and metrics.json (with live.error) are still
+    written before the error is raised.
+    """
+    from .pipeline import Windower, make_detector, make_metrics, shot_cut
+    from .scales import make_scales
+    from .shots import make_shot_detector
+
+    out_dir_p = Path(out_dir)
+    out_dir_p.mkdir(parents=True, exist_ok=True)
+    metrics = make_metrics(cfg, hooks)
+    if detector is None:
+        detector = make_detector(cfg)
+    table = None
+    if cfg.batch_motion:
+        from .tracktable import TrackTable
+
+        table = TrackTable()
+    tracker = make_tracker(
+        cfg.tracker,
+        assignment=cfg.tracker_assignment,
+        max_history=max(cfg.track_history, MOTION_HISTORY) if cfg.track_history is not None else None,
+        evict_dead=cfg.evict_dead_tracks,
+        table=table,
+        coast=cfg.motion_gate_coast,
+    )
+    src = open_live_source(source, cfg)
+
+    def detect(frames):
+        return detector.infer_batch(frames, next_entity_id_start=1, scale=src.scale)
+
+    if metrics is not None:
+        detect = metrics.timed("detect", detect)
+    gate = make_gate(cfg)
+    if gate is not None:
+        detect = gate.wrap(detect)
+    # Cuts are between consecutive processed frames
+    shots = make_shot_detector(cfg)
+
+    budget = cfg.latency_budget
+    eff_fps = float(cfg.fps)
+    min_fps = min(float(cfg.fps), cfg.live_min_fps)
+    tol = 0.25 / cfg.fps
+    proc_ema: Optional[float] = None
+    seq = 0
+    last_t: Optional[float] = None
+    processed = 0
+    late = 0
+    over_budget = 0
+    # Over the whole run in constant memory, however long the feed
+    latency = Histogram()
+    fps_log = Histogram()
+
+    # Flush on every window so events reach readers as they happen
+    sinks = open_sinks(
+        out_dir_p, vtt=cfg.write_vtt, flush_interval=0.0, columnar=cfg.write_columnar, index=cfg.write_index,
+        raw=cfg.coalesce and cfg.raw_events, scenes=cfg.shot_detect,
+    )
+    windower = Windower(cfg, sinks, table=table, metrics=metrics)
+    scales = make_scales(cfg, out_dir_p, metrics=metrics)
+    src.start()
+    try:
+        while True:
+            min_t = last_t + 1.0 / eff_fps - tol if last_t is not None else 0.0
+            got = src.wait_newer(seq, min_t)
+            if got is None:
+                break
+            seq, (frame_idx, t, frame, arrival) = got
+            start = time.monotonic()
+            # Would finish late: wait for a fresher frame, unless processing alone blows the budget
+            if proc_ema is not None and proc_ema < budget and start - arrival + proc_ema > budget:
+                late += 1
+                continue
+
+            if shots is not None:
+                if metrics is not None:
+                    t0 = metrics.start("shots")
+                cut = shots.check(frame_idx, t, frame)
+                if metrics is not None:
+                    metrics.stop("shots", t0)
+                if cut:
+                    shot_cut(t, tracker, windower, scales)
+            ents = detect([frame])[0]
+            if metrics is not None:
+                t0 = metrics.start("track")
+                tracks = tracker.step(frame_idx, t, ents)
+                metrics.stop("track", t0)
+                metrics.frame(len(ents) if ents is not None else 0, len(tracks))
+            else:
+                tracks = tracker.step(frame_idx, t, ents)
+            windower.push(frame_idx, t, tracks)
+            if scales is not None:
+                scales.push(frame_idx, t, tracks)
+
+            done = time.monotonic()
+            processed += 1
+            last_t = t
+            latency.add(done - arrival)
+            if done - arrival > budget:
+                over_budget += 1
+            proc = done - start
+            proc_ema = proc if proc_ema is None else (1.0 - _EMA) * proc_ema + _EMA * proc
+            eff_fps = min(float(cfg.fps), max(min_fps, _DUTY / max(proc_ema, 1e-6)))
+            fps_log.add(eff_fps)
+            if metrics is not None:
+                metrics.gauges.update({
+                    "processed": processed,
+                    "dropped": max(0, src.due - processed),
+                    "latency_ms": latency.last * 1000.0,
+                    "fps_effective": eff_fps,
+                })
+    except KeyboardInterrupt:
+        pass
+    finally:
+        src.close()
+        # Stopping (end of stream, Ctrl-C or an error) ends every open span
+        windower.finish()
+        sinks.close()
+        if scales is not None:
+            scales.finish()
+            scales.close()
+        if shots is not None:
+            shots.write(out_dir_p)
+    if src.error is not None and processed == 0:
+        raise src.error
+
+    live = {
+        "captured": src.captured,
+        "due": src.due,
+        "processed": processed,
+        # Frames on the nominal fps grid that were never processed (overwritten, late or sampled out)
+        "dropped": max(0, src.due - processed),
+        "dropped_late": late,
+        "over_budget": over_budget,
+        "latency_budget_s": budget,
+        "latency_ms": latency.summary(scale=1000.0),
+        "fps_effective": fps_log.summary(),
+    }
+    if src.error is not None:
+        # The feed failed mid-run (disconnect, decode error): outputs so far are kept, then it is raised
+        live["error"] = f"{type(src.error).__name__}: {src.error}"
+    stats = {
+        "frames": processed,
+        "events": sinks.events_written,
+        "tracker": tracker.stats(),
+        "live": live,
+    }
+    if gate is not None:
+        stats["motion_gate"] = gate.stats()
+    if windower.coalescer is not None:
+        stats["coalesce"] = windower.coalescer.stats()
+    if scales is not None:
+        stats["scales"] = scales.stats()
+    if shots is not None:
+        stats["shots"] = shots.stats()
+    if metrics is not None:
+        metrics.finish(out_dir_p, extra={
+            "tracker": stats["tracker"], "live": live, "motion_gate": stats.get("motion_gate"), "coalesce": stats.get("coalesce"),
+            "scales": stats.get("scales"), "shots": stats.get("shots"),
+        })
+    if src.error is not None:
+        raise src.error
+    return stats
@@ -0,0 +1,332 @@
+from __future__ import annotations
+
+import json
+import math
+import os
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+
+PROFILE_STAGES = ("decode", "detect", "track", "window")
+PROFILE_MODES = ("cprofile", "tracemalloc")
+
+
+class Histogram:
+    """
+    Streaming summary of a non-negative series in constant memory. Count, total and max are
+    exact; percentiles come from log-spaced buckets GROWTH apart, so each is within about 1%
+    of the true nearest-rank value (and never outside the observed min/max). With exact=True
+    the values are small integers (detections, tracks per frame) and each gets its own bucket.
+    """
+
+    GROWTH = 1.02
+
+    def __init__(self, exact: bool = False):
+        self.exact = exact
+        self.count = 0
+        self.total = 0
+        self.min = math.inf
+        self.max = 0
+        self.last = 0
+        self._buckets: Dict[int, int] = {}
+        self._zeros = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def add(self, value: float, n: int = 1) -> None:
+        """Record value n times."""
+        if n <= 0:
+            return
+        self.count += n
+        self.total += value * n
+        self.last = value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        if self.exact:
+            key = int(value)
+        elif value <= 0.0:
+            self._zeros += n
+            return
+        else:
+            key = math.floor(math.log(value) / _LOG_GROWTH)
+        self._buckets[key] = self._buckets.get(key, 0) + n
+
+    def extend(self, values: Iterable[float]) -> None:
+        for v in values:
+            self.add(v)
+
+    def merge(self, other: "Histogram") -> None:
+        """Add the samples summarized by another histogram of the same kind."""
+        if other.count == 0:
+            return
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.last = other.last
+        self._zeros += other._zeros
+        for key, n in other._buckets.items():
+            self._buckets[key] = self._buckets.get(key, 0) + n
+
+    def percentile(self, q: float) -> float:
+        """Nearest-rank percentile (0.0 when empty)."""
+        if self.count == 0:
+            return 0.0
+        rank = max(1, min(self.count, math.ceil(q * self.count / 100.0)))
+        if rank <= self._zeros:
+            return 0.0
+        seen = self._zeros
+        for key in sorted(self._buckets):
+            seen += self._buckets[key]
+            if seen >= rank:
+                value = key if self.exact else _GROWTH_MID * self.GROWTH ** key
+                return min(self.max, max(self.min, value))
+        return self.max
+
+    def summary(self, scale: float = 1.0) -> Dict[str, float]:
+        """count/total/mean/p50/p95/p99/max, multiplied by scale (e.g. 1000 for ms)."""
+        n = self.count
+        return {
+            "count": n,
+            "total": self.total * scale,
+            "mean": self.total * scale / n if n else 0.0,
+            "p50": self.percentile(50) * scale,
+            "p95": self.percentile(95) * scale,
+            "p99": self.percentile(99) * scale,
+            "max": (self.max if n else 0.0) * scale,
+        }
+
+
+_LOG_GROWTH = math.log(Histogram.GROWTH)
+# A bucket's representative value: the geometric middle of [GROWTH**k, GROWTH**(k+1))
+_GROWTH_MID = math.sqrt(Histogram.GROWTH)
+
+
+class MetricsHook:
+    """
+    Receives run metrics as they are produced; subclass and pass to process_video(hooks=...)
+    to forward them to an external monitoring system. Both methods are no-ops by default.
+    """
+
+    def on_window(self, snapshot: Dict[str, Any]) -> None:
+        """Called after each window's events are written, with running counters."""
+
+    def on_finish(self, report: Dict[str, Any]) -> None:
+        """Called once with the full report written to metrics.json."""
+
+
+class _Profiler:
+    """cProfile or tracemalloc around every call of one stage; results go next to metrics.json."""
+
+    def __init__(self, stage: str, mode: str):
+        if stage not in PROFILE_STAGES:
+            raise ValueError(f"Unknown profile stage {stage!r}; expected one of {PROFILE_STAGES}")
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode {mode!r}; expected one of {PROFILE_MODES}")
+        self.stage = stage
+        self.mode = mode
+        self.alloc_peaks = Histogram()
+        if mode == "cprofile":
+            import cProfile
+
+            self._prof = cProfile.Profile()
+        else:
+            import tracemalloc
+
+            self._tm = tracemalloc
+            self._started = not tracemalloc.is_tracing()
+            if self._started:
+                tracemalloc.start(16)
+
+    def enter(self) -> None:
+        if self.mode == "cprofile":
+            # Profiles the calling thread, which is the stage's own thread in the staged pipeline
+            self._prof.enable()
+        else:
+            self._tm.reset_peak()
+            self._base = self._tm.get_traced_memory()[0]
+
+    def exit(self) -> None:
+        if self.mode == "cprofile":
+            self._prof.disable()
+        else:
+            self.alloc_peaks.add(self._tm.get_traced_memory()[1] - self._base)
+
+    def write(self, out_dir: Path) -> Dict[str, Any]:
+        if self.mode == "cprofile":
+            import io
+            import pstats
+
+            prof_path = out_dir / f"profile_{self.stage}.prof"
+            self._prof.dump_stats(str(prof_path))
+            text = io.StringIO()
+            pstats.Stats(self._prof, stream=text).sort_stats("cumulative").print_stats(40)
+            (out_dir / f"profile_{self.stage}.txt").write_text(text.getvalue(), encoding="utf-8")
+            return {"stage": self.stage, "mode": self.mode, "file": prof_path.name}
+        snapshot = self._tm.take_snapshot()
+        if self._started:
+            self._tm.stop()
+        top = snapshot.statistics("lineno")[:40]
+        path = out_dir / f"tracemalloc_{self.stage}.txt"
+        path.write_text("\n".join(str(s) for s in top) + "\n", encoding="utf-8")
+        return {
+            "stage": self.stage,
+            "mode": self.mode,
+            "file": path.name,
+            # Peak bytes allocated during one call (includes other threads in the staged pipeline)
+            "alloc_peak_kb": self.alloc_peaks.summary(scale=1.0 / 1024.0),
+        }
+
+
+class RunMetrics:
+    """
+    Per-run instrumentation: a latency histogram for each stage, detections and live tracks
+    per frame and window/event counters, all in constant memory however long the run; callers
+    add run-level figures (peak RSS, cache status) through finish(extra). Each stage is only
+    ever recorded from one thread, so the staged pipeline needs no locking.
+    """
+
+    def __init__(
+        self,
+        hooks: Sequence[MetricsHook] = (),
+        profile_stage: Optional[str] = None,
+        profile_mode: str = "cprofile",
+    ):
+        self.hooks = list(hooks)
+        self.latency: Dict[str, Histogram] = {}
+        self.detections = Histogram(exact=True)
+        self.live_tracks = Histogram(exact=True)
+        self.windows = 0
+        self.events = 0
+        # Extra running figures set by the caller (e.g. live-mode drops and lag), added to window snapshots
+        self.gauges: Dict[str, Any] = {}
+        self._t0 = time.perf_counter()
+        self._profiler = _Profiler(profile_stage, profile_mode) if profile_stage else None
+
+    def _samples(self, stage: str) -> Histogram:
+        samples = self.latency.get(stage)
+        if samples is None:
+            samples = self.latency[stage] = Histogram()
+        return samples
+
+    def merge(self, latency: Dict[str, Histogram]) -> None:
+        """Add latency histograms recorded elsewhere (e.g. by a shard worker process)."""
+        for stage, samples in latency.items():
+            self._samples(stage).merge(samples)
+
+    def timed(self, stage: str, fn: Callable[[List[Any]], List[Any]]) -> Callable[[List[Any]], List[Any]]:
+        """Wrap a batch function (list in, list out); each item is charged an equal share."""
+        samples = self._samples(stage)
+        prof = self._profiler if self._profiler is not None and self._profiler.stage == stage else None
+
+        def wrapper(items: List[Any]) -> List[Any]:
+            if prof is not None:
+                prof.enter()
+            t0 = time.perf_counter()
+            try:
+                return fn(items)
+            finally:
+                per_item = (time.perf_counter() - t0) / max(1, len(items))
+                if prof is not None:
+                    prof.exit()
+                samples.add(per_item, len(items))
+
+        return wrapper
+
+    def timed_iter(self, stage: str, it: Iterable[Any]) -> Iterator[Any]:
+        """Yield from `it`, recording the time each next() takes."""
+        samples = self._samples(stage)
+        prof = self._profiler if self._profiler is not None and self._profiler.stage == stage else None
+        it = iter(it)
+        try:
+            while True:
+                if prof is not None:
+                    prof.enter()
+                t0 = time.perf_counter()
+                try:
+                    item = next(it)
+                except StopIteration:
+                    return
+                finally:
+                    if prof is not None:
+                        prof.exit()
+                samples.add(time.perf_counter() - t0)
+                yield item
+        finally:
+            close = getattr(it, "close", None)
+            if close is not None:
+                close()
+
+    def start(self, stage: str) -> float:
+        if self._profiler is not None and self._profiler.stage == stage:
+            self._profiler.enter()
+        return time.perf_counter()
+
+    def stop(self, stage: str, t0: float) -> None:
+        self._samples(stage).add(time.perf_counter() - t0)
+        if self._profiler is not None and self._profiler.stage == stage:
+            self._profiler.exit()
+
+    def frame(self, detections: int, live_tracks: int) -> None:
+        self.detections.add(detections)
+        self.live_tracks.add(live_tracks)
+
+    def window(self, t: float, events: int) -> None:
+        self.windows += 1
+        self.events += events
+        if self.hooks:
+            snapshot = {
+                "t": t,
+                "frames": len(self.live_tracks),
+                "windows": self.windows,
+                "events": self.events,
+                "live_tracks": self.live_tracks.last,
+                "elapsed_s": time.perf_counter() - self._t0,
+            }
+            snapshot.update(self.gauges)
+            for hook in self.hooks:
+                hook.on_window(snapshot)
+
+    def report(self, extra: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        elapsed = time.perf_counter() - self._t0
+        frames = len(self.live_tracks)
+        stages = {}
+        for name, samples in self.latency.items():
+            s = samples.summary(scale=1000.0)
+            stages[name] = {
+                "count": s["count"],
+                "total_s": s["total"] / 1000.0,
+                "mean_ms": s["mean"],
+                "p50_ms": s["p50"],
+                "p95_ms": s["p95"],
+                "p99_ms": s["p99"],
+                "max_ms": s["max"],
+            }
+        report: Dict[str, Any] = {
+            "frames": frames,
+            "seconds": elapsed,
+            "frames_per_s": frames / elapsed if elapsed > 0 else 0.0,
+            "stages": stages,
+            "detections_per_frame": self.detections.summary(),
+            "live_tracks": self.live_tracks.summary(),
+            "windows": self.windows,
+            "events": self.events,
+        }
+        if extra:
+            report.update(extra)
+        return report
+
+    def finish(self, out_dir: Path, extra: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Write metrics.json (and any profile output) to out_dir, notify hooks, return the report."""
+        report = self.report(extra)
+        if self._profiler is not None:
+            report["profile"] = self._profiler.write(out_dir)
+        tmp = out_dir / "metrics.json.tmp"
+        tmp.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        os.replace(tmp, out_dir / "metrics.json")
+        for hook in self.hooks:
+            hook.on_finish(report)
+        return report
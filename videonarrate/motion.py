@@ -1,9 +1,14 @@
 from __future__ import annotations
 
-from typing import List, Tuple
+import math
+from typing import List, Sequence, Tuple
 
 from .track import Track
 
+# summarize_motion looks at the last MOTION_STEPS velocities, i.e. MOTION_HISTORY history entries
+MOTION_STEPS = 5
+MOTION_HISTORY = MOTION_STEPS + 1
+
 
 def _velocity(track: Track) -> List[Tuple[float, float, float]]:
     """Return list of (t, vx, vy) using bbox center deltas per second."""
@@ -39,8 +44,9 @@ def summarize_motion(track: Track) -> Tuple[float, float, str]:
     v = _velocity(track)
     if not v:
         return 0.0, 0.0, "stationary"
-    tail = v[-5:]
-    speeds = [(vx * vx + vy * vy) ** 0.5 for _, vx, vy in tail]
+    tail = v[-MOTION_STEPS:]
+    # math.sqrt is correctly rounded (unlike pow), so this matches summarize_motion_batch bit for bit
+    speeds = [math.sqrt(vx * vx + vy * vy) for _, vx, vy in tail]
     speed = sum(speeds) / len(speeds)
     accel = 0.0
     if len(speeds) >= 2:
@@ -49,3 +55,61 @@ def summarize_motion(track: Track) -> Tuple[float, float, str]:
     direction = direction_from_velocity(tail[-1][1], tail[-1][2])
     return speed, accel, direction
 
+
+DIRECTIONS = ["stationary", "E", "W", "S", "N", "S->E", "S->W", "N->E", "N->W"]
+
+
+def direction_from_velocity_batch(vx, vy) -> List[str]:
+    """Vectorized direction_from_velocity over arrays of vx, vy."""
+    import numpy as np
+
+    vx = np.asarray(vx, dtype=np.float64)
+    vy = np.asarray(vy, dtype=np.float64)
+    ax, ay = np.abs(vx), np.abs(vy)
+    east = vx > 0
+    south = vy > 0
+    horiz = np.where(east, 1, 2)
+    vert = np.where(south, 3, 4)
+    diag = 5 + np.where(south, 0, 2) + np.where(east, 0, 1)
+    code = np.select(
+        [(ax < 1e-6) & (ay < 1e-6), ax > 1.5 * ay, ay > 1.5 * ax],
+        [0, horiz, vert],
+        default=diag,
+    )
+    return [DIRECTIONS[c] for c in code.tolist()]
+
+
+def summarize_motion_batch(table, track_ids: Sequence[int]):
+    """
+    summarize_motion for many tracks at once from a tracktable.TrackTable.
+    Returns (speed, accel, directions) with speed/accel as float arrays; values match
+    summarize_motion exactly (same operation order, correctly rounded sqrt).
+    """
+    import numpy as np
+
+    n = len(track_ids)
+    if n == 0:
+        return np.zeros(0), np.zeros(0), []
+    cx, cy, t, valid = table.ordered(track_ids)
+    dt = np.maximum(1e-6, t[:, 1:] - t[:, :-1])
+    vx = (cx[:, 1:] - cx[:, :-1]) / dt
+    vy = (cy[:, 1:] - cy[:, :-1]) / dt
+    vvalid = valid[:, :-1]  # velocity j needs entries j and j+1
+    speeds = np.sqrt(vx * vx + vy * vy)
+    steps = vvalid.sum(axis=1)
+
+    # Sequential sum in history order to reproduce Python's sum() rounding
+    total = np.zeros(n)
+    for j in range(speeds.shape[1]):
+        total = total + np.where(vvalid[:, j], speeds[:, j], 0.0)
+    speed = np.where(steps > 0, total / np.maximum(steps, 1), 0.0)
+
+    first = speeds.shape[1] - steps  # column of the oldest valid velocity
+    rows = np.arange(n)
+    first_c = np.minimum(first, speeds.shape[1] - 1)
+    span = np.maximum(1e-6, t[:, -1] - t[rows, first_c + 1])
+    accel = np.where(steps >= 2, (speeds[:, -1] - speeds[rows, first_c]) / span, 0.0)
+
+    directions = direction_from_velocity_batch(vx[:, -1], vy[:, -1])
+    directions = [d if k > 0 else "stationary" for d, k in zip(directions, steps.tolist())]
+    return speed, accel, directions
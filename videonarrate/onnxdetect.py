@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import ast
+import os
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Defaults of ultralytics predict, so both backends keep the same boxes
+IOU_THRESHOLD = 0.7
+MAX_DET = 300
+# Boxes considered by NMS, highest scores first
+MAX_NMS = 30000
+# Per-class coordinate offset that keeps NMS from suppressing across classes
+_MAX_WH = 7680
+_PAD_VALUE = 114
+_DEFAULT_SIZE = 640
+
+
+def letterbox_params(h: int, w: int, size: Tuple[int, int]) -> Tuple[float, int, int, int, int]:
+    """(gain, resized width, resized height, left pad, top pad) fitting an h x w frame into size=(H, W), centred."""
+    H, W = size
+    gain = min(H / h, W / w)
+    nw, nh = int(round(w * gain)), int(round(h * gain))
+    left = int(round((W - nw) / 2 - 0.1))
+    top = int(round((H - nh) / 2 - 0.1))
+    return gain, nw, nh, left, top
+
+
+def nms(boxes, scores, iou_threshold: float = IOU_THRESHOLD):
+    """Indices of boxes kept by greedy NMS over (N, 4) xyxy boxes, highest score first."""
+    import numpy as np
+
+    order = np.argsort(-scores, kind="stable")
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    areas = (x2 - x1) * (y2 - y1)
+    keep: List[int] = []
+    while order.size:
+        i = order[0]
+        keep.append(int(i))
+        rest = order[1:]
+        iw = np.clip(np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]), 0.0, None)
+        ih = np.clip(np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]), 0.0, None)
+        inter = iw * ih
+        order = rest[inter / (areas[i] + areas[rest] - inter + 1e-9) <= iou_threshold]
+    return np.array(keep, dtype=np.int64)
+
+
+class OnnxDetector:
+    """
+    Exported YOLOv8 detect or segment model (float or int8-quantized) in ONNX Runtime on the
+    CPU. Frames are letterboxed into one preallocated input tensor; predictions, laid out
+    (1, 4 + classes [+ mask coefficients], anchors), are decoded and NMS-ed with numpy. Masks
+    are not decoded. Class names come from the model's "names" metadata, as ultralytics
+    exports it.
+    """
+
+    def __init__(self, path: str, threads: Optional[int] = None):
+        import numpy as np
+        import onnxruntime as ort  # type: ignore
+
+        if not os.path.isfile(path):
+            raise FileNotFoundError(f"ONNX model not found: {path}")
+        opts = ort.SessionOptions()
+        if threads:
+            opts.intra_op_num_threads = threads
+            opts.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(path, sess_options=opts, providers=["CPUExecutionProvider"])
+        inp = self.session.get_inputs()[0]
+        self.input_name = inp.name
+        meta = self.session.get_modelmeta().custom_metadata_map
+        H, W = (d if isinstance(d, int) else None for d in inp.shape[2:4])
+        if H is None or W is None:
+            size = ast.literal_eval(meta["imgsz"]) if "imgsz" in meta else [_DEFAULT_SIZE, _DEFAULT_SIZE]
+            H, W = size if isinstance(size, (list, tuple)) else (size, size)
+        self.size = (int(H), int(W))
+        names = ast.literal_eval(meta["names"]) if "names" in meta else {}
+        self.names: Dict[int, str] = {int(k): str(v) for k, v in names.items()}
+        dtype = np.float16 if inp.type == "tensor(float16)" else np.float32
+        # Reused for every frame: the letterboxed image and the model input
+        self._canvas = np.full((self.size[0], self.size[1], 3), _PAD_VALUE, dtype=np.uint8)
+        self._blob = np.empty((1, 3) + self.size, dtype=dtype)
+        self._geom: Optional[Tuple[int, int]] = None
+        self._params = (1.0, 0, 0, 0, 0)
+
+    def _letterbox(self, frame) -> None:
+        import cv2  # type: ignore
+        import numpy as np
+
+        h, w = frame.shape[:2]
+        if self._geom != (h, w):
+            self._params = letterbox_params(h, w, self.size)
+            self._canvas[...] = _PAD_VALUE
+            self._geom = (h, w)
+        _, nw, nh, left, top = self._params
+        if (nw, nh) != (w, h):
+            frame = cv2.resize(frame, (nw, nh), interpolation=cv2.INTER_LINEAR)
+        # Only the image area is rewritten; the padding keeps its value between frames
+        self._canvas[top:top + nh, left:left + nw] = frame
+        # BGR HWC uint8 -> RGB CHW in [0, 1]
+        np.divide(self._canvas.transpose(2, 0, 1)[::-1], 255.0, out=self._blob[0], casting="unsafe")
+
+    def detect(self, frame, min_conf: float = 0.25, classes: Optional[Sequence[int]] = None):
+        """(center xywh (N, 4), conf (N,), class ids (N,)) in frame pixels, like ultralytics boxes.xywh/conf/cls."""
+        import numpy as np
+
+        self._letterbox(frame)
+        outputs = self.session.run(None, {self.input_name: self._blob})
+        pred = outputs[0][0].astype(np.float32, copy=False)
+        # Segment models add mask coefficients after the class scores
+        n_masks = outputs[1].shape[1] if len(outputs) > 1 else 0
+        scores = pred[4:pred.shape[0] - n_masks]
+        cls = scores.argmax(axis=0)
+        conf = scores[cls, np.arange(scores.shape[1])]
+        keep = conf > min_conf
+        if classes is not None:
+            keep &= np.isin(cls, np.asarray(classes, dtype=np.int64))
+        idx = np.nonzero(keep)[0]
+        if idx.size > MAX_NMS:
+            idx = idx[np.argsort(-conf[idx], kind="stable")[:MAX_NMS]]
+        cx, cy, bw, bh = pred[0, idx], pred[1, idx], pred[2, idx], pred[3, idx]
+        xyxy = np.stack([cx - bw / 2, cy - bh / 2, cx + bw / 2, cy + bh / 2], axis=1).astype(np.float64)
+        conf, cls = conf[idx].astype(np.float64), cls[idx].astype(np.int64)
+        if len(idx):
+            sel = nms(xyxy + (cls * _MAX_WH)[:, None], conf)[:MAX_DET]
+            xyxy, conf, cls = xyxy[sel], conf[sel], cls[sel]
+        # Back to frame pixels
+        gain, _, _, left, top = self._params
+        h, w = self._geom
+        xyxy[:, [0, 2]] = np.clip((xyxy[:, [0, 2]] - left) / gain, 0, w)
+        xyxy[:, [1, 3]] = np.clip((xyxy[:, [1, 3]] - top) / gain, 0, h)
+        xywh = np.stack([(xyxy[:, 0] + xyxy[:, 2]) / 2, (xyxy[:, 1] + xyxy[:, 3]) / 2, xyxy[:, 2] - xyxy[:, 0], xyxy[:, 3] - xyxy[:, 1]], axis=1)
+        return xywh, conf, cls
+
+
+def write_fixture_model(path: str, preds: Sequence[Tuple[float, float, float, float, int, float]], names: Dict[int, str], size: int = 64) -> None:
+    """
+    Tiny YOLOv8-layout model for offline checks: it reads its input but always predicts `preds`,
+    (cx, cy, w, h, class id, score) rows in letterboxed input pixels. Needs the onnx package.
+    """
+    import numpy as np
+    import onnx  # type: ignore
+    from onnx import TensorProto, helper, numpy_helper  # type: ignore
+
+    nc = max(names) + 1
+    table = np.zeros((1, 4 + nc, len(preds)), dtype=np.float32)
+    for a, (cx, cy, w, h, c, score) in enumerate(preds):
+        table[0, :4, a] = (cx, cy, w, h)
+        table[0, 4 + c, a] = score
+    nodes = [
+        # mean(images) * 0 + table: the output depends on the input, so it cannot be folded away
+        helper.make_node("ReduceMean", ["images"], ["mean"], axes=[1, 2, 3], keepdims=1),
+        helper.make_node("Mul", ["mean", "zero"], ["nil"]),
+        helper.make_node("Reshape", ["nil", "shape"], ["nil3"]),
+        helper.make_node("Add", ["table", "nil3"], ["output0"]),
+    ]
+    graph = helper.make_graph(
+        nodes,
+        "fixture",
+        [helper.make_tensor_value_info("images", TensorProto.FLOAT, [1, 3, size, size])],
+        [helper.make_tensor_value_info("output0", TensorProto.FLOAT, list(table.shape))],
+        initializer=[
+            numpy_helper.from_array(table, "table"),
+            numpy_helper.from_array(np.zeros((1,), dtype=np.float32), "zero"),
+            numpy_helper.from_array(np.array([1, 1, 1], dtype=np.int64), "shape"),
+        ],
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)])
+    model.ir_version = 8
+    for key, value in (("names", repr(names)), ("imgsz", repr([size, size]))):
+        prop = model.metadata_props.add()
+        prop.key, prop.value = key, value
+    onnx.checker.check_model(model)
+    onnx.save(model, path)
@@ -1,101 +1,558 @@
 from __future__ import annotations
 
+import itertools
+import json
+import os
+from collections import deque
 from pathlib import Path
-from typing import List
+from typing import Any, Dict, List, Optional, Sequence
 
+from .cache import CacheWriter, DetectionCache
+from .coalesce import make_coalescer
+from .checkpoint import Checkpointer, clear_checkpoint, load_checkpoint, run_key
 from .config import Config
-from .decode import decode_video_cv2
-from .detect import Detector
-from .track import SimpleTracker, Track
-from .motion import summarize_motion
-from .actions import heuristic_action
+from .decode import open_video
+from .detect import DETECTOR_WEIGHTS, Detector
+from .gate import MotionGate, make_gate
+from .track import Track, make_tracker
+from .motion import MOTION_HISTORY, summarize_motion, summarize_motion_batch
+from .actions import heuristic_action, heuristic_action_batch
 from .graph import infer_interactions
-from .schemas import Event, Entity, Motion, Action, Provenance, Scene, Summary
+from .io import open_sinks
+from .metrics import MetricsHook, RunMetrics
+from .resources import MemoryLimitExceeded, peak_rss_mb, rss_mb
+from .stages import StageStats, run_staged
+from .scales import make_scales
+from .shots import ShotDetector, make_shot_detector
+from .schemas import Event, Entity, Motion, Action, Provenance, Scene
 
 
-def process_video(input_path: str, out_dir: str, cfg: Config) -> None:
+def _detect_serial(frames, detect_batch, batch: int):
+    """Yield (frame_idx, t, detections) in order, running detection on chunks of `batch` frames."""
+    it = iter(frames)
+    while True:
+        chunk = list(itertools.islice(it, batch))
+        if not chunk:
+            return
+        for (frame_idx, t, _), ents in zip(chunk, detect_batch([f for _, _, f in chunk])):
+            yield frame_idx, t, ents
+
+
+def make_detector(cfg: Config) -> Detector:
+    return Detector(
+        name=cfg.detector,
+        min_conf=cfg.min_det_conf,
+        allowed_labels=cfg.allowed_labels,
+        weights=cfg.detector_weights,
+        threads=cfg.detector_threads,
+    )
+
+
+def _detect_frames(
+    input_path: str,
+    cfg: Config,
+    stage_stats: Dict[str, StageStats],
+    detector: Optional[Detector] = None,
+    start: float = 0.0,
+    end: Optional[float] = None,
+    metrics: Optional[RunMetrics] = None,
+    after_frame: Optional[int] = None,
+    gate: Optional[MotionGate] = None,
+    workers: int = 1,
+    shots: Optional[ShotDetector] = None,
+):
+    """
+    Decode and detect, serially or staged; yields (frame_idx, t, detections) in order.
+    Frames up to and including `after_frame` are dropped before detection. With a motion
+    gate, frames it skips are yielded with detections=None. workers > 1 detects on a
+    pool.DetectorWorkerPool of that many processes instead (`detector` is then not used). With
+    `shots`, every decoded frame is checked for a shot cut before it goes any further, so a
+    frame's cut is in shots.cut_frames by the time its detections come out.
+    """
+    if detector is None:
+        detector = make_detector(cfg)
+    staged = cfg.pipeline_mode == "staged"
+    batch = max(1, cfg.detect_batch)
+    # Frames held in a detect batch or queued between stages must not be overwritten by the ffmpeg buffer ring
+    buffers = max(cfg.decode_buffers, batch + 1)
+    if staged:
+        buffers = max(buffers, cfg.queue_depth + batch + 3)
+    frames, scale = open_video(
+        input_path,
+        cfg.fps,
+        backend=cfg.decode_backend,
+        sampler=cfg.sampler,
+        max_side=cfg.decode_max_side,
+        buffers=buffers,
+        start=start,
+        end=end,
+    )
+    if metrics is not None:
+        frames = metrics.timed_iter("decode", frames)
+    # Optional cap on processing time
+    if cfg.max_seconds is not None:
+        frames = itertools.takewhile(lambda f: f[1] <= cfg.max_seconds, frames)
+    if shots is not None:
+        frames = shots.wrap(frames, metrics)
+    if gate is not None and gate.prime_idx is not None:
+        frames = _prime_gate(frames, gate)
+    if after_frame is not None:
+        frames = itertools.dropwhile(lambda f: f[0] <= after_frame, frames)
+    if workers > 1:
+        return _detect_pooled(frames, cfg, workers, scale, gate, stage_stats, metrics)
+
+    def detect_batch(batch_frames: List[Any]) -> List[List[Entity]]:
+        # Label allow-list is applied inside the detector
+        return detector.infer_batch(batch_frames, next_entity_id_start=1, scale=scale)
+
+    if metrics is not None:
+        detect_batch = metrics.timed("detect", detect_batch)
+    if gate is not None:
+        detect_batch = gate.wrap(detect_batch)
+    if staged:
+        return run_staged(frames, detect_batch, depth=cfg.queue_depth, stats=stage_stats, batch=batch)
+    return _detect_serial(frames, detect_batch, batch)
+
+
+def _detect_pooled(frames, cfg: Config, workers: int, scale: float, gate, stage_stats, metrics):
+    from .pool import DetectorWorkerPool
+
+    with DetectorWorkerPool(cfg, workers) as pool:
+        try:
+            yield from pool.detect(frames, scale=scale, gate=gate)
+        finally:
+            # Worker-side inference time per frame; stalls are waits for a free ring slot
+            stage_stats["detect"] = StageStats(
+                name="detect", items=pool.frames, busy_s=pool.latency.total, put_stalls=pool.stalls, stall_s=pool.stall_s,
+            )
+            if metrics is not None:
+                metrics.merge({"detect": pool.latency})
+
+
+def _prime_gate(frames, gate: MotionGate):
+    """Resuming: reload the gate's reference thumbnail from the frame it was taken of."""
+    for f in frames:
+        if f[0] == gate.prime_idx:
+            gate.prime(f[2])
+        yield f
+
+
+def _record(results, writer: CacheWriter):
+    for frame_idx, t, ents in results:
+        writer.append(frame_idx, t, ents)
+        yield frame_idx, t, ents
+
+
+def detector_settings(cfg: Config) -> Dict[str, Any]:
+    """Everything besides the input file that determines per-frame detections."""
+    weights = cfg.detector_weights or DETECTOR_WEIGHTS.get(cfg.detector)
+    weights_stamp = None
+    if weights and os.path.exists(weights):
+        st = os.stat(weights)
+        weights_stamp = [st.st_size, st.st_mtime_ns]
+    return {
+        "detector": cfg.detector,
+        "weights": weights,
+        "weights_stamp": weights_stamp,
+        "fps": cfg.fps,
+        "min_det_conf": cfg.min_det_conf,
+        "allowed_labels": sorted(cfg.allowed_labels) if cfg.allowed_labels else None,
+        "sampler": cfg.sampler,
+        "decode_backend": cfg.decode_backend,
+        "decode_max_side": cfg.decode_max_side,
+    }
+
+
+def process_video(
+    input_path: str,
+    out_dir: str,
+    cfg: Config,
+    detector: Optional[Detector] = None,
+    hooks: Optional[Sequence[MetricsHook]] = None,
+) -> Dict[str, Any]:
+    """
+    Run the full pipeline and write outputs to out_dir; returns run stats (frames, per-stage counters).
+    Pass a prebuilt detector (see make_detector) to reuse a loaded model across calls.
+    Unless cfg.metrics is off, per-stage latencies and counters are written to metrics.json
+    and streamed to `hooks`. With cfg.live, input_path is a live feed (see live.process_live).
+    """
+    if cfg.live:
+        from .live import process_live
+
+        return process_live(input_path, out_dir, cfg, detector=detector, hooks=hooks)
+    if cfg.shards > 1:
+        from .shard import process_video_sharded
+
+        return process_video_sharded(input_path, out_dir, cfg, hooks=hooks)
+
     out_dir_p = Path(out_dir)
+    out_dir_p.mkdir(parents=True, exist_ok=True)
+    metrics = make_metrics(cfg, hooks)
+
+    # Checkpoints are only valid for this input and output-shaping config
+    ckpt = None
+    key = run_key(input_path, cfg) if os.path.exists(input_path) else None
+    if cfg.resume and key is not None:
+        ckpt = load_checkpoint(out_dir_p, key)
+    if ckpt is None:
+        # A stale checkpoint would point into the outputs this run is about to overwrite
+        clear_checkpoint(out_dir_p)
+
+    # Finished tracks are optionally finalized into compact per-track summaries
+    track_log = None
+    if cfg.track_summaries:
+        if ckpt is not None:
+            track_log = (out_dir_p / "tracks.jsonl").open("r+", encoding="utf-8")
+            track_log.seek(ckpt["track_log"])
+            track_log.truncate()
+        else:
+            track_log = (out_dir_p / "tracks.jsonl").open("w", encoding="utf-8")
+
+    def on_evict(tr: Track) -> None:
+        track_log.write(json.dumps(tr.summary(), ensure_ascii=False) + "\n")
+
+    table = None
+    if cfg.batch_motion:
+        from .tracktable import TrackTable
+
+        table = TrackTable()
 
     # Initialize components
-    detector = Detector(name=cfg.detector, min_conf=cfg.min_det_conf)
-    tracker = SimpleTracker()
+    tracker = make_tracker(
+        cfg.tracker,
+        assignment=cfg.tracker_assignment,
+        # Never keep less history than summarize_motion reads
+        max_history=max(cfg.track_history, MOTION_HISTORY) if cfg.track_history is not None else None,
+        evict_dead=cfg.evict_dead_tracks,
+        on_evict=on_evict if track_log is not None else None,
+        table=table,
+        coast=cfg.motion_gate_coast,
+    )
+    if ckpt is not None:
+        tracker.restore_state(ckpt["tracker"])
+    after_frame = ckpt["frame_idx"] if ckpt is not None else None
 
-    events: List[Event] = []
+    # The motion gate and shot detection need the frames, so they do not combine with the detection cache
+    gate = make_gate(cfg)
+    gate_state = ckpt.get("gate") if ckpt is not None else None
+    if gate is not None and gate_state is not None:
+        gate.resume(gate_state["frame_idx"], gate_state["since"])
+    shots = make_shot_detector(cfg)
+    if shots is not None and ckpt is not None:
+        shots.resume(after_frame, ckpt["shots"])
 
-    # Sliding window buffers
-    window_s = cfg.window
-    stride_s = cfg.stride
-    window_frames: List[int] = []
-    window_time: List[float] = []
-    window_tracks: List[List[Track]] = []
+    # Detection cache: a hit replays stored detections and skips decode and detect entirely
+    cache_status = "bypass"
+    cached = None
+    writer = None
+    if cfg.det_cache != "bypass" and gate is None and shots is None:
+        cache = DetectionCache(cfg.cache_dir, max_bytes=int(cfg.cache_max_mb * 1024 * 1024))
+        cache_key, meta = cache.key(input_path, detector_settings(cfg))
+        if cfg.det_cache == "use":
+            cached = cache.load(cache_key)
+        cache_status = "hit" if cached is not None else "miss"
+        # Truncated and resumed runs would store a partial entry
+        if cached is None and cfg.max_seconds is None and ckpt is None:
+            writer = cache.writer(cache_key, meta)
 
-    # Decode and process
-    for frame_idx, t, frame in decode_video_cv2(input_path, cfg.fps):
-        # Optional cap on processing time
-        if cfg.max_seconds is not None and t > cfg.max_seconds:
-            break
-        ents = detector.infer(frame, next_entity_id_start=1)
-        # Optional label filtering before tracking
-        if cfg.allowed_labels:
-            ents = [e for e in ents if e.label in cfg.allowed_labels]
-        tracks = tracker.step(frame_idx, t, ents)
+    stage_stats: Dict[str, StageStats] = {}
+    if cached is not None:
+        results = cached.iter_frames(cfg.max_seconds)
+        if after_frame is not None:
+            results = itertools.dropwhile(lambda r: r[0] <= after_frame, results)
+        if metrics is not None:
+            results = metrics.timed_iter("cache_read", results)
+    else:
+        # Resuming: a ranged decode seeks close to the checkpoint (the ffmpeg pipe cannot,
+        # and a different decoder could change the frames, so it decodes and drops instead)
+        start = 0.0
+        if ckpt is not None and cfg.decode_backend == "cv2":
+            # From the gate's reference frame, so it can be reloaded
+            start = gate_state["t"] if gate_state is not None else ckpt["t"]
+        results = _detect_frames(
+            input_path, cfg, stage_stats, detector=detector, start=start, metrics=metrics, after_frame=after_frame,
+            gate=gate, workers=cfg.detect_workers, shots=shots,
+        )
+        if writer is not None:
+            results = _record(results, writer)
 
+    # Events stream to the outputs as each window closes
+    sinks = open_sinks(
+        out_dir_p,
+        vtt=cfg.write_vtt,
+        flush_interval=cfg.flush_interval,
+        columnar=cfg.write_columnar,
+        index=cfg.write_index,
+        raw=cfg.coalesce and cfg.raw_events,
+        scenes=cfg.shot_detect,
+        state=ckpt["sinks"] if ckpt is not None else None,
+    )
+    windower = Windower(cfg, sinks, table=table, metrics=metrics)
+    # Extra window/stride scales, each with its own outputs under scales/
+    scales = make_scales(cfg, out_dir_p, metrics=metrics, state=ckpt.get("scales") if ckpt is not None else None)
+    checkpointer = None
+    if ckpt is not None:
+        windower.restore_state(ckpt["windower"])
+    if cfg.checkpoint_interval is not None and key is not None:
+        checkpointer = Checkpointer(
+            out_dir_p, key, cfg.checkpoint_interval, tracker, windower, sinks, track_log=track_log, scales=scales, shots=shots,
+        )
+    try:
+        n_frames, rss_peak = _run_windows(
+            results, tracker, sinks, cfg,
+            metrics=metrics,
+            windower=windower,
+            checkpointer=checkpointer,
+            scales=scales,
+            cuts=shots.cut_frames if shots is not None else None,
+            n_frames=ckpt["frames"] if ckpt is not None else 0,
+            rss_peak=ckpt["rss_peak_mb"] if ckpt is not None else 0.0,
+            gate_state=gate_state,
+        )
+        windower.finish()
+        if scales is not None:
+            scales.finish()
+        if track_log is not None:
+            tracker.finalize()
+        if shots is not None:
+            shots.write(out_dir_p)
+    finally:
+        sinks.close()
+        if scales is not None:
+            scales.close()
+        if track_log is not None:
+            track_log.close()
+    # Only a run that got to the end may drop its checkpoint
+    clear_checkpoint(out_dir_p)
+
+    # Nothing decoded (unreadable input or no OpenCV): don't cache an empty entry
+    if writer is not None and n_frames > 0:
+        writer.commit()
+
+    stats = {
+        "frames": n_frames,
+        "events": sinks.events_written,
+        "cache": cache_status,
+        "tracker": tracker.stats(),
+        "rss_peak_mb": max(rss_peak, peak_rss_mb()),
+        "stages": {name: st.to_dict() for name, st in stage_stats.items()},
+    }
+    if gate is not None:
+        stats["motion_gate"] = gate.stats()
+    if windower.coalescer is not None:
+        stats["coalesce"] = windower.coalescer.stats()
+    if scales is not None:
+        stats["scales"] = scales.stats()
+    if shots is not None:
+        stats["shots"] = shots.stats()
+    if ckpt is not None:
+        stats["resumed_from_frame"] = ckpt["frame_idx"]
+    if metrics is not None:
+        metrics.finish(out_dir_p, extra={
+            "rss_peak_mb": stats["rss_peak_mb"],
+            "cache": cache_status,
+            "tracker": stats["tracker"],
+            "queues": stats["stages"],
+            "motion_gate": stats.get("motion_gate"),
+            "coalesce": stats.get("coalesce"),
+            "scales": stats.get("scales"),
+            "shots": stats.get("shots"),
+            # Latency samples and per-frame counters cover the resumed part of the run only
+            "resumed_from_frame": stats.get("resumed_from_frame"),
+        })
+    return stats
+
+
+def make_metrics(cfg: Config, hooks: Optional[Sequence[MetricsHook]] = None) -> Optional[RunMetrics]:
+    """RunMetrics for a run, or None when instrumentation is off (and no hooks want it)."""
+    if not cfg.metrics and not hooks and not cfg.profile_stage:
+        return None
+    return RunMetrics(hooks or (), profile_stage=cfg.profile_stage, profile_mode=cfg.profile_mode)
+
+
+class Windower:
+    """
+    Sliding-window event generation. push() each frame's live tracks; when the window is full,
+    motion/action/interaction events for the last snapshot go to sinks and the window slides
+    by stride. Tracks only need id/label/bbox/score when push() gets precomputed motions.
+    With cfg.coalesce, window events are merged into spans (see coalesce.EventCoalescer) on
+    their way to the sinks; call finish() at the end of the input to write the open ones, and
+    cut() at a shot cut.
+    """
+
+    def __init__(self, cfg: Config, sinks, table=None, metrics: Optional[RunMetrics] = None):
+        self.cfg = cfg
+        self.sinks = sinks
+        self.table = table
+        self.metrics = metrics
+        self.coalescer = make_coalescer(cfg)
+        self.window_frames: deque = deque()
+        self.window_time: deque = deque()
+
+    def checkpoint_state(self) -> Dict[str, Any]:
+        state = {"frames": list(self.window_frames), "time": list(self.window_time)}
+        if self.coalescer is not None:
+            state["coalesce"] = self.coalescer.checkpoint_state()
+        return state
+
+    def restore_state(self, state: Dict[str, Any]) -> None:
+        self.window_frames = deque(state["frames"])
+        self.window_time = deque(state["time"])
+        if self.coalescer is not None:
+            self.coalescer.restore_state(state["coalesce"])
+
+    def finish(self) -> None:
+        if self.coalescer is not None:
+            self.sinks.write(self.coalescer.finish())
+
+    def cut(self, t: float) -> None:
+        """Shot cut at t: end the shot before it as at the end of input and start a new summary scene."""
+        self.finish()
+        self.window_frames.clear()
+        self.window_time.clear()
+        self.sinks.cut(t)
+
+    def push(self, frame_idx: int, t: float, tracks, motions: Optional[List[tuple]] = None) -> None:
+        window_frames, window_time = self.window_frames, self.window_time
         window_frames.append(frame_idx)
         window_time.append(t)
-        window_tracks.append(tracks)
 
         # When window is full, analyze and emit events
-        if window_time and (t - window_time[0] >= window_s):
-            start_t = window_time[0]
-            end_t = window_time[-1]
-
+        if window_time and (t - window_time[0] >= self.cfg.window):
             # Choose representative tracks (last snapshot)
-            cur_tracks = window_tracks[-1] if window_tracks else []
-
-            for tr in cur_tracks:
-                speed, accel, direction = summarize_motion(tr)
-                motion = Motion(direction=direction, speed=speed, accel=accel)
-                action = heuristic_action(tr)
-                ev = Event(
-                    start=start_t,
-                    end=end_t,
-                    subjects=[Entity(id=tr.id, label=tr.label, bbox=tr.bbox, score=tr.score)],
-                    action=action,
-                    motion=motion,
-                    provenance=Provenance(frames=(window_frames[0], window_frames[-1]), models={"detector": detector.name}),
-                )
-                events.append(ev)
-
-            # Simple interactions
-            for sid, oid, inter in infer_interactions(cur_tracks):
-                s_track = next((tr for tr in cur_tracks if tr.id == sid), None)
-                o_track = next((tr for tr in cur_tracks if tr.id == oid), None)
-                if not s_track or not o_track:
-                    continue
-                ev = Event(
-                    start=start_t,
-                    end=end_t,
-                    subjects=[Entity(id=s_track.id, label=s_track.label, bbox=s_track.bbox, score=s_track.score)],
-                    objects=[Entity(id=o_track.id, label=o_track.label, bbox=o_track.bbox, score=o_track.score)],
-                    interaction=inter,
-                    provenance=Provenance(frames=(window_frames[0], window_frames[-1]), models={"detector": detector.name}),
-                )
-                events.append(ev)
+            metrics = self.metrics
+            if metrics is not None:
+                t0 = metrics.start("window")
+            events = self._events(window_time[0], window_time[-1], tracks, motions)
+            if self.coalescer is not None:
+                if self.cfg.raw_events:
+                    self.sinks.write_raw(events)
+                events = self.coalescer.push(window_time[-1], events)
+            self.sinks.write(events)
+            if metrics is not None:
+                metrics.stop("window", t0)
+                metrics.window(t, len(events))
 
             # Slide window
             # Remove frames until window meets stride
-            while window_time and (window_time[-1] - window_time[0] >= stride_s):
-                window_time.pop(0)
-                window_frames.pop(0)
-                window_tracks.pop(0)
+            while window_time and (window_time[-1] - window_time[0] >= self.cfg.stride):
+                window_time.popleft()
+                window_frames.popleft()
 
-    # Write outputs
-    from .compose import compose_captions, summarize_events
-    from .io import write_jsonl, write_srt, write_summary
+    def _events(self, start_t: float, end_t: float, cur_tracks, motions: Optional[List[tuple]]) -> List[Event]:
+        cfg = self.cfg
+        provenance = (self.window_frames[0], self.window_frames[-1])
+        events: List[Event] = []
 
-    out_dir_p.mkdir(parents=True, exist_ok=True)
-    write_jsonl(events, out_dir_p / "events.jsonl")
-    captions = compose_captions(events)
-    write_srt(captions, out_dir_p / "captions.srt")
-    summary_data = summarize_events(events)
-    write_summary(Summary(scenes=[summary_data]), out_dir_p / "summary.json")
+        if motions is not None:
+            actions = [heuristic_action(tr, motion=m) for tr, m in zip(cur_tracks, motions)]
+        elif self.table is not None:
+            speeds, accels, directions = summarize_motion_batch(self.table, [tr.id for tr in cur_tracks])
+            motions = list(zip(speeds.tolist(), accels.tolist(), directions))
+            actions = heuristic_action_batch(speeds, accels, [tr.label for tr in cur_tracks])
+        else:
+            motions = [summarize_motion(tr) for tr in cur_tracks]
+            actions = [heuristic_action(tr, motion=m) for tr, m in zip(cur_tracks, motions)]
+
+        for tr, (speed, accel, direction), action in zip(cur_tracks, motions, actions):
+            motion = Motion(direction=direction, speed=speed, accel=accel)
+            ev = Event(
+                start=start_t,
+                end=end_t,
+                subjects=[Entity(id=tr.id, label=tr.label, bbox=tr.bbox, score=tr.score)],
+                action=action,
+                motion=motion,
+                provenance=Provenance(frames=provenance, models={"detector": cfg.detector}),
+            )
+            events.append(ev)
+
+        # Simple interactions
+        by_id = {tr.id: tr for tr in cur_tracks}
+        for sid, oid, inter in infer_interactions(cur_tracks, max_neighbors=cfg.max_neighbors):
+            s_track = by_id.get(sid)
+            o_track = by_id.get(oid)
+            if not s_track or not o_track:
+                continue
+            ev = Event(
+                start=start_t,
+                end=end_t,
+                subjects=[Entity(id=s_track.id, label=s_track.label, bbox=s_track.bbox, score=s_track.score)],
+                objects=[Entity(id=o_track.id, label=o_track.label, bbox=o_track.bbox, score=o_track.score)],
+                interaction=inter,
+                provenance=Provenance(frames=provenance, models={"detector": cfg.detector}),
+            )
+            events.append(ev)
+        return events
+
+
+def shot_cut(t: float, tracker, windower: Windower, scales=None) -> None:
+    """
+    A new shot starts at t: the windows and spans of the one before are flushed as at the end
+    of input, summary.json starts a new scene and no track carries over.
+    """
+    windower.cut(t)
+    if scales is not None:
+        scales.cut(t)
+    if tracker is not None:
+        tracker.reset()
+
+
+def _run_windows(
+    results,
+    tracker,
+    sinks,
+    cfg: Config,
+    metrics: Optional[RunMetrics] = None,
+    windower: Optional[Windower] = None,
+    checkpointer: Optional[Checkpointer] = None,
+    n_frames: int = 0,
+    rss_peak: float = 0.0,
+    gate_state: Optional[Dict[str, Any]] = None,
+    scales=None,
+    cuts=None,
+):
+    """
+    Track each frame's detections and emit events to sinks whenever a window closes (and to
+    each extra scale's outputs, with `scales`). n_frames/rss_peak/gate_state carry the
+    counters over when continuing from a checkpoint. detections=None (a frame skipped by the
+    motion gate) carries the tracks forward. Frames whose index is in `cuts` start a new shot
+    (see shot_cut).
+    """
+    if windower is None:
+        windower = Windower(cfg, sinks, table=tracker.table, metrics=metrics)
+    # Last detected frame and frames skipped since, for resuming the motion gate
+    gate_state = dict(gate_state) if gate_state is not None else None
+    # Decode and process
+    for frame_idx, t, ents in results:
+        n_frames += 1
+        if cfg.motion_gate:
+            if ents is not None:
+                gate_state = {"frame_idx": frame_idx, "t": t, "since": 0}
+            elif gate_state is not None:
+                gate_state["since"] += 1
+        if cuts is not None and frame_idx in cuts:
+            shot_cut(t, tracker, windower, scales)
+        if metrics is not None:
+            t0 = metrics.start("track")
+            tracks = tracker.step(frame_idx, t, ents)
+            metrics.stop("track", t0)
+            metrics.frame(len(ents) if ents is not None else 0, len(tracks))
+        else:
+            tracks = tracker.step(frame_idx, t, ents)
+
+        if cfg.memory_limit_mb is not None and n_frames % 64 == 0:
+            rss = rss_mb()
+            rss_peak = max(rss_peak, rss)
+            if rss > cfg.memory_limit_mb:
+                raise MemoryLimitExceeded(
+                    f"RSS {rss:.0f} MiB exceeds memory_limit_mb={cfg.memory_limit_mb:.0f} at frame {frame_idx} "
+                    f"(t={t:.1f}s): {tracker.stats()}"
+                )
+
+        windower.push(frame_idx, t, tracks)
+        if scales is not None:
+            scales.push(frame_idx, t, tracks)
+        if checkpointer is not None:
+            checkpointer.maybe_save(frame_idx, t, n_frames, rss_peak, gate=gate_state)
+
+    return n_frames, rss_peak
@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import queue
+import time
+import traceback
+from collections import deque
+from multiprocessing import get_context
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .config import Config
+from .metrics import Histogram
+from .schemas import BBox, Entity
+
+# Seconds between liveness checks of the workers while waiting for a result
+_POLL = 1.0
+
+
+def _worker_main(cfg: Config, tasks, results) -> None:
+    """
+    Detector process: attaches to the frame ring on its first task and runs detection on slots
+    in place; only (labels, [x, y, w, h, score] rows) go back.
+    """
+    import numpy as np
+    from multiprocessing import shared_memory
+
+    from .pipeline import make_detector
+
+    detector = make_detector(cfg)
+    rings: Dict[str, Any] = {}
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                return
+            seq, slot, name, shape, scale = task
+            try:
+                ring = rings.get(name)
+                if ring is None:
+                    shm = shared_memory.SharedMemory(name=name)
+                    ring = rings[name] = (shm, np.ndarray(shape, dtype=np.uint8, buffer=shm.buf))
+                t0 = time.perf_counter()
+                ents = detector.infer_batch([ring[1][slot]], next_entity_id_start=1, scale=scale)[0]
+                elapsed = time.perf_counter() - t0
+                rows = np.array([(e.bbox.x, e.bbox.y, e.bbox.w, e.bbox.h, e.score) for e in ents], dtype=np.float64).reshape(-1, 5)
+                results.put((seq, slot, [e.label for e in ents], rows, elapsed, None))
+            except Exception:
+                results.put((seq, slot, None, None, 0.0, traceback.format_exc()))
+    finally:
+        for shm, _ in rings.values():
+            shm.close()
+
+
+class DetectorWorkerPool:
+    """
+    `workers` detector processes fed through a ring of `slots` frame buffers in shared memory:
+    each sampled frame is copied once into a free slot, a worker detects on the slot in place,
+    and only compact detection arrays come back over a queue. detect() yields results in frame
+    order whatever order the workers finish in. Workers are spawned (fresh interpreters, like
+    the shard and batch pools) and load their detector while the first frames are decoded.
+    """
+
+    def __init__(self, cfg: Config, workers: int, slots: Optional[int] = None):
+        self.workers = max(1, workers)
+        self.slots = slots or 2 * self.workers
+        ctx = get_context("spawn")
+        self._tasks = ctx.Queue()
+        self._results = ctx.Queue()
+        self._procs = [
+            ctx.Process(target=_worker_main, args=(cfg, self._tasks, self._results), name=f"videonarrate-detect-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for p in self._procs:
+            p.start()
+        self._shm = None
+        self._ring = None
+        self.frames = 0
+        # Waits for a free slot (all workers busy) and the time spent in them
+        self.stalls = 0
+        self.stall_s = 0.0
+        self.latency = Histogram()
+
+    def __enter__(self) -> "DetectorWorkerPool":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        for p in self._procs:
+            if p.is_alive():
+                self._tasks.put(None)
+        for p in self._procs:
+            p.join(timeout=5.0)
+            if p.is_alive():
+                p.terminate()
+        self._procs = []
+        if self._shm is not None:
+            self._ring = None
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+    def _ensure_ring(self, frame) -> None:
+        import numpy as np
+        from multiprocessing import shared_memory
+
+        shape = (self.slots,) + tuple(frame.shape)
+        if self._ring is not None:
+            if self._ring.shape != shape:
+                raise ValueError(f"Frame shape changed from {self._ring.shape[1:]} to {frame.shape}")
+            return
+        self._shm = shared_memory.SharedMemory(create=True, size=int(np.prod(shape)))
+        self._ring = np.ndarray(shape, dtype=np.uint8, buffer=self._shm.buf)
+
+    def _collect(self, block: bool):
+        """One result from the workers, or None if none is ready and not blocking."""
+        while True:
+            try:
+                item = self._results.get(timeout=_POLL) if block else self._results.get_nowait()
+            except queue.Empty:
+                if not block:
+                    return None
+                dead = [p.name for p in self._procs if not p.is_alive()]
+                if dead:
+                    raise RuntimeError(f"Detector worker(s) exited unexpectedly: {', '.join(dead)}")
+                continue
+            seq, slot, labels, rows, elapsed, error = item
+            if error is not None:
+                raise RuntimeError(f"Detector worker failed on frame {seq}:\n{error}")
+            self.latency.add(elapsed)
+            return seq, slot, [
+                Entity(id=1 + k, label=label, bbox=BBox(x, y, w, h), score=score)
+                for k, (label, (x, y, w, h, score)) in enumerate(zip(labels, rows.tolist()))
+            ]
+
+    def detect(self, frames: Iterable[Tuple[int, float, Any]], scale: float = 1.0, gate=None) -> Iterator[Tuple[int, float, Optional[List[Entity]]]]:
+        """
+        Yield (frame_idx, t, detections) in order. With a motion gate, frames it skips are
+        checked here, before reaching the ring, and yielded with detections=None.
+        """
+        free = deque(range(self.slots))
+        meta: Dict[int, Tuple[int, float]] = {}
+        done: Dict[int, Optional[List[Entity]]] = {}
+        seq = nxt = 0
+
+        def store(res) -> None:
+            s, slot, ents = res
+            free.append(slot)
+            done[s] = ents
+
+        for frame_idx, t, frame in frames:
+            meta[seq] = (frame_idx, t)
+            if gate is not None and not gate.check(frame):
+                done[seq] = None
+            else:
+                self._ensure_ring(frame)
+                if not free:
+                    self.stalls += 1
+                    t0 = time.perf_counter()
+                    while not free:
+                        store(self._collect(block=True))
+                    self.stall_s += time.perf_counter() - t0
+                slot = free.popleft()
+                self._ring[slot][...] = frame
+                self._tasks.put((seq, slot, self._shm.name, self._ring.shape, scale))
+                self.frames += 1
+            seq += 1
+            while True:
+                res = self._collect(block=False)
+                if res is None:
+                    break
+                store(res)
+            while nxt in done:
+                yield meta.pop(nxt) + (done.pop(nxt),)
+                nxt += 1
+        while nxt < seq:
+            while nxt not in done:
+                store(self._collect(block=True))
+            yield meta.pop(nxt) + (done.pop(nxt),)
+            nxt += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {"workers": self.workers, "slots": self.slots, "frames": self.frames, "stalls": self.stalls, "stall_s": self.stall_s}
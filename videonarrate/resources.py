@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+import os
+import sys
+
+
+def rss_mb() -> float:
+    """Current resident set size in MiB (Linux /proc), falling back to the peak where unavailable."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024.0 * 1024.0)
+    except Exception:
+        return peak_rss_mb()
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size in MiB; 0.0 if the platform cannot report it."""
+    try:
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    except Exception:
+        return 0.0
+    # ru_maxrss is bytes on macOS, KiB elsewhere
+    return peak / (1024.0 * 1024.0) if sys.platform == "darwin" else peak / 1024.0
+
+
+class MemoryLimitExceeded(MemoryError):
+    """Raised when a run crosses Config.memory_limit_mb, instead of waiting to be OOM-killed."""
@@ -0,0 +1,297 @@
+from __future__ import annotations
+
+import math
+from collections import deque
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .actions import heuristic_action_batch
+from .coalesce import make_coalescer
+from .graph import infer_interactions
+from .io import open_sinks
+from .metrics import RunMetrics
+from .motion import DIRECTIONS, direction_from_velocity
+from .schemas import BBox, Entity, Event, Motion, Provenance
+
+SCALES_DIR = "scales"
+_DIR_INDEX = {d: i for i, d in enumerate(DIRECTIONS)}
+# Frame times are multiples of 1/fps; keeps a window that ends exactly on a frame from closing one frame late
+_EPS = 1e-6
+
+
+def scale_name(window: float) -> str:
+    """Output subdirectory (under scales/) of the scale with this window length."""
+    return f"{window:g}s"
+
+
+class _Acc:
+    """Running totals of one track since it first appeared; a window's aggregate is the difference of two snapshots."""
+
+    __slots__ = ("present", "steps", "speed_sum", "dirs", "first_speed", "last_speed", "prev", "label", "bbox", "score", "seen_t")
+
+    def __init__(self, label: str, bbox: BBox, score: float):
+        self.present = 0
+        self.steps = 0
+        self.speed_sum = 0.0
+        self.dirs = [0] * len(DIRECTIONS)
+        # (speed, t) of the first and the latest velocity sample
+        self.first_speed: Optional[Tuple[float, float]] = None
+        self.last_speed: Optional[Tuple[float, float]] = None
+        # (cx, cy, t) where the track was last seen
+        self.prev: Optional[Tuple[float, float, float]] = None
+        self.label = label
+        self.bbox = bbox
+        self.score = score
+        self.seen_t: Optional[float] = None
+
+    def see(self, t: float, label: str, bbox: BBox, score: float) -> None:
+        cx, cy = bbox.center()
+        if self.prev is not None:
+            px, py, pt = self.prev
+            dt = max(1e-6, t - pt)
+            vx, vy = (cx - px) / dt, (cy - py) / dt
+            speed = math.sqrt(vx * vx + vy * vy)
+            self.steps += 1
+            self.speed_sum += speed
+            self.dirs[_DIR_INDEX[direction_from_velocity(vx, vy)]] += 1
+            self.last_speed = (speed, t)
+            if self.first_speed is None:
+                self.first_speed = self.last_speed
+        self.prev = (cx, cy, t)
+        self.present += 1
+        self.label, self.bbox, self.score = label, bbox, score
+        self.seen_t = t
+
+    def snapshot(self) -> tuple:
+        return (self.present, self.steps, self.speed_sum, tuple(self.dirs), self.last_speed)
+
+    def to_list(self) -> list:
+        b = self.bbox
+        return [self.present, self.steps, self.speed_sum, self.dirs, self.first_speed, self.last_speed, self.prev,
+                self.label, [b.x, b.y, b.w, b.h], self.score, self.seen_t]
+
+    @classmethod
+    def from_list(cls, d: list) -> "_Acc":
+        acc = cls(d[7], BBox(*d[8]), d[9])
+        acc.present, acc.steps, acc.speed_sum, acc.dirs = d[0], d[1], d[2], list(d[3])
+        acc.first_speed, acc.last_speed, acc.prev = (tuple(v) if v is not None else None for v in d[4:7])
+        acc.seen_t = d[10]
+        return acc
+
+
+class _Scale:
+    """One window/stride pair: open windows (a snapshot of the running totals each) and its own outputs."""
+
+    def __init__(self, window: float, stride: float, sinks, coalescer):
+        self.window = window
+        self.stride = stride
+        self.sinks = sinks
+        self.coalescer = coalescer
+        # (frame_idx, t, frames seen so far, {track id: _Acc.snapshot()}) per open window, oldest first
+        self.marks: deque = deque()
+        self.next_start: Optional[float] = None
+        self.windows = 0
+
+
+class ScaleWindows:
+    """
+    Sliding windows at several (window, stride) scales from one pass over the tracks. Every
+    track keeps running totals (frames present, speed sum, direction counts, latest speed),
+    updated once per frame; each scale snapshots them where a window starts and closes the
+    window by differencing, so a frame costs O(live tracks) and a window close O(live tracks)
+    plus O(1) per track it reports (tracks that left during the window included), whatever
+    the window length. A window's track event carries
+    the mean speed, the most frequent direction, the speed change and, as the subject's
+    "presence" attribute, the share of the window's frames the track was seen in. Interactions
+    come from the last snapshot, as in the primary windows. Each scale writes the standard
+    outputs to out_dir/scales/<window>s/, coalesced into spans like the primary stream.
+    """
+
+    def __init__(self, cfg, out_dir: Path, scales: Sequence[Tuple[float, float]], metrics: Optional[RunMetrics] = None,
+                 state: Optional[Dict[str, Any]] = None):
+        names = [scale_name(w) for w, _ in scales]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Each scale needs its own window length: {list(scales)}")
+        self.cfg = cfg
+        self.metrics = metrics
+        self.accs: Dict[int, _Acc] = {}
+        self.frames = 0
+        self.scales: List[_Scale] = []
+        for (window, stride), name in zip(scales, names):
+            st = state["scales"].get(name) if state is not None else None
+            sinks = open_sinks(
+                out_dir / SCALES_DIR / name,
+                vtt=cfg.write_vtt,
+                flush_interval=cfg.flush_interval,
+                columnar=cfg.write_columnar,
+                index=cfg.write_index,
+                scenes=cfg.shot_detect,
+                state=st["sinks"] if st is not None else None,
+            )
+            self.scales.append(_Scale(window, stride, sinks, make_coalescer(cfg)))
+        if state is not None:
+            self._restore(state)
+
+    def push(self, frame_idx: int, t: float, tracks, seen: Optional[Sequence[bool]] = None) -> None:
+        """
+        Add one frame's live tracks. A track counts as seen on this frame if it was matched (or
+        carried by the motion gate), i.e. its last_t is t; pass `seen` for tracks without last_t.
+        """
+        metrics = self.metrics
+        if metrics is not None:
+            t0 = metrics.start("scales")
+        accs = self.accs
+        if seen is None:
+            seen = [getattr(tr, "last_t", t) == t for tr in tracks]
+        for tr, s in zip(tracks, seen):
+            acc = accs.get(tr.id)
+            if acc is None:
+                acc = accs[tr.id] = _Acc(tr.label, tr.bbox, tr.score)
+            if s:
+                acc.see(t, tr.label, tr.bbox, tr.score)
+        self.frames += 1
+        closed = False
+        for sc in self.scales:
+            while sc.marks and t - sc.marks[0][1] >= sc.window - _EPS:
+                self._close(sc, sc.marks.popleft(), frame_idx, t, tracks)
+                closed = True
+            if sc.next_start is None or t >= sc.next_start - _EPS:
+                # Live tracks only: a track that is gone never changes again, so it is in the window iff seen after t
+                sc.marks.append((frame_idx, t, self.frames, {tr.id: accs[tr.id].snapshot() for tr in tracks}))
+                # Window starts stay on the stride grid even when frames skip past one
+                origin = sc.next_start if sc.next_start is not None else t
+                sc.next_start = origin + sc.stride * (math.floor((t - origin + _EPS) / sc.stride) + 1)
+        if closed:
+            self._prune(tracks)
+        if metrics is not None:
+            metrics.stop("scales", t0)
+
+    def _close(self, sc: _Scale, mark, frame_idx: int, t: float, tracks) -> None:
+        start_idx, start_t, start_frames, base = mark
+        n = max(1, self.frames - start_frames)
+        picked: List[Tuple[int, _Acc]] = []
+        speeds: List[float] = []
+        accels: List[float] = []
+        directions: List[str] = []
+        presence: List[float] = []
+        for tid, acc in self.accs.items():
+            if acc.seen_t is None or acc.seen_t <= start_t:
+                continue
+            b = base.get(tid)
+            present = acc.present - (b[0] if b is not None else 0)
+            steps = acc.steps - (b[1] if b is not None else 0)
+            speed_sum = acc.speed_sum - (b[2] if b is not None else 0.0)
+            if steps > 0:
+                counts = [c - (b[3][k] if b is not None else 0) for k, c in enumerate(acc.dirs)]
+                # Most frequent direction; ties go to the earlier one in DIRECTIONS
+                direction = DIRECTIONS[max(range(len(counts)), key=lambda k: (counts[k], -k))]
+            else:
+                direction = "stationary"
+            # Speed change from the last sample before the window (or the first in it) to the latest
+            s0 = b[4] if b is not None and b[4] is not None else acc.first_speed
+            s1 = acc.last_speed
+            accel = (s1[0] - s0[0]) / max(1e-6, s1[1] - s0[1]) if steps > 0 and s0 is not None and s1[1] > s0[1] else 0.0
+            picked.append((tid, acc))
+            speeds.append(speed_sum / steps if steps > 0 else 0.0)
+            accels.append(accel)
+            directions.append(direction)
+            presence.append(present / n)
+        actions = heuristic_action_batch(speeds, accels, [acc.label for _, acc in picked])
+        provenance = (start_idx, frame_idx)
+        models = {"detector": self.cfg.detector}
+        events: List[Event] = []
+        for (tid, acc), speed, accel, direction, action, share in zip(picked, speeds, accels, directions, actions, presence):
+            events.append(Event(
+                start=start_t,
+                end=t,
+                subjects=[Entity(id=tid, label=acc.label, bbox=acc.bbox, score=acc.score, attributes={"presence": share})],
+                action=action,
+                motion=Motion(direction=direction, speed=speed, accel=accel),
+                provenance=Provenance(frames=provenance, models=dict(models)),
+            ))
+        by_id = {tr.id: tr for tr in tracks}
+        for sid, oid, inter in infer_interactions(list(tracks), max_neighbors=self.cfg.max_neighbors):
+            s_track, o_track = by_id.get(sid), by_id.get(oid)
+            if not s_track or not o_track:
+                continue
+            events.append(Event(
+                start=start_t,
+                end=t,
+                subjects=[Entity(id=s_track.id, label=s_track.label, bbox=s_track.bbox, score=s_track.score)],
+                objects=[Entity(id=o_track.id, label=o_track.label, bbox=o_track.bbox, score=o_track.score)],
+                interaction=inter,
+                provenance=Provenance(frames=provenance, models=dict(models)),
+            ))
+        sc.windows += 1
+        if sc.coalescer is not None:
+            events = sc.coalescer.push(t, events)
+        sc.sinks.write(events)
+
+    def _prune(self, tracks) -> None:
+        """Drop totals of tracks that are gone and were last seen before every open window started."""
+        oldest = min((sc.marks[0][1] for sc in self.scales if sc.marks), default=None)
+        live = {tr.id for tr in tracks}
+        for tid in [tid for tid, a in self.accs.items() if tid not in live and (oldest is None or a.seen_t is None or a.seen_t < oldest)]:
+            del self.accs[tid]
+
+    def finish(self) -> None:
+        """End of input: windows still open are dropped, as in the primary stream; open spans are written."""
+        for sc in self.scales:
+            if sc.coalescer is not None:
+                sc.sinks.write(sc.coalescer.finish())
+
+    def cut(self, t: float) -> None:
+        """Shot cut at t: as at the end of input, then every scale starts over with a new summary scene."""
+        self.finish()
+        self.accs.clear()
+        for sc in self.scales:
+            sc.marks.clear()
+            sc.next_start = None
+            sc.sinks.cut(t)
+
+    def close(self) -> None:
+        for sc in self.scales:
+            sc.sinks.close()
+
+    def checkpoint_state(self) -> Dict[str, Any]:
+        """Flushes every scale's outputs; JSON-able (see state= of the constructor)."""
+        return {
+            "frames": self.frames,
+            "accs": [[tid, acc.to_list()] for tid, acc in self.accs.items()],
+            "scales": {
+                scale_name(sc.window): {
+                    "sinks": sc.sinks.checkpoint_state(),
+                    "marks": [[fi, t, n, [[tid, list(s)] for tid, s in base.items()]] for fi, t, n, base in sc.marks],
+                    "next_start": sc.next_start,
+                    "windows": sc.windows,
+                    "coalesce": sc.coalescer.checkpoint_state() if sc.coalescer is not None else None,
+                }
+                for sc in self.scales
+            },
+        }
+
+    def _restore(self, state: Dict[str, Any]) -> None:
+        self.frames = state["frames"]
+        self.accs = {tid: _Acc.from_list(d) for tid, d in state["accs"]}
+        for sc in self.scales:
+            st = state["scales"][scale_name(sc.window)]
+            sc.marks = deque(
+                (fi, t, n, {tid: (s[0], s[1], s[2], tuple(s[3]), tuple(s[4]) if s[4] is not None else None) for tid, s in base})
+                for fi, t, n, base in st["marks"]
+            )
+            sc.next_start = st["next_start"]
+            sc.windows = st["windows"]
+            if sc.coalescer is not None:
+                sc.coalescer.restore_state(st["coalesce"])
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            scale_name(sc.window): {"window": sc.window, "stride": sc.stride, "windows": sc.windows, "events": sc.sinks.events_written}
+            for sc in self.scales
+        }
+
+
+def make_scales(cfg, out_dir: Path, metrics: Optional[RunMetrics] = None, state: Optional[Dict[str, Any]] = None) -> Optional[ScaleWindows]:
+    if not cfg.scales:
+        return None
+    return ScaleWindows(cfg, out_dir, cfg.scales, metrics=metrics, state=state)
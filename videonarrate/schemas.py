@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import copy
 from dataclasses import dataclass, field, asdict
 from typing import List, Dict, Any, Optional, Tuple
 
@@ -78,20 +79,64 @@ class Event:
     caption: Optional[str] = None
 
     def to_dict(self) -> Dict[str, Any]:
-        def convert(o):
-            if hasattr(o, "to_dict"):
-                return o.to_dict()
-            if hasattr(o, "__dict__") or hasattr(o, "__dataclass_fields__"):
-                return asdict(o)
-            return o
-
-        d = asdict(self)
-        # Fix nested dataclasses inside lists
-        d["subjects"] = [asdict(s) for s in self.subjects]
-        d["objects"] = [asdict(o) for o in self.objects]
-        if self.provenance is not None:
-            d["provenance"] = asdict(self.provenance)
-        return d
+        # Same dict as dataclasses.asdict(self), built directly: asdict deep-copies every nested
+        # dataclass through a generic recursive walk, which dominated JSONL serialization
+        a, i, m, p = self.action, self.interaction, self.motion, self.provenance
+        return {
+            "start": self.start,
+            "end": self.end,
+            "subjects": [_entity_dict(e) for e in self.subjects],
+            "objects": [_entity_dict(e) for e in self.objects],
+            "action": {"label": a.label, "confidence": a.confidence, "source_model": a.source_model} if a is not None else None,
+            "interaction": {"type": i.type, "confidence": i.confidence} if i is not None else None,
+            "motion": {"direction": m.direction, "speed": m.speed, "accel": m.accel} if m is not None else None,
+            "intent_hypothesis": copy.deepcopy(self.intent_hypothesis) if self.intent_hypothesis is not None else None,
+            "scene": asdict(self.scene) if self.scene is not None else None,
+            "provenance": {"frames": tuple(p.frames), "models": dict(p.models)} if p is not None else None,
+            "caption": self.caption,
+        }
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "Event":
+        """Inverse of to_dict (e.g. for a line of events.jsonl)."""
+        a, i, m, s, p = d.get("action"), d.get("interaction"), d.get("motion"), d.get("scene"), d.get("provenance")
+        return cls(
+            start=d["start"],
+            end=d["end"],
+            subjects=[_entity_from_dict(e) for e in d.get("subjects", [])],
+            objects=[_entity_from_dict(e) for e in d.get("objects", [])],
+            action=Action(**a) if a is not None else None,
+            interaction=Interaction(**i) if i is not None else None,
+            motion=Motion(**m) if m is not None else None,
+            intent_hypothesis=d.get("intent_hypothesis"),
+            scene=Scene(**s) if s is not None else None,
+            provenance=Provenance(frames=tuple(p["frames"]), models=dict(p.get("models") or {})) if p is not None else None,
+            caption=d.get("caption"),
+        )
+
+
+def _entity_from_dict(d: Dict[str, Any]) -> Entity:
+    mask = d.get("mask")
+    return Entity(
+        id=d["id"],
+        label=d["label"],
+        bbox=BBox(**d["bbox"]),
+        score=d.get("score", 1.0),
+        mask=Mask(**mask) if mask is not None else None,
+        attributes=d.get("attributes") or {},
+    )
+
+
+def _entity_dict(e: Entity) -> Dict[str, Any]:
+    b = e.bbox
+    return {
+        "id": e.id,
+        "label": e.label,
+        "bbox": {"x": b.x, "y": b.y, "w": b.w, "h": b.h},
+        "score": e.score,
+        "mask": asdict(e.mask) if e.mask is not None else None,
+        "attributes": copy.deepcopy(e.attributes) if e.attributes else {},
+    }
 
 
 @dataclass
@@ -0,0 +1,318 @@
+from __future__ import annotations
+
+import dataclasses
+import http.client
+import json
+import os
+import signal
+import socket
+import socketserver
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+from .config import Config
+from .detect import Detector
+from .metrics import MetricsHook
+
+# Finished jobs kept for status queries before the oldest are dropped
+MAX_FINISHED_JOBS = 1000
+
+
+def apply_overrides(base: Config, overrides: Dict[str, Any]) -> Config:
+    """Config with JSON overrides applied; unknown keys raise ValueError."""
+    names = {f.name for f in dataclasses.fields(Config)}
+    unknown = sorted(set(overrides) - names)
+    if unknown:
+        raise ValueError(f"Unknown config keys: {', '.join(unknown)}")
+    values = dict(overrides)
+    if values.get("allowed_labels") is not None:
+        values["allowed_labels"] = set(values["allowed_labels"])
+    return dataclasses.replace(base, **values)
+
+
+class DetectorPool:
+    """
+    Loaded detectors keyed by the settings that shape their output. A detector serves one job
+    at a time; concurrent jobs with the same settings get further instances, created on demand
+    and kept for reuse.
+    """
+
+    def __init__(self):
+        self._free: Dict[Tuple, List[Detector]] = {}
+        self._lock = threading.Lock()
+        self.loaded = 0
+
+    @staticmethod
+    def key(cfg: Config) -> Tuple:
+        return (cfg.detector, cfg.detector_weights, cfg.detector_threads, cfg.min_det_conf, frozenset(cfg.allowed_labels or ()))
+
+    def acquire(self, cfg: Config) -> Detector:
+        from .pipeline import make_detector
+
+        with self._lock:
+            free = self._free.get(self.key(cfg))
+            if free:
+                return free.pop()
+        det = make_detector(cfg)
+        with self._lock:
+            self.loaded += 1
+        return det
+
+    def release(self, cfg: Config, det: Detector) -> None:
+        with self._lock:
+            self._free.setdefault(self.key(cfg), []).append(det)
+
+
+@dataclasses.dataclass
+class Job:
+    id: str
+    input: str
+    out: str
+    cfg: Config
+    status: str = "queued"  # queued, running, done, failed
+    submitted: float = dataclasses.field(default_factory=time.time)
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    progress: Dict[str, Any] = dataclasses.field(default_factory=dict)
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "input": self.input,
+            "out": self.out,
+            "status": self.status,
+            "submitted": self.submitted,
+            "started": self.started,
+            "finished": self.finished,
+            "progress": self.progress,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class _ProgressHook(MetricsHook):
+    def __init__(self, job: Job):
+        self.job = job
+
+    def on_window(self, snapshot: Dict[str, Any]) -> None:
+        self.job.progress = snapshot
+
+
+class JobManager:
+    """Runs submitted jobs on at most `concurrency` threads, reusing loaded detectors."""
+
+    def __init__(self, base_cfg: Config, concurrency: int = 1, preload: bool = True):
+        self.base_cfg = base_cfg
+        self.concurrency = max(1, concurrency)
+        self.detectors = DetectorPool()
+        self.jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="videonarrate-job")
+        if preload:
+            # The point of the server: pay model load (and torch import) once, before any job
+            self.detectors.release(base_cfg, self.detectors.acquire(base_cfg))
+
+    def submit(self, input_path: str, out_dir: str, overrides: Optional[Dict[str, Any]] = None) -> Job:
+        cfg = apply_overrides(self.base_cfg, overrides or {})
+        job = Job(id=uuid.uuid4().hex[:12], input=input_path, out=out_dir, cfg=cfg)
+        with self._lock:
+            self.jobs[job.id] = job
+            self._prune()
+        self._pool.submit(self._run, job)
+        return job
+
+    def _prune(self) -> None:
+        finished = [jid for jid, j in self.jobs.items() if j.status in ("done", "failed")]
+        for jid in finished[: max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self.jobs[jid]
+
+    def _run(self, job: Job) -> None:
+        from .pipeline import process_video
+
+        job.status = "running"
+        job.started = time.time()
+        det = self.detectors.acquire(job.cfg)
+        try:
+            job.result = process_video(job.input, job.out, job.cfg, detector=det, hooks=[_ProgressHook(job)])
+            # As in batch runs, an input that decodes to nothing is a failed job
+            if job.result.get("frames"):
+                job.status = "done"
+            else:
+                job.error = "no frames decoded"
+                job.status = "failed"
+        except Exception as exc:
+            job.error = f"{type(exc).__name__}: {exc}"
+            job.result = {"traceback": traceback.format_exc()}
+            job.status = "failed"
+        finally:
+            self.detectors.release(job.cfg, det)
+            job.finished = time.time()
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def list(self) -> List[Job]:
+        with self._lock:
+            return list(self.jobs.values())
+
+    def health(self) -> Dict[str, Any]:
+        jobs = self.list()
+        return {
+            "status": "ok",
+            "concurrency": self.concurrency,
+            "detectors_loaded": self.detectors.loaded,
+            "queued": sum(j.status == "queued" for j in jobs),
+            "running": sum(j.status == "running" for j in jobs),
+        }
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=True)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    manager: JobManager
+
+    def address_string(self) -> str:
+        # UNIX socket peers have no (host, port)
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+    def _send(self, code: int, body: Any) -> None:
+        data = json.dumps(body, default=str).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self) -> None:
+        path = self.path.rstrip("/")
+        if path == "/health":
+            self._send(200, self.manager.health())
+        elif path == "/jobs":
+            self._send(200, [j.to_dict() for j in self.manager.list()])
+        elif path.startswith("/jobs/"):
+            job = self.manager.get(path[len("/jobs/"):])
+            if job is None:
+                self._send(404, {"error": "unknown job"})
+            else:
+                self._send(200, job.to_dict())
+        else:
+            self._send(404, {"error": "not found"})
+
+    def do_POST(self) -> None:
+        if self.path.rstrip("/") != "/jobs":
+            self._send(404, {"error": "not found"})
+            return
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+            job = self.manager.submit(body["input"], body["out"], body.get("config"))
+        except (KeyError, ValueError, TypeError) as exc:
+            self._send(400, {"error": f"{type(exc).__name__}: {exc}"})
+            return
+        self._send(202, job.to_dict())
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def serve(
+    cfg: Config,
+    host: str = "127.0.0.1",
+    port: int = 8765,
+    socket_path: Optional[str] = None,
+    concurrency: int = 1,
+) -> None:
+    """
+    Serve the job API on localhost HTTP (or a UNIX socket) until interrupted:
+    POST /jobs {"input", "out", "config": {overrides}}, GET /jobs, GET /jobs/<id>, GET /health.
+    """
+    manager = JobManager(cfg, concurrency=concurrency)
+    handler = type("Handler", (_Handler,), {"manager": manager})
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server: socketserver.BaseServer = _UnixHTTPServer(socket_path, handler)
+        where = socket_path
+    else:
+        server = ThreadingHTTPServer((host, port), handler)
+        where = f"http://{host}:{server.server_address[1]}"
+    print(f"videonarrate server listening on {where} (concurrency={manager.concurrency})", flush=True)
+    if threading.current_thread() is threading.main_thread():
+        # shutdown() blocks until serve_forever returns, so it must run off the serving thread
+        signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown, daemon=True).start())
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        manager.shutdown()
+        if socket_path and os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path: str, timeout: float = 30.0):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self) -> None:
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class ServerClient:
+    """Thin client for the job API, over localhost HTTP (url) or a UNIX socket (socket_path)."""
+
+    def __init__(self, url: str = "http://127.0.0.1:8765", socket_path: Optional[str] = None, timeout: float = 30.0):
+        self.url = url
+        self.socket_path = socket_path
+        self.timeout = timeout
+
+    def _request(self, method: str, path: str, body: Optional[Dict[str, Any]] = None) -> Any:
+        if self.socket_path:
+            conn: http.client.HTTPConnection = _UnixHTTPConnection(self.socket_path, timeout=self.timeout)
+        else:
+            from urllib.parse import urlsplit
+
+            parts = urlsplit(self.url)
+            conn = http.client.HTTPConnection(parts.hostname or "127.0.0.1", parts.port or 80, timeout=self.timeout)
+        try:
+            data = json.dumps(body).encode("utf-8") if body is not None else None
+            conn.request(method, path, body=data, headers={"Content-Type": "application/json"} if data else {})
+            resp = conn.getresponse()
+            payload = json.loads(resp.read() or b"null")
+        finally:
+            conn.close()
+        if resp.status >= 400:
+            raise RuntimeError(f"{method} {path} failed ({resp.status}): {payload.get('error') if isinstance(payload, dict) else payload}")
+        return payload
+
+    def submit(self, input_path: str, out_dir: str, overrides: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        body = {"input": os.path.abspath(input_path), "out": os.path.abspath(out_dir), "config": overrides or {}}
+        return self._request("POST", "/jobs", body)
+
+    def status(self, job_id: Optional[str] = None) -> Any:
+        return self._request("GET", f"/jobs/{job_id}" if job_id else "/jobs")
+
+    def health(self) -> Dict[str, Any]:
+        return self._request("GET", "/health")
+
+    def wait(self, job_id: str, poll: float = 0.5) -> Dict[str, Any]:
+        """Poll until the job is done or failed; returns its final status."""
+        while True:
+            job = self.status(job_id)
+            if job["status"] in ("done", "failed"):
+                return job
+            time.sleep(poll)
@@ -0,0 +1,284 @@
+from __future__ import annotations
+
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .batch import _WORKER, _init_worker
+from .config import Config
+from .decode import probe_duration
+from .gate import make_gate
+from .io import open_sinks
+from .metrics import MetricsHook, RunMetrics
+from .motion import MOTION_HISTORY, summarize_motion
+from .resources import peak_rss_mb
+from .schemas import BBox, Entity
+from .track import MAX_AGE, _assign_greedy, iou_matrix, make_tracker
+
+# Mean per-frame IoU over the overlap above which a shard's local track continues a global one
+STITCH_IOU = 0.5
+
+# (local_id, label, (x, y, w, h), score, (speed, accel, direction), seen on this frame) for one live track
+Snapshot = Tuple[int, str, Tuple[float, float, float, float], float, Tuple[float, float, str], bool]
+
+
+def default_overlap(cfg: Config) -> float:
+    """
+    Warm-up seconds decoded before each shard: long enough for tracks dead in the serial run to
+    age out and for live ones to rebuild the history summarize_motion reads, plus one frame.
+    """
+    return (MAX_AGE + MOTION_HISTORY + 1) / float(max(1, cfg.fps))
+
+
+def shard_bounds(duration: float, shards: int) -> List[Tuple[float, Optional[float]]]:
+    """Split [0, duration) into equal (start, end) ranges; the last one is open-ended."""
+    n = max(1, shards)
+    cuts = [duration * k / n for k in range(n)]
+    return [(cuts[k], cuts[k + 1] if k + 1 < n else None) for k in range(n)]
+
+
+def snap_to_cuts(bounds: List[Tuple[float, Optional[float]]], cuts: Sequence[float]) -> List[Tuple[float, Optional[float]]]:
+    """
+    Move each inner shard boundary to the nearest shot cut less than half a shard away. A shard
+    that starts on a cut needs no warm-up and no stitching, since no track continues across it.
+    """
+    if len(bounds) < 2 or not cuts:
+        return bounds
+    half = (bounds[1][0] - bounds[0][0]) / 2.0
+    starts = [bounds[0][0]]
+    for s, _ in bounds[1:]:
+        near = min(cuts, key=lambda c: abs(c - s))
+        starts.append(near if abs(near - s) < half and near > starts[-1] else s)
+    return list(zip(starts, starts[1:] + [bounds[-1][1]]))
+
+
+def _run_shard(input_path: str, start: float, end: Optional[float], lo: float, cuts: Sequence[int] = ()) -> Dict[str, Any]:
+    """
+    Detect and track frames in [lo, end) with a fresh tracker, reset at the shot cuts (frame
+    indices) in `cuts`. Frames before start only warm the tracker up and are returned as
+    (frame_idx, [(id, label, box)]) for stitching; owned frames come back as
+    (frame_idx, t, n_detections, [Snapshot]) with motion already summarized.
+    """
+    from .pipeline import _detect_frames
+
+    cfg: Config = _WORKER["cfg"]
+    t0 = time.perf_counter()
+    tracker = make_tracker(
+        cfg.tracker,
+        assignment=cfg.tracker_assignment,
+        max_history=max(cfg.track_history, MOTION_HISTORY) if cfg.track_history is not None else None,
+        evict_dead=True,
+        coast=cfg.motion_gate_coast,
+    )
+    warmup: List[Tuple[int, List[Tuple[int, str, Tuple[float, float, float, float]]]]] = []
+    owned: List[Tuple[int, float, int, List[Snapshot]]] = []
+    metrics = RunMetrics() if cfg.metrics else None
+    gate = make_gate(cfg)
+    results = _detect_frames(input_path, cfg, {}, detector=_WORKER["detector"], start=lo, end=end, metrics=metrics, gate=gate)
+    cuts = set(cuts)
+    for frame_idx, t, ents in results:
+        if frame_idx in cuts:
+            tracker.reset()
+        if metrics is not None:
+            t_trk = metrics.start("track")
+        tracks = tracker.step(frame_idx, t, ents)
+        if metrics is not None:
+            metrics.stop("track", t_trk)
+        if t < start:
+            warmup.append((frame_idx, [(tr.id, tr.label, (tr.bbox.x, tr.bbox.y, tr.bbox.w, tr.bbox.h)) for tr in tracks]))
+        else:
+            owned.append((frame_idx, t, len(ents) if ents is not None else 0, [
+                (tr.id, tr.label, (tr.bbox.x, tr.bbox.y, tr.bbox.w, tr.bbox.h), tr.score, summarize_motion(tr), tr.last_t == t)
+                for tr in tracks
+            ]))
+    return {
+        "start": start,
+        "end": end,
+        "warmup": warmup,
+        "frames": owned,
+        "seconds": time.perf_counter() - t0,
+        "latency": metrics.latency if metrics is not None else {},
+        "motion_gate": gate.stats() if gate is not None else None,
+    }
+
+
+def stitch(warmup, recent: Dict[int, List[Tuple[int, str, Tuple[float, float, float, float]]]]) -> Dict[int, int]:
+    """
+    Map a shard's local track ids to global ids. `warmup` is the shard's view of its overlap
+    frames and `recent` the already-stitched tracks on those same frames (frame_idx ->
+    [(global_id, label, box)]). Pairs are scored by summed same-label IoU over the frames either
+    appears in and matched greedily above STITCH_IOU.
+    """
+    import numpy as np
+
+    score: Dict[Tuple[int, int], float] = {}
+    seen_l: Dict[int, int] = {}
+    seen_g: Dict[int, int] = {}
+    for frame_idx, cur in warmup:
+        prev = recent.get(frame_idx)
+        if prev is None:
+            continue
+        for lid, _, _ in cur:
+            seen_l[lid] = seen_l.get(lid, 0) + 1
+        for gid, _, _ in prev:
+            seen_g[gid] = seen_g.get(gid, 0) + 1
+        if not cur or not prev:
+            continue
+        ov = iou_matrix([box for _, _, box in cur], [box for _, _, box in prev])
+        for i, j in zip(*np.nonzero(ov > 0.0)):
+            lid, llabel, _ = cur[i]
+            gid, glabel, _ = prev[j]
+            if llabel == glabel:
+                score[(lid, gid)] = score.get((lid, gid), 0.0) + float(ov[i, j])
+    if not score:
+        return {}
+    lids = sorted({lid for lid, _ in score})
+    gids = sorted({gid for _, gid in score})
+    sim = np.zeros((len(lids), len(gids)))
+    li = {lid: k for k, lid in enumerate(lids)}
+    gi = {gid: k for k, gid in enumerate(gids)}
+    for (lid, gid), s in score.items():
+        sim[li[lid], gi[gid]] = s / max(seen_l[lid], seen_g[gid])
+    return {lids[r]: gids[c] for r, c in _assign_greedy(sim, STITCH_IOU)}
+
+
+def process_video_sharded(
+    input_path: str,
+    out_dir: str,
+    cfg: Config,
+    hooks: Optional[Sequence[MetricsHook]] = None,
+) -> Dict[str, Any]:
+    """
+    Split one video into cfg.shards time ranges, detect and track each on its own worker
+    process (with cfg.shard_overlap seconds of warm-up decoded before its start), stitch track
+    ids across boundaries and window the merged stream in order, so events match a serial run
+    on the same OpenCV decode. Sharded runs bypass the detection cache and tracks.jsonl.
+    Worker stage latencies are merged into metrics.json; profiling covers the window stage only.
+    With cfg.shot_detect, a decode-only pass finds the shot cuts first (shots.find_cuts) and
+    shard boundaries move onto nearby cuts (see snap_to_cuts).
+    """
+    from .pipeline import Windower, make_metrics, shot_cut
+    from .scales import make_scales
+    from .shots import find_cuts
+
+    out_dir_p = Path(out_dir)
+    out_dir_p.mkdir(parents=True, exist_ok=True)
+    duration = probe_duration(input_path) or 0.0
+    if cfg.max_seconds is not None:
+        duration = min(duration, cfg.max_seconds)
+    overlap = cfg.shard_overlap if cfg.shard_overlap is not None else default_overlap(cfg)
+    bounds = shard_bounds(duration, cfg.shards)
+    shots = None
+    cut_frames: set = set()
+    cut_times: set = set()
+    if cfg.shot_detect:
+        t_pre = time.perf_counter()
+        shots = find_cuts(input_path, cfg)
+        prepass_s = time.perf_counter() - t_pre
+        cut_frames = set(shots.cut_frames)
+        cut_times = {t for _, t, _ in shots.cuts}
+        bounds = snap_to_cuts(bounds, sorted(cut_times))
+
+    sinks = open_sinks(
+        out_dir_p, vtt=cfg.write_vtt, flush_interval=cfg.flush_interval, columnar=cfg.write_columnar, index=cfg.write_index,
+        raw=cfg.coalesce and cfg.raw_events, scenes=cfg.shot_detect,
+    )
+    metrics = make_metrics(cfg, hooks)
+    windower = Windower(cfg, sinks, metrics=metrics)
+    scales = make_scales(cfg, out_dir_p, metrics=metrics)
+    next_gid = 1
+    stitched = 0
+    n_frames = 0
+    shard_stats: List[Dict[str, Any]] = []
+    # Stitched (frame_idx, t, [(global_id, label, box)]) covering the last `overlap` seconds
+    recent: deque = deque()
+    try:
+        # spawn: fresh interpreters, so no forked torch/OpenCV thread state
+        with ProcessPoolExecutor(
+            max_workers=len(bounds),
+            mp_context=get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(cfg,),
+        ) as pool:
+            futures = deque(
+                pool.submit(_run_shard, input_path, s, e, s if s in cut_times else max(0.0, s - overlap), sorted(cut_frames))
+                for s, e in bounds
+            )
+            # Shards finish in any order but are merged in time order; each result (every frame
+            # of the shard) is dropped once merged, so only unmerged shards are held in memory
+            while futures:
+                res = futures.popleft().result()
+                id_map = stitch(res["warmup"], {fi: ents for fi, _, ents in recent})
+                stitched += len(id_map)
+                if metrics is not None:
+                    metrics.merge(res["latency"])
+                for frame_idx, t, n_dets, snaps in res["frames"]:
+                    if frame_idx in cut_frames:
+                        shot_cut(t, None, windower, scales)
+                        recent.clear()
+                    for lid, *_ in snaps:
+                        if lid not in id_map:
+                            id_map[lid] = next_gid
+                            next_gid += 1
+                    # Serial trackers list live tracks in creation (= id) order
+                    snaps = sorted(snaps, key=lambda s: id_map[s[0]])
+                    ents = [Entity(id=id_map[lid], label=label, bbox=BBox(*box), score=score) for lid, label, box, score, _, _ in snaps]
+                    if metrics is not None:
+                        metrics.frame(n_dets, len(ents))
+                    windower.push(frame_idx, t, ents, motions=[s[4] for s in snaps])
+                    if scales is not None:
+                        scales.push(frame_idx, t, ents, seen=[s[5] for s in snaps])
+                    recent.append((frame_idx, t, [(e.id, e.label, box) for e, (_, _, box, _, _, _) in zip(ents, snaps)]))
+                    while recent and recent[0][1] < t - overlap:
+                        recent.popleft()
+                    n_frames += 1
+                shard_stats.append({
+                    "start": res["start"],
+                    "end": res["end"],
+                    "frames": len(res["frames"]),
+                    "warmup_frames": len(res["warmup"]),
+                    "seconds": res["seconds"],
+                    "motion_gate": res["motion_gate"],
+                    "at_cut": res["start"] in cut_times,
+                })
+                del res
+        windower.finish()
+        if scales is not None:
+            scales.finish()
+        if shots is not None:
+            shots.write(out_dir_p)
+    finally:
+        sinks.close()
+        if scales is not None:
+            scales.close()
+
+    stats = {
+        "frames": n_frames,
+        "events": sinks.events_written,
+        "cache": "bypass",
+        "tracker": {"tracks": next_gid - 1, "stitched": stitched},
+        "rss_peak_mb": peak_rss_mb(),
+        "stages": {},
+        "shards": shard_stats,
+    }
+    gates = [sh["motion_gate"] for sh in shard_stats if sh["motion_gate"] is not None]
+    if gates:
+        # Summed over the shards, warm-up frames included
+        gate = {k: sum(g[k] for g in gates) for k in ("frames", "detected", "skipped", "forced")}
+        gate["skip_ratio"] = gate["skipped"] / gate["frames"] if gate["frames"] else 0.0
+        stats["motion_gate"] = gate
+    if windower.coalescer is not None:
+        stats["coalesce"] = windower.coalescer.stats()
+    if scales is not None:
+        stats["scales"] = scales.stats()
+    if shots is not None:
+        stats["shots"] = {**shots.stats(), "prepass_s": prepass_s}
+    if metrics is not None:
+        metrics.finish(out_dir_p, extra={
+            "rss_peak_mb": stats["rss_peak_mb"], "tracker": stats["tracker"], "shards": shard_stats, "motion_gate": stats.get("motion_gate"),
+            "coalesce": stats.get("coalesce"), "scales": stats.get("scales"), "shots": stats.get("shots"),
+        })
+    return stats
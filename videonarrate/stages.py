@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from dataclasses import dataclass, asdict
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple
+
+_DONE = object()
+
+
+class _Failed:
+    def __init__(self, exc: BaseException):
+        self.exc = exc
+
+
+@dataclass
+class StageStats:
+    name: str
+    items: int = 0
+    busy_s: float = 0.0
+    # Times the stage found its input queue empty / its output queue full, and time spent waiting
+    get_stalls: int = 0
+    put_stalls: int = 0
+    stall_s: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def _put(q: "queue.Queue", item: Any, st: StageStats, stop: threading.Event) -> bool:
+    try:
+        q.put_nowait(item)
+        return True
+    except queue.Full:
+        st.put_stalls += 1
+    t0 = time.perf_counter()
+    try:
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.05)
+                return True
+            except queue.Full:
+                continue
+        return False
+    finally:
+        st.stall_s += time.perf_counter() - t0
+
+
+def _get(q: "queue.Queue", st: StageStats, stop: threading.Event, upstream: threading.Thread) -> Any:
+    """
+    Next item from q; _DONE once stop is set, or a _Failed if the upstream thread exited
+    without posting its end marker.
+    """
+    try:
+        return q.get_nowait()
+    except queue.Empty:
+        st.get_stalls += 1
+    t0 = time.perf_counter()
+    try:
+        while not stop.is_set():
+            try:
+                return q.get(timeout=0.05)
+            except queue.Empty:
+                pass
+            if not upstream.is_alive():
+                try:
+                    # It may have posted its last item just before exiting
+                    return q.get_nowait()
+                except queue.Empty:
+                    return _Failed(RuntimeError(f"Stage thread {upstream.name} exited without finishing"))
+        return _DONE
+    finally:
+        st.stall_s += time.perf_counter() - t0
+
+
+def run_staged(
+    frames: Iterable[Tuple[int, float, Any]],
+    detect_batch: Callable[[List[Any]], List[List[Any]]],
+    depth: int = 4,
+    stats: Dict[str, StageStats] | None = None,
+    batch: int = 1,
+) -> Iterator[Tuple[int, float, List[Any]]]:
+    """
+    Run decode and detect in their own threads, connected by bounded queues of `depth` items,
+    and yield (frame_idx, t, detections) in decode order for the tracking/windowing consumer.
+    The detect stage collects up to `batch` frames per detect_batch call.
+    Per-stage counters are recorded in `stats` under "decode", "detect" and "track".
+    Exceptions raised in a stage are re-raised in the consumer.
+    """
+    stats = stats if stats is not None else {}
+    for name in ("decode", "detect", "track"):
+        stats.setdefault(name, StageStats(name=name))
+    st_dec, st_det, st_trk = stats["decode"], stats["detect"], stats["track"]
+    decoded: "queue.Queue" = queue.Queue(maxsize=max(1, depth))
+    detected: "queue.Queue" = queue.Queue(maxsize=max(1, depth))
+    stop = threading.Event()
+
+    def decode_worker() -> None:
+        item: Any = _DONE
+        it = iter(frames)
+        try:
+            while not stop.is_set():
+                t0 = time.perf_counter()
+                nxt = next(it, _DONE)
+                st_dec.busy_s += time.perf_counter() - t0
+                if nxt is _DONE:
+                    break
+                st_dec.items += 1
+                if not _put(decoded, nxt, st_dec, stop):
+                    return
+        except BaseException as exc:  # surfaced in the consumer
+            item = _Failed(exc)
+        finally:
+            close = getattr(it, "close", None)
+            if close is not None:
+                close()
+        _put(decoded, item, st_dec, stop)
+
+    def detect_worker() -> None:
+        end: Any = None
+        while end is None:
+            pending = []
+            while len(pending) < max(1, batch):
+                item = _get(decoded, st_det, stop, threads[0])
+                if item is _DONE or isinstance(item, _Failed):
+                    end = item
+                    break
+                pending.append(item)
+            if pending:
+                t0 = time.perf_counter()
+                try:
+                    results = detect_batch([frame for _, _, frame in pending])
+                except BaseException as exc:
+                    _put(detected, _Failed(exc), st_det, stop)
+                    return
+                st_det.busy_s += time.perf_counter() - t0
+                st_det.items += len(pending)
+                for (frame_idx, t, _), ents in zip(pending, results):
+                    if not _put(detected, (frame_idx, t, ents), st_det, stop):
+                        return
+        _put(detected, end, st_det, stop)
+
+    threads = [
+        threading.Thread(target=decode_worker, name="videonarrate-decode", daemon=True),
+        threading.Thread(target=detect_worker, name="videonarrate-detect", daemon=True),
+    ]
+    for th in threads:
+        th.start()
+    try:
+        while True:
+            item = _get(detected, st_trk, stop, threads[1])
+            if item is _DONE:
+                break
+            if isinstance(item, _Failed):
+                raise item.exc
+            t0 = time.perf_counter()
+            yield item
+            st_trk.busy_s += time.perf_counter() - t0
+            st_trk.items += 1
+    finally:
+        stop.set()
+        # Workers poll stop while waiting on a queue; drop queued frames so they are freed now
+        for q in (decoded, detected):
+            try:
+                while True:
+                    q.get_nowait()
+            except queue.Empty:
+                pass
+        for th in threads:
+            th.join(timeout=5.0)
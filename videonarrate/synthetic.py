@@ -0,0 +1,255 @@
+from __future__ import annotations
+
+import bisect
+import random
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+from .schemas import BBox, Entity
+
+LABELS = ("person", "car", "bicycle", "truck")
+# Box (width, height) as multiples of the scene's base box size
+_SHAPES = {"person": (0.6, 1.4), "car": (1.6, 1.0), "bicycle": (1.0, 1.0), "truck": (2.2, 1.2)}
+# Speed range in pixels per native frame
+_SPEEDS = {"person": (0.5, 3.0), "car": (3.0, 10.0), "bicycle": (1.5, 5.0), "truck": (2.0, 7.0)}
+_COLORS = {"person": (60, 60, 220), "car": (220, 120, 40), "bicycle": (40, 200, 60), "truck": (200, 60, 200)}
+
+# Frame tag: two rows of 64 black/white cells across the top of each rendered frame
+_TAG_CELLS = 64
+_TAG_ROWS = 2
+# Tag row height as a fraction of frame height
+_TAG_ROW_FRAC = 1.0 / 48.0
+_TAG_MAGIC = 0xA5A5
+# (x, y, w, h) of the tag as fractions of the frame; it changes every frame (see MotionGate's ignore)
+TAG_REGION = (0.0, 0.0, 1.0, _TAG_ROWS * _TAG_ROW_FRAC)
+
+
+@dataclass
+class _Life:
+    start: int
+    length: int
+    label: str
+    x0: float
+    y0: float
+    vx: float
+    vy: float
+    w: float
+    h: float
+    score: float
+
+
+class SyntheticScene:
+    """
+    Deterministic scene of `entities` slots, each cycling through lives: an entity appears
+    (at an edge, or standing still somewhere inside), moves in a straight line across the
+    frame so paths cross, disappears, and after a gap a new entity takes the slot.
+    Everything derives from (seed, slot, life), so any frame can be queried in any order.
+    """
+
+    def __init__(self, entities: int = 20, width: int = 1280, height: int = 720, box: int = 40, seed: int = 0):
+        self.entities = entities
+        self.width = width
+        self.height = height
+        self.box = box
+        self.seed = seed
+        self._lives: List[List[_Life]] = [[] for _ in range(entities)]
+        self._starts: List[List[int]] = [[] for _ in range(entities)]
+
+    def _life(self, slot: int, k: int, start: int) -> _Life:
+        rng = random.Random(f"{self.seed}:{slot}:{k}")
+        label = rng.choice(LABELS)
+        fw, fh = _SHAPES[label]
+        w, h = self.box * fw, self.box * fh
+        W, H = float(self.width), float(self.height)
+        score = round(rng.uniform(0.4, 0.99), 3)
+        if rng.random() < 0.2:
+            # Standing still
+            x0, y0 = rng.uniform(0, W - w), rng.uniform(0, H - h)
+            return _Life(start, rng.randint(30, 240), label, x0, y0, 0.0, 0.0, w, h, score)
+        # Enter at one edge and head for a random point on the opposite one
+        side = rng.randrange(4)
+        a, b = rng.random(), rng.random()
+        src, dst = [((-w, a * H), (W, b * H)), ((W, a * H), (-w, b * H)), ((a * W, -h), (b * W, H)), ((a * W, H), (b * W, -h))][side]
+        dx, dy = dst[0] - src[0], dst[1] - src[1]
+        dist = (dx * dx + dy * dy) ** 0.5
+        speed = rng.uniform(*_SPEEDS[label])
+        length = max(1, int(dist / speed))
+        return _Life(start, length, label, src[0], src[1], dx / length, dy / length, w, h, score)
+
+    def _slot_life(self, slot: int, frame_idx: int) -> Optional[_Life]:
+        lives, starts = self._lives[slot], self._starts[slot]
+        # Extend the slot's schedule lazily up to frame_idx
+        while not starts or starts[-1] <= frame_idx:
+            if lives:
+                last = lives[-1]
+                gap = random.Random(f"{self.seed}:{slot}:{len(lives) - 1}:gap").randint(5, 90)
+                start = last.start + last.length + gap
+            else:
+                start = random.Random(f"{self.seed}:{slot}:offset").randint(0, 60)
+            lives.append(self._life(slot, len(lives), start))
+            starts.append(start)
+        i = bisect.bisect_right(starts, frame_idx) - 1
+        if i < 0:
+            return None
+        life = lives[i]
+        return life if frame_idx < life.start + life.length else None
+
+    def detections(self, frame_idx: int) -> List[Tuple[str, BBox, float]]:
+        """(label, bbox, score) of every entity visible on native frame frame_idx, by slot."""
+        out = []
+        for slot in range(self.entities):
+            life = self._slot_life(slot, frame_idx)
+            if life is None:
+                continue
+            k = frame_idx - life.start
+            out.append((life.label, BBox(life.x0 + life.vx * k, life.y0 + life.vy * k, life.w, life.h), life.score))
+        return out
+
+    def tag(self, frame_idx: int) -> List[int]:
+        """Tag bits identifying this scene and frame (see read_tag)."""
+        words = [frame_idx >> 16, frame_idx & 0xFFFF, self.seed, self.entities, self.width, self.height, self.box]
+        words.append(_TAG_MAGIC ^ _checksum(words))
+        return [(w >> (15 - b)) & 1 for w in words for b in range(16)]
+
+
+def _checksum(words: List[int]) -> int:
+    c = 0
+    for w in words:
+        c = ((c * 31) + w) & 0xFFFF
+    return c
+
+
+def read_tag(frame) -> Optional[Tuple[int, Tuple[int, int, int, int, int]]]:
+    """
+    Decode (frame_idx, (seed, entities, width, height, box)) from a rendered frame, at any
+    resolution it was scaled to; None if the frame carries no valid tag.
+    """
+    import numpy as np
+
+    h, w = frame.shape[:2]
+    ys = ((np.arange(_TAG_ROWS) + 0.5) * h * _TAG_ROW_FRAC).astype(np.int64)
+    xs = ((np.arange(_TAG_CELLS) + 0.5) * w / _TAG_CELLS).astype(np.int64)
+    cells = frame[ys][:, xs]
+    bits = (cells.reshape(_TAG_ROWS * _TAG_CELLS, -1).mean(axis=1) > 127).astype(np.int64)
+    words = [int("".join(map(str, bits[i:i + 16])), 2) for i in range(0, len(bits), 16)]
+    if words[-1] != _TAG_MAGIC ^ _checksum(words[:-1]):
+        return None
+    return (words[0] << 16) | words[1], tuple(words[2:7])
+
+
+class SyntheticDetector:
+    """Recovers each frame's tag and returns the scene's ground-truth boxes in source pixels."""
+
+    def __init__(self):
+        self._scenes: Dict[Tuple[int, int, int, int, int], SyntheticScene] = {}
+
+    def detect(self, frame, min_conf: float = 0.0, allowed_labels: Optional[Set[str]] = None, start_id: int = 1) -> List[Entity]:
+        tag = read_tag(frame)
+        if tag is None:
+            return []
+        frame_idx, params = tag
+        scene = self._scenes.get(params)
+        if scene is None:
+            seed, entities, width, height, box = params
+            scene = self._scenes[params] = SyntheticScene(entities, width, height, box, seed)
+        ents: List[Entity] = []
+        for label, bbox, score in scene.detections(frame_idx):
+            if score < min_conf or (allowed_labels is not None and label not in allowed_labels):
+                continue
+            ents.append(Entity(id=start_id + len(ents), label=label, bbox=bbox, score=score))
+        return ents
+
+
+def render_frame(scene: SyntheticScene, frame_idx: int, background: int = 96):
+    """BGR frame with the scene's entities as filled boxes on a grey background and the tag on top."""
+    import cv2  # type: ignore
+    import numpy as np
+
+    img = np.full((scene.height, scene.width, 3), background, dtype=np.uint8)
+    for label, b, _ in scene.detections(frame_idx):
+        cv2.rectangle(img, (int(b.x), int(b.y)), (int(b.x + b.w), int(b.y + b.h)), _COLORS[label], -1)
+    row_h = scene.height * _TAG_ROW_FRAC
+    cell_w = scene.width / _TAG_CELLS
+    bits = scene.tag(frame_idx)
+    for r in range(_TAG_ROWS):
+        y0, y1 = int(round(r * row_h)), int(round((r + 1) * row_h))
+        for c in range(_TAG_CELLS):
+            x0, x1 = int(round(c * cell_w)), int(round((c + 1) * cell_w))
+            img[y0:y1, x0:x1] = 255 if bits[r * _TAG_CELLS + c] else 0
+    return img
+
+
+def write_scene_video(
+    path: str,
+    seconds: float = 10.0,
+    fps: float = 30.0,
+    entities: int = 20,
+    width: int = 1280,
+    height: int = 720,
+    box: int = 40,
+    seed: int = 0,
+    pause: Optional[Tuple[float, float]] = None,
+) -> SyntheticScene:
+    """
+    Render a synthetic scene to an mp4 for the "synthetic" detector backend; returns the scene.
+    With pause=(run, hold), scene time runs for `run` seconds and then stands still for `hold`
+    seconds, repeatedly (a fixed camera on a scene with quiet spells); frozen frames repeat the
+    scene frame, tag included, so the video's frame index no longer equals the scene's.
+    """
+    import cv2  # type: ignore
+
+    if height < 4 / _TAG_ROW_FRAC or width < _TAG_CELLS * 4:
+        raise ValueError(f"Frame {width}x{height} is too small to carry the frame tag")
+    scene = SyntheticScene(entities, width, height, box, seed)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    if not writer.isOpened():
+        raise OSError(f"Cannot open video writer for {path}")
+    try:
+        frame = None
+        k = -1
+        for i in range(int(round(seconds * fps))):
+            if pause is not None:
+                run, hold = (int(round(v * fps)) for v in pause)
+                cycle, pos = divmod(i, run + hold)
+                scene_idx = cycle * run + min(pos, run - 1)
+            else:
+                scene_idx = i
+            if scene_idx != k:
+                frame, k = render_frame(scene, scene_idx), scene_idx
+            writer.write(frame)
+    finally:
+        writer.release()
+    return scene
+
+
+def write_shots_video(
+    path: str,
+    shots: Sequence[Tuple[float, int, int]],
+    fps: float = 30.0,
+    entities: int = 20,
+    width: int = 1280,
+    height: int = 720,
+    box: int = 40,
+) -> List[float]:
+    """
+    Render an edited video of several synthetic scenes back to back, hard cut between them:
+    one (seconds, seed, background grey level) per shot. Returns the cut times in seconds.
+    """
+    import cv2  # type: ignore
+
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    if not writer.isOpened():
+        raise OSError(f"Cannot open video writer for {path}")
+    cuts: List[float] = []
+    i = 0
+    try:
+        for k, (seconds, seed, background) in enumerate(shots):
+            if k:
+                cuts.append(i / fps)
+            scene = SyntheticScene(entities, width, height, box, seed)
+            for j in range(int(round(seconds * fps))):
+                writer.write(render_frame(scene, j, background=background))
+                i += 1
+    finally:
+        writer.release()
+    return cuts
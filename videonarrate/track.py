@@ -1,10 +1,14 @@
 from __future__ import annotations
 
+from collections import deque
 from dataclasses import dataclass, field
-from typing import Dict, List, Tuple
+from typing import Any, Callable, Dict, List, MutableSequence, Optional, Tuple
 
 from .schemas import Entity, BBox
 
+# Frames a track survives without a matching detection
+MAX_AGE = 30
+
 
 def iou(a: BBox, b: BBox) -> float:
     ax1, ay1, ax2, ay2 = a.x, a.y, a.x + a.w, a.y + a.h
@@ -19,30 +23,270 @@ def iou(a: BBox, b: BBox) -> float:
     return inter / union
 
 
+def iou_matrix(a, b):
+    """Pairwise IoU between (N, 4) and (M, 4) arrays of (x, y, w, h); same formula as iou()."""
+    import numpy as np
+
+    a = np.asarray(a, dtype=np.float64).reshape(-1, 4)
+    b = np.asarray(b, dtype=np.float64).reshape(-1, 4)
+    ax1, ay1 = a[:, 0:1], a[:, 1:2]
+    ax2, ay2 = ax1 + a[:, 2:3], ay1 + a[:, 3:4]
+    bx1, by1 = b[:, 0], b[:, 1]
+    bx2, by2 = bx1 + b[:, 2], by1 + b[:, 3]
+    iw = np.clip(np.minimum(ax2, bx2) - np.maximum(ax1, bx1), 0.0, None)
+    ih = np.clip(np.minimum(ay2, by2) - np.maximum(ay1, by1), 0.0, None)
+    inter = iw * ih
+    union = (a[:, 2:3] * a[:, 3:4]) + (b[:, 2] * b[:, 3]) - inter + 1e-6
+    return inter / union
+
+
+def _assign_greedy(ov, threshold: float) -> List[Tuple[int, int]]:
+    """Highest-IoU-first matching over an IoU matrix; each row and column is used at most once."""
+    import numpy as np
+
+    rows, cols = np.nonzero(ov > threshold)
+    if len(rows) == 0:
+        return []
+    order = np.argsort(-ov[rows, cols], kind="stable")
+    used_r, used_c = set(), set()
+    pairs = []
+    for r, c in zip(rows[order].tolist(), cols[order].tolist()):
+        if r in used_r or c in used_c:
+            continue
+        used_r.add(r)
+        used_c.add(c)
+        pairs.append((r, c))
+    return pairs
+
+
+def _assign_hungarian(ov, threshold: float) -> List[Tuple[int, int]]:
+    """Maximum-total-IoU matching; falls back to greedy when SciPy is unavailable."""
+    try:
+        from scipy.optimize import linear_sum_assignment  # type: ignore
+    except Exception:
+        return _assign_greedy(ov, threshold)
+    import numpy as np
+
+    valid = ov > threshold
+    cost = np.where(valid, -ov, 0.0)
+    rows, cols = linear_sum_assignment(cost)
+    return [(r, c) for r, c in zip(rows.tolist(), cols.tolist()) if valid[r, c]]
+
+
 @dataclass
 class Track:
     id: int
     label: str
     bbox: BBox
     score: float
-    history: List[Tuple[int, float, BBox]] = field(default_factory=list)  # (frame_idx, t, bbox)
+    # (frame_idx, t, bbox); a bounded deque when the tracker caps history
+    history: MutableSequence[Tuple[int, float, BBox]] = field(default_factory=list)
     alive: bool = True
+    # Lifetime stats, kept even when history is capped
+    first_t: Optional[float] = None
+    last_t: Optional[float] = None
+    hits: int = 0
 
     def update(self, frame_idx: int, t: float, bbox: BBox, score: float):
         self.bbox = bbox
         self.score = score
         self.history.append((frame_idx, t, bbox))
+        if self.first_t is None:
+            self.first_t = t
+        self.last_t = t
+        self.hits += 1
+
+    def carry(self, frame_idx: int, t: float, bbox: BBox):
+        """Predicted position on a frame without detections; not counted as a hit."""
+        self.bbox = bbox
+        self.history.append((frame_idx, t, bbox))
+        self.last_t = t
+
+    def summary(self) -> Dict[str, Any]:
+        """Compact record of a finished track."""
+        return {
+            "id": self.id,
+            "label": self.label,
+            "first_t": self.first_t,
+            "last_t": self.last_t,
+            "hits": self.hits,
+            "bbox": [self.bbox.x, self.bbox.y, self.bbox.w, self.bbox.h],
+            "score": self.score,
+        }
+
+
+def _extrapolate(history, frame_idx: int) -> BBox:
+    """Box at frame_idx, moving on at the velocity between the last two history entries."""
+    fi, _, b = history[-1]
+    if len(history) < 2:
+        return b
+    pfi, _, pb = history[-2]
+    k = (frame_idx - fi) / float(max(1, fi - pfi))
+    return BBox(b.x + (b.x - pb.x) * k, b.y + (b.y - pb.y) * k, b.w + (b.w - pb.w) * k, b.h + (b.h - pb.h) * k)
+
+
+def _track_state(tr: Track) -> Dict[str, Any]:
+    b = tr.bbox
+    return {
+        "id": tr.id,
+        "label": tr.label,
+        "bbox": [b.x, b.y, b.w, b.h],
+        "score": tr.score,
+        "history": [[fi, t, hb.x, hb.y, hb.w, hb.h] for fi, t, hb in tr.history],
+        "alive": tr.alive,
+        "first_t": tr.first_t,
+        "last_t": tr.last_t,
+        "hits": tr.hits,
+    }
 
 
 class SimpleTracker:
-    def __init__(self, iou_threshold: float = 0.3, max_age: int = 30):
+    """
+    Greedy IoU tracker. By default dead tracks stay in self.tracks with alive=False and history
+    is unbounded; for long runs pass max_history (entries kept per track) and evict_dead=True.
+    on_evict(track), if given, is called as each track dies (evicted or not) to finalize it
+    elsewhere. If a table (e.g. tracktable.TrackTable) is given, live tracks are mirrored into
+    it for batch motion analysis. step() with detections=None (a frame the motion gate skipped)
+    carries the tracks present on the previous step forward instead of matching: along their
+    recent velocity with coast="velocity", or at their last box with coast="hold".
+    """
+
+    def __init__(
+        self,
+        iou_threshold: float = 0.3,
+        max_age: int = MAX_AGE,
+        max_history: Optional[int] = None,
+        evict_dead: bool = False,
+        on_evict: Optional[Callable[[Track], None]] = None,
+        table: Optional[Any] = None,
+        coast: str = "velocity",
+    ):
+        if coast not in ("velocity", "hold"):
+            raise ValueError(f"Unknown coast {coast!r}; expected 'velocity' or 'hold'")
         self.iou_threshold = iou_threshold
         self.max_age = max_age
+        self.max_history = max_history
+        self.evict_dead = evict_dead
+        self.on_evict = on_evict
+        self.table = table
+        self.coast = coast
         self.tracks: Dict[int, Track] = {}
         self._next_id = 1
         self._last_seen: Dict[int, int] = {}
+        self._last_step: Optional[int] = None
+        self.evicted = 0
+
+    def _new_track(self, det: Entity) -> Track:
+        tid = self._next_id
+        self._next_id += 1
+        history = deque(maxlen=self.max_history) if self.max_history else []
+        tr = Track(id=tid, label=det.label, bbox=det.bbox, score=det.score, history=history)
+        self.tracks[tid] = tr
+        if self.table is not None:
+            self.table.add(tid)
+        return tr
+
+    def _update(self, tr: Track, frame_idx: int, t: float, det: Entity) -> None:
+        tr.update(frame_idx, t, det.bbox, det.score)
+        self._last_seen[tr.id] = frame_idx
+        if self.table is not None:
+            self.table.push(tr.id, t, det.bbox)
+
+    def _age_out(self, frame_idx: int) -> List[int]:
+        """Mark tracks unseen for more than max_age frames dead (evicting them if configured)."""
+        return self._end([tid for tid, last_idx in self._last_seen.items() if frame_idx - last_idx > self.max_age])
+
+    def _end(self, to_remove: List[int]) -> List[int]:
+        for tid in to_remove:
+            self._last_seen.pop(tid, None)
+            if self.table is not None:
+                self.table.remove(tid)
+            tr = self.tracks[tid]
+            tr.alive = False
+            if self.evict_dead:
+                del self.tracks[tid]
+                self.evicted += 1
+            if self.on_evict is not None:
+                self.on_evict(tr)
+        return to_remove
 
-    def step(self, frame_idx: int, t: float, detections: List[Entity]) -> List[Track]:
+    def _carry(self, frame_idx: int, t: float) -> None:
+        """Move tracks present on the previous step to their predicted boxes; missed tracks keep aging."""
+        for tid, last_idx in list(self._last_seen.items()):
+            if last_idx != self._last_step:
+                continue
+            tr = self.tracks[tid]
+            bbox = _extrapolate(tr.history, frame_idx) if self.coast == "velocity" else tr.bbox
+            tr.carry(frame_idx, t, bbox)
+            self._last_seen[tid] = frame_idx
+            if self.table is not None:
+                self.table.push(tid, t, bbox)
+
+    def reset(self) -> None:
+        """
+        End every live track as if it had aged out (e.g. at a shot cut, so nothing matches across
+        it); track ids keep counting up.
+        """
+        self._end(list(self._last_seen))
+        self._last_step = None
+
+    def finalize(self) -> None:
+        """Hand every remaining live track to on_evict (e.g. at end of input)."""
+        if self.on_evict is None:
+            return
+        for tr in self.tracks.values():
+            if tr.alive:
+                self.on_evict(tr)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "tracks_live": len(self._last_seen),
+            "tracks_stored": len(self.tracks),
+            "tracks_evicted": self.evicted,
+            "history_entries": sum(len(tr.history) for tr in self.tracks.values()),
+        }
+
+    def checkpoint_state(self) -> Dict[str, Any]:
+        """JSON-able tracker state (stored tracks in order, id counter, last-seen frames) for resuming a run."""
+        return {
+            "next_id": self._next_id,
+            "evicted": self.evicted,
+            "last_seen": list(self._last_seen.items()),
+            "last_step": self._last_step,
+            "tracks": [_track_state(tr) for tr in self.tracks.values()],
+            "table": self.table.checkpoint_state() if self.table is not None else None,
+        }
+
+    def restore_state(self, state: Dict[str, Any]) -> None:
+        """Inverse of checkpoint_state on a freshly constructed tracker with the same settings."""
+        self._next_id = state["next_id"]
+        self.evicted = state["evicted"]
+        self._last_seen = {tid: idx for tid, idx in state["last_seen"]}
+        self._last_step = state.get("last_step")
+        self.tracks = {}
+        for ts in state["tracks"]:
+            history = deque(maxlen=self.max_history) if self.max_history else []
+            history.extend((fi, t, BBox(*box)) for fi, t, *box in ts["history"])
+            self.tracks[ts["id"]] = Track(
+                id=ts["id"],
+                label=ts["label"],
+                bbox=BBox(*ts["bbox"]),
+                score=ts["score"],
+                history=history,
+                alive=ts["alive"],
+                first_t=ts["first_t"],
+                last_t=ts["last_t"],
+                hits=ts["hits"],
+            )
+        if self.table is not None and state.get("table") is not None:
+            self.table.restore_state(state["table"])
+
+    def step(self, frame_idx: int, t: float, detections: Optional[List[Entity]]) -> List[Track]:
+        if detections is None:
+            self._carry(frame_idx, t)
+            self._age_out(frame_idx)
+            self._last_step = frame_idx
+            return [tr for tr in self.tracks.values() if tr.alive]
         assigned: Dict[int, int] = {}  # det_idx -> track_id
         # Try to match detections to existing tracks by IoU
         for det_idx, det in enumerate(detections):
@@ -62,30 +306,87 @@ class SimpleTracker:
 
         # Update matched tracks
         for det_idx, tid in assigned.items():
-            det = detections[det_idx]
-            tr = self.tracks[tid]
-            tr.update(frame_idx, t, det.bbox, det.score)
-            self._last_seen[tid] = frame_idx
+            self._update(self.tracks[tid], frame_idx, t, detections[det_idx])
 
         # Create new tracks for unmatched detections
         for det_idx, det in enumerate(detections):
             if det_idx in assigned:
                 continue
-            tid = self._next_id
-            self._next_id += 1
-            tr = Track(id=tid, label=det.label, bbox=det.bbox, score=det.score)
-            tr.update(frame_idx, t, det.bbox, det.score)
-            self.tracks[tid] = tr
-            self._last_seen[tid] = frame_idx
+            self._update(self._new_track(det), frame_idx, t, det)
 
         # Age out old tracks
-        to_remove = []
-        for tid, last_idx in self._last_seen.items():
-            if frame_idx - last_idx > self.max_age:
-                self.tracks[tid].alive = False
-                to_remove.append(tid)
-        for tid in to_remove:
-            self._last_seen.pop(tid, None)
+        self._age_out(frame_idx)
+        self._last_step = frame_idx
 
         return [tr for tr in self.tracks.values() if tr.alive]
 
+
+class VectorTracker(SimpleTracker):
+    """
+    SimpleTracker variant for dense scenes: builds the IoU matrix per label group with numpy and
+    solves the assignment globally ("greedy" highest-IoU-first or "hungarian"), so each track is
+    matched at most once. Only live tracks are indexed, so dead tracks cost nothing per step.
+    """
+
+    def __init__(self, iou_threshold: float = 0.3, max_age: int = MAX_AGE, assignment: str = "greedy", **kwargs):
+        super().__init__(iou_threshold=iou_threshold, max_age=max_age, **kwargs)
+        if assignment not in ("greedy", "hungarian"):
+            raise ValueError(f"Unknown assignment {assignment!r}; expected 'greedy' or 'hungarian'")
+        self.assignment = assignment
+        self._live: Dict[int, Track] = {}
+
+    def restore_state(self, state: Dict[str, Any]) -> None:
+        super().restore_state(state)
+        # Live tracks were added on creation and dropped on death, so they keep the stored order
+        self._live = {tid: tr for tid, tr in self.tracks.items() if tr.alive}
+
+    def reset(self) -> None:
+        super().reset()
+        self._live.clear()
+
+    def step(self, frame_idx: int, t: float, detections: Optional[List[Entity]]) -> List[Track]:
+        if detections is None:
+            self._carry(frame_idx, t)
+            for tid in self._age_out(frame_idx):
+                self._live.pop(tid, None)
+            self._last_step = frame_idx
+            return list(self._live.values())
+        assign = _assign_hungarian if self.assignment == "hungarian" else _assign_greedy
+        det_groups: Dict[str, List[int]] = {}
+        for det_idx, det in enumerate(detections):
+            det_groups.setdefault(det.label, []).append(det_idx)
+        trk_groups: Dict[str, List[Track]] = {}
+        for tr in self._live.values():
+            trk_groups.setdefault(tr.label, []).append(tr)
+
+        assigned: Dict[int, int] = {}
+        for label, det_ids in det_groups.items():
+            cands = trk_groups.get(label)
+            if not cands:
+                continue
+            ov = iou_matrix(
+                [(b.x, b.y, b.w, b.h) for b in (tr.bbox for tr in cands)],
+                [(b.x, b.y, b.w, b.h) for b in (detections[i].bbox for i in det_ids)],
+            )
+            for r, c in assign(ov, self.iou_threshold):
+                assigned[det_ids[c]] = cands[r].id
+
+        for det_idx, det in enumerate(detections):
+            tid: Optional[int] = assigned.get(det_idx)
+            if tid is None:
+                tr = self._new_track(det)
+                tid = tr.id
+                self._live[tid] = tr
+            self._update(self.tracks[tid], frame_idx, t, det)
+
+        for tid in self._age_out(frame_idx):
+            self._live.pop(tid, None)
+        self._last_step = frame_idx
+
+        return list(self._live.values())
+
+
+def make_tracker(name: str = "simple", assignment: str = "greedy", **kwargs) -> SimpleTracker:
+    if name == "vector":
+        return VectorTracker(assignment=assignment, **kwargs)
+    return SimpleTracker(**kwargs)
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from .motion import MOTION_HISTORY
+from .schemas import BBox
+
+
+class TrackTable:
+    """
+    Struct-of-arrays store of the last `history` bbox centers and timestamps per live track.
+    Each track owns one row of fixed-width ring buffers, so motion for every live track can be
+    computed in one vectorized call (see motion.summarize_motion_batch).
+    """
+
+    def __init__(self, history: int = MOTION_HISTORY, capacity: int = 256):
+        self.history = history
+        self.cx = np.zeros((capacity, history), dtype=np.float64)
+        self.cy = np.zeros((capacity, history), dtype=np.float64)
+        self.t = np.zeros((capacity, history), dtype=np.float64)
+        # Entries ever pushed per row; the write position is count % history
+        self.count = np.zeros(capacity, dtype=np.int64)
+        self.rows: Dict[int, int] = {}
+        self._free: List[int] = list(range(capacity - 1, -1, -1))
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def _grow(self) -> None:
+        cap = len(self.count)
+        for name in ("cx", "cy", "t"):
+            arr = getattr(self, name)
+            setattr(self, name, np.concatenate([arr, np.zeros_like(arr)]))
+        self.count = np.concatenate([self.count, np.zeros(cap, dtype=np.int64)])
+        self._free.extend(range(2 * cap - 1, cap - 1, -1))
+
+    def add(self, tid: int) -> None:
+        if not self._free:
+            self._grow()
+        row = self._free.pop()
+        self.count[row] = 0
+        self.rows[tid] = row
+
+    def remove(self, tid: int) -> None:
+        row = self.rows.pop(tid, None)
+        if row is not None:
+            self._free.append(row)
+
+    def push(self, tid: int, t: float, bbox: BBox) -> None:
+        row = self.rows[tid]
+        pos = self.count[row] % self.history
+        cx, cy = bbox.center()
+        self.cx[row, pos] = cx
+        self.cy[row, pos] = cy
+        self.t[row, pos] = t
+        self.count[row] += 1
+
+    def ordered(self, tids: Sequence[int]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """(cx, cy, t, valid) arrays of shape (len(tids), history), oldest entry first."""
+        rows = np.fromiter((self.rows[tid] for tid in tids), dtype=np.int64, count=len(tids))
+        count = self.count[rows]
+        offsets = count[:, None] - self.history + np.arange(self.history)[None, :]
+        pos = offsets % self.history
+        r = rows[:, None]
+        return self.cx[r, pos], self.cy[r, pos], self.t[r, pos], offsets >= 0
+
+    def checkpoint_state(self) -> Dict[str, list]:
+        """Ring buffers of the live rows, by track id (JSON-able; see restore_state)."""
+        return {
+            str(tid): [int(self.count[row]), self.cx[row].tolist(), self.cy[row].tolist(), self.t[row].tolist()]
+            for tid, row in self.rows.items()
+        }
+
+    def restore_state(self, state: Dict[str, list]) -> None:
+        for tid, (count, cx, cy, t) in state.items():
+            self.add(int(tid))
+            row = self.rows[int(tid)]
+            self.count[row] = count
+            self.cx[row] = cx
+            self.cy[row] = cy
+            self.t[row] = t